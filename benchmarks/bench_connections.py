@@ -0,0 +1,62 @@
+"""
+Connection handshakes with requests' default pool settings (10 pools of 10
+connections, extra connections discarded) versus the pools WebCrawler sizes
+from its concurrency settings, on a stub site spread over many subdomains.
+
+    python benchmarks/bench_connections.py --hosts 20 --workers 32
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_engines import measure
+from stub_site import StubSite, resolve_local
+
+
+def run(result_pipe, start_url: str, options: dict):
+    from crawler import WebCrawler, _CrawlHTTPAdapter
+    logging.getLogger().setLevel(logging.ERROR)
+    default_pools = options.pop('default_pools')
+    crawler = WebCrawler(start_url, rate_limit=0, respect_robots=False,
+                         dns_resolver=resolve_local, **options)
+    if default_pools:
+        # requests' HTTPAdapter defaults, keeping the DNS cache and counters
+        adapter = _CrawlHTTPAdapter(crawler.connection_stats, crawler.dns)
+        crawler.session.mount('http://', adapter)
+        crawler.session.mount('https://', adapter)
+    started = time.perf_counter()
+    crawler.crawl(resolve=False)
+    result_pipe.send({'pages': len(crawler.visited), 'seconds': time.perf_counter() - started,
+                      **crawler.connection_stats.summary()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--hosts', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=32)
+    args = parser.parse_args()
+    
+    print(f"{args.pages} pages on {args.hosts} hosts, {args.workers} workers")
+    print(f"{'pools':<8} {'pages':>6} {'seconds':>8} {'requests':>9} {'handshakes':>11} "
+          f"{'server conns':>13} {'reuse':>6}")
+    with StubSite(args.pages, hosts=args.hosts) as site:
+        for name, default_pools in (('default', True), ('sized', False)):
+            before = site.stats()['connections']
+            result = measure(site.url('/p/0', 'h0.site.test'),
+                             {'max_workers': args.workers, 'default_pools': default_pools},
+                             target=run)
+            # The stats request itself opens one connection
+            server = site.stats()['connections'] - before - 1
+            print(f"{name:<8} {result['pages']:>6} {result['seconds']:>8.2f} "
+                  f"{result['requests']:>9} {result['connections']:>11} {server:>13} "
+                  f"{result['reuse_rate']:>6.1%}")
+
+
+if __name__ == '__main__':
+    main()
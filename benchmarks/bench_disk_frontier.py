@@ -0,0 +1,91 @@
+"""
+Enqueue and dequeue throughput of DiskFrontier next to the in-memory
+MemoryFrontier, and the peak memory of the queue. The crawl-like workload
+pops one URL and pushes the new links found on it, so the queue grows to
+most of the URLs before it drains, spilling segments on the way.
+
+    python benchmarks/bench_disk_frontier.py --urls 1000000 5000000 --budgets 1 16
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import DiskFrontier, MemoryFrontier
+
+
+def crawl(frontier, urls: int, links: int):
+    """Pop a URL, push up to links new IDs, until urls IDs were queued; then drain."""
+    frontier.add(0)
+    discovered = 1
+    while discovered < urls:
+        frontier.pop()
+        for url_id in range(discovered, min(discovered + links, urls)):
+            frontier.add(url_id)
+        discovered += links
+    while frontier:
+        frontier.pop()
+
+
+def run(make_frontier, urls: int, links: int) -> dict:
+    frontier = make_frontier()
+    started = time.perf_counter()
+    for url_id in range(urls):
+        frontier.add(url_id)
+    enqueue = time.perf_counter() - started
+    started = time.perf_counter()
+    while frontier:
+        frontier.pop()
+    dequeue = time.perf_counter() - started
+    spilled = getattr(frontier, 'spilled_segments', 0)
+    frontier.close()
+    
+    frontier = make_frontier()
+    started = time.perf_counter()
+    crawl(frontier, urls, links)
+    interleaved = time.perf_counter() - started
+    frontier.close()
+    
+    # Peak memory of the queue itself, measured apart since tracing slows allocation
+    frontier = make_frontier()
+    tracemalloc.start()
+    crawl(frontier, urls, links)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    frontier.close()
+    return {'enqueue': enqueue, 'dequeue': dequeue, 'interleaved': interleaved,
+            'peak': peak, 'spilled': spilled}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--urls', type=int, nargs='+', default=[1000000, 5000000])
+    parser.add_argument('--budgets', type=float, nargs='+', default=[1, 16],
+                        help='DiskFrontier memory budgets in MiB')
+    parser.add_argument('--links', type=int, default=20, help='New links per page')
+    args = parser.parse_args()
+    
+    print(f"{'frontier':<14} {'URLs':>9} {'enqueue/s':>10} {'dequeue/s':>10} "
+          f"{'crawl ops/s':>12} {'peak MiB':>9} {'segments':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for urls in args.urls:
+            frontiers = [('memory', MemoryFrontier)]
+            frontiers += [(f'disk {budget:g} MiB',
+                           lambda budget=budget: DiskFrontier(
+                               os.path.join(directory, 'frontier'), int(budget * 1024 * 1024)))
+                          for budget in args.budgets]
+            for name, make_frontier in frontiers:
+                result = run(make_frontier, urls, args.links)
+                print(f"{name:<14} {urls:>9} {urls / result['enqueue']:>10,.0f} "
+                      f"{urls / result['dequeue']:>10,.0f} "
+                      f"{2 * urls / result['interleaved']:>12,.0f} "
+                      f"{result['peak'] / 2 ** 20:>9.1f} {result['spilled']:>9}")
+
+
+if __name__ == '__main__':
+    main()
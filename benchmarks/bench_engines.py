@@ -0,0 +1,75 @@
+"""
+Compare the thread and async crawl engines on a local stub site: pages per
+second, peak RSS, and whether both build the same graph.
+
+    python benchmarks/bench_engines.py --pages 2000 --latency 0.02
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_site import StubSite, resolve_local
+
+
+def run(result_pipe, start_url: str, options: dict):
+    from crawler import WebCrawler
+    logging.getLogger().setLevel(logging.WARNING)
+    crawler = WebCrawler(start_url, rate_limit=0, respect_robots=False,
+                         dns_resolver=resolve_local, **options)
+    started = time.perf_counter()
+    graph = crawler.crawl()
+    seconds = time.perf_counter() - started
+    result_pipe.send({
+        'pages': len(crawler.visited),
+        'seconds': seconds,
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'edges': sorted(graph.edges()),
+    })
+
+
+def measure(start_url: str, options: dict, target=run) -> dict:
+    """Crawl in a fresh process so peak RSS belongs to this run alone."""
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.get_context('spawn').Process(target=target,
+                                                           args=(child, start_url, options))
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--links', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='Server delay per page in seconds')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--concurrency', type=int, default=256)
+    args = parser.parse_args()
+    
+    configs = {
+        'thread': {'engine': 'thread', 'max_workers': args.workers},
+        'async': {'engine': 'async', 'max_concurrency': args.concurrency},
+    }
+    results = {}
+    with StubSite(args.pages, args.links, latency=args.latency) as site:
+        for name, options in configs.items():
+            results[name] = measure(site.url(), options)
+    
+    print(f"{'engine':<8} {'pages':>7} {'seconds':>8} {'pages/s':>8} {'peak RSS MB':>12}")
+    for name, result in results.items():
+        print(f"{name:<8} {result['pages']:>7} {result['seconds']:>8.2f} "
+              f"{result['pages'] / result['seconds']:>8.1f} {result['rss_mb']:>12.1f}")
+    print(f"identical graphs: {results['thread']['edges'] == results['async']['edges']}")
+
+
+if __name__ == '__main__':
+    main()
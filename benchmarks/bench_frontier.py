@@ -0,0 +1,77 @@
+"""
+Push and pop cost of PriorityFrontier at millions of entries, next to the
+FIFO MemoryFrontier. Each URL is first queued from a random source page and
+then re-added by further links, as the crawler does when in-links grow.
+
+    python benchmarks/bench_frontier.py --sizes 100000 1000000 3000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import MemoryFrontier, PriorityFrontier
+
+
+def workload(size: int, links_per_url: int, seed: int = 0):
+    """(url_id, source) adds: one discovery per URL, then extra in-links."""
+    rng = random.Random(seed)
+    adds = [(url_id, rng.randrange(url_id) if url_id else None) for url_id in range(size)]
+    # Links to popular pages are skewed towards low IDs, like navigation
+    extra = [(int(size * rng.random() ** 3), rng.randrange(size))
+             for _ in range(size * (links_per_url - 1))]
+    return adds, extra
+
+
+def fill(frontier, adds, extra):
+    for url_id, source in adds:
+        frontier.add(url_id, source)
+    for url_id, source in extra:
+        frontier.add(url_id, source)
+
+
+def run(make_frontier, adds, extra) -> dict:
+    frontier = make_frontier()
+    started = time.perf_counter()
+    fill(frontier, adds, extra)
+    push_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    while frontier:
+        frontier.pop()
+    pop_seconds = time.perf_counter() - started
+    # Memory of the filled frontier, measured apart since tracing slows allocation
+    tracemalloc.start()
+    filled = make_frontier()
+    fill(filled, adds, extra)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {'push': push_seconds, 'pop': pop_seconds, 'memory': memory,
+            'stale': getattr(frontier, 'stale_pops', 0)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000, 3000000])
+    parser.add_argument('--links', type=int, default=3, help='Adds per URL')
+    args = parser.parse_args()
+    
+    print(f"{'frontier':<9} {'URLs':>9} {'adds':>9} {'ns/add':>7} {'ns/pop':>7} "
+          f"{'bytes/URL':>10} {'stale pops':>11}")
+    for size in args.sizes:
+        adds, extra = workload(size, args.links)
+        for name, make_frontier in (('memory', MemoryFrontier),
+                                    ('priority', lambda: PriorityFrontier(str))):
+            result = run(make_frontier, adds, extra)
+            total = len(adds) + len(extra)
+            print(f"{name:<9} {size:>9} {total:>9} {1e9 * result['push'] / total:>7.0f} "
+                  f"{1e9 * result['pop'] / size:>7.0f} {result['memory'] / size:>10.1f} "
+                  f"{result['stale']:>11}")
+
+
+if __name__ == '__main__':
+    main()
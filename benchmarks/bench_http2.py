@@ -0,0 +1,53 @@
+"""
+HTTP/2 versus HTTP/1.1 fetching from the same local HTTPS server (hypercorn,
+protocol chosen by ALPN): pages per second and connections opened.
+
+    python benchmarks/bench_http2.py --pages 2000 --latency 0.02 --workers 32
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_engines import measure
+from stub_site import TLSStubSite, resolve_local
+
+
+def run(result_pipe, start_url: str, options: dict):
+    from crawler import WebCrawler
+    logging.getLogger().setLevel(logging.WARNING)
+    crawler = WebCrawler(start_url, rate_limit=0, respect_robots=False,
+                         dns_resolver=resolve_local, **options)
+    started = time.perf_counter()
+    crawler.crawl(resolve=False)
+    result_pipe.send({'pages': len(crawler.visited), 'seconds': time.perf_counter() - started,
+                      **crawler.connection_stats.summary()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='Server delay per page in seconds')
+    parser.add_argument('--workers', type=int, default=32)
+    args = parser.parse_args()
+    
+    print(f"{args.pages} pages, {args.latency * 1000:.0f} ms server latency, "
+          f"{args.workers} workers")
+    print(f"{'protocol':<9} {'pages':>6} {'seconds':>8} {'pages/s':>8} {'connections':>12}")
+    with TLSStubSite(args.pages, latency=args.latency) as site:
+        # Trusted by requests and httpx in the crawl processes
+        os.environ['REQUESTS_CA_BUNDLE'] = os.environ['SSL_CERT_FILE'] = site.ca_file
+        for name, http2 in (('HTTP/1.1', False), ('HTTP/2', True)):
+            result = measure(site.url(), {'max_workers': args.workers, 'http2': http2},
+                             target=run)
+            print(f"{name:<9} {result['pages']:>6} {result['seconds']:>8.2f} "
+                  f"{result['pages'] / result['seconds']:>8.1f} {result['connections']:>12}")
+
+
+if __name__ == '__main__':
+    main()
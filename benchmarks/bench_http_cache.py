@@ -0,0 +1,37 @@
+"""
+Cold versus warm crawl of a local stub site with the HTTP cache: bytes the
+server sent, 304 responses and wall time.
+
+    python benchmarks/bench_http_cache.py --pages 2000 --page-bytes 20000
+"""
+
+import argparse
+import tempfile
+
+from bench_engines import measure
+from stub_site import StubSite
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--page-bytes', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+    
+    print(f"{args.pages} pages of {args.page_bytes} bytes")
+    print(f"{'crawl':<6} {'pages':>6} {'seconds':>8} {'bytes sent':>12} {'304s':>6}")
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            StubSite(args.pages, page_bytes=args.page_bytes) as site:
+        for name in ('cold', 'warm'):
+            before = site.stats()
+            result = measure(site.url(), {'max_workers': args.workers,
+                                          'http_cache_dir': cache_dir})
+            after = site.stats()
+            print(f"{name:<6} {result['pages']:>6} {result['seconds']:>8.2f} "
+                  f"{after['bytes'] - before['bytes']:>12} "
+                  f"{after['not_modified'] - before['not_modified']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark of the link extractors on a corpus of large HTML files.
+Times extract_links (extraction plus normalization) per backend and checks
+that every backend returns the bs4 link list.
+
+    python benchmarks/bench_link_extractors.py                 # generated corpus
+    python benchmarks/bench_link_extractors.py --corpus DIR    # *.html files in DIR
+"""
+
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import LINK_EXTRACTORS, URLNormalizer, extract_links
+
+BASE_URL = 'https://www.example.com/section/page.html'
+
+
+def generated_corpus(count: int, links: int, seed: int = 0):
+    """Pages of nested markup with text, tables, scripts and links of every kind."""
+    rng = random.Random(seed)
+    hrefs = ['/a/{}', 'rel/{}.html', '../up/{}', 'https://shop.example.com/p/{}?id={}',
+             'https://other.org/{}', '#frag{}', '/q?b={}&a={}']
+    pages = []
+    for _ in range(count):
+        parts = ['<!DOCTYPE html><html><head><title>Doc</title>',
+                 '<script>var data = {"k": [1, 2, 3]};</script></head><body>']
+        for i in range(links):
+            href = rng.choice(hrefs).format(rng.randrange(5000), rng.randrange(100))
+            parts.append(f'<div class="row"><p>{"lorem ipsum " * rng.randrange(5, 30)}'
+                         f'<a href="{href}" class="l">link {i}</a></p>'
+                         f'<table><tr><td>{i}</td><td>cell</td></tr></table></div>')
+        parts.append('</body></html>')
+        pages.append(''.join(parts))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', help='Directory of .html files (default: generated)')
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--links', type=int, default=1000, help='Links per generated page')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    if args.corpus:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.corpus, '*.html'))):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+    else:
+        pages = generated_corpus(args.pages, args.links)
+    megabytes = sum(len(page) for page in pages) / 1e6
+    print(f"corpus: {len(pages)} pages, {megabytes:.1f} MB")
+    
+    expected = None
+    print(f"{'backend':<10} {'seconds':>8} {'MB/s':>7} {'pages/s':>8} {'speedup':>8}  same links")
+    baseline = None
+    for name in ('bs4', 'tokenizer', 'lxml'):
+        extractor = LINK_EXTRACTORS[name]()
+        best = float('inf')
+        for _ in range(args.repeat):
+            # A fresh normalizer per run so cache hits do not carry over
+            normalizer = URLNormalizer('www.example.com', 'example.com')
+            started = time.perf_counter()
+            links = [extract_links(page, BASE_URL, normalizer, extractor) for page in pages]
+            best = min(best, time.perf_counter() - started)
+        if expected is None:
+            expected, baseline = links, best
+        print(f"{name:<10} {best:>8.2f} {megabytes / best:>7.1f} {len(pages) / best:>8.1f} "
+              f"{baseline / best:>7.1f}x  {links == expected}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Scaling of the parse stage with parse_workers on a parse-heavy stub site
+(large pages with many links), from in-thread parsing up to N processes.
+
+    python benchmarks/bench_parse_workers.py --processes 1 2 4 8
+"""
+
+import argparse
+import os
+
+from bench_engines import measure
+from stub_site import StubSite
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--links', type=int, default=1500, help='Links per page')
+    parser.add_argument('--workers', type=int, default=16, help='Fetch threads')
+    parser.add_argument('--extractor', default='lxml')
+    parser.add_argument('--processes', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+    
+    print(f"{os.cpu_count()} CPUs, {args.pages} pages of {args.links} links, "
+          f"{args.extractor} extractor")
+    print(f"{'parse_workers':>13} {'seconds':>8} {'pages/s':>8} {'speedup':>8}")
+    baseline = None
+    with StubSite(args.pages, args.links, page_bytes=0) as site:
+        for processes in [0, *args.processes]:
+            result = measure(site.url(), {'max_workers': args.workers,
+                                          'link_extractor': args.extractor,
+                                          'parse_workers': processes})
+            baseline = baseline or result['seconds']
+            label = processes if processes else '0 (threads)'
+            print(f"{label:>13} {result['seconds']:>8.2f} "
+                  f"{result['pages'] / result['seconds']:>8.1f} "
+                  f"{baseline / result['seconds']:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
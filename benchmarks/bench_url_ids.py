@@ -0,0 +1,99 @@
+"""
+Resident memory per URL of the crawl state on a synthetic site: the graph
+and visited set keyed by URL strings, as before URL interning, against
+URLTable IDs with the networkx and compact graph stores. Each variant is
+built in a fresh process, and links are fresh strings per page, as the
+parser returns them.
+
+    python benchmarks/bench_url_ids.py --pages 1000000 --links 3
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import networkx as nx
+
+from crawler import CompactGraph, IDBitSet, URLTable
+
+
+def url(page: int) -> str:
+    return f'https://www{page % 50}.example.com/section-{page % 97}/article/{page}'
+
+
+def links(page: int, pages: int, count: int):
+    """Targets of a page: the next page, a parent and pseudo-random others."""
+    targets = [(page + 1) % pages, page // 2]
+    targets += [(page * 7919 + 104729 * k) % pages for k in range(count - 2)]
+    return [url(target) for target in targets[:count]]
+
+
+def rss() -> int:
+    """Current resident set size in bytes (Linux)."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def build_strings(pages: int, count: int):
+    graph = nx.DiGraph()
+    visited = set()
+    for page in range(pages):
+        source = url(page)
+        visited.add(source)
+        graph.add_node(source)
+        for target in links(page, pages, count):
+            graph.add_edge(source, target)
+    return graph, visited
+
+
+def build_ids(pages: int, count: int, graph):
+    urls = URLTable()
+    visited = IDBitSet()
+    for page in range(pages):
+        source = urls.intern(url(page))
+        visited.add(source)
+        graph.add_node(source)
+        for target in links(page, pages, count):
+            graph.add_edge(source, urls.intern(target))
+    return urls, graph, visited
+
+
+VARIANTS = {
+    'str keys, networkx': build_strings,
+    'IDs, networkx': lambda pages, count: build_ids(pages, count, nx.DiGraph()),
+    'IDs, compact': lambda pages, count: build_ids(pages, count, CompactGraph()),
+}
+
+
+def measure(name: str, pages: int, count: int, results):
+    before = rss()
+    started = time.perf_counter()
+    state = VARIANTS[name](pages, count)
+    results.put((rss() - before, time.perf_counter() - started))
+    del state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=1000000)
+    parser.add_argument('--links', type=int, default=3, help='Links per page (at least 2)')
+    args = parser.parse_args()
+    
+    print(f"{args.pages} pages, {args.links} links per page")
+    print(f"{'crawl state':<20} {'bytes/URL':>10} {'build s':>8}")
+    for name in VARIANTS:
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=measure,
+                                          args=(name, args.pages, args.links, results))
+        process.start()
+        size, seconds = results.get()
+        process.join()
+        print(f"{name:<20} {size / args.pages:>10.0f} {seconds:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Memory and throughput of the visited set: the original set of URL strings,
+a set of interned int IDs, and IDBitSet. Also measures URLTable, which
+holds every URL string once and dominates per-URL memory whichever visited
+set is used.
+
+    python benchmarks/bench_visited.py --urls 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import IDBitSet, URLTable
+
+
+def make_urls(count: int):
+    return [f'https://www.example.com/section-{i % 97}/article/{i}?page={i % 13}'
+            for i in range(count)]
+
+
+def measured(build):
+    """Run build() and return (result, bytes it allocated and kept, seconds)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--urls', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=1000000)
+    args = parser.parse_args()
+    
+    urls = make_urls(args.urls)
+    table, table_bytes, _ = measured(lambda: _fill_table(urls))
+    ids = list(range(args.urls))
+    
+    def fill_bitset():
+        visited = IDBitSet()
+        for url_id in ids:
+            visited.add(url_id)
+        return visited
+    
+    candidates = {
+        'set[str]': lambda: set(urls),
+        'set[int]': lambda: set(range(args.urls)),
+        'IDBitSet': fill_bitset,
+    }
+    rng = random.Random(0)
+    # Half of the lookups hit, half miss
+    probes = [rng.randrange(2 * args.urls) for _ in range(args.lookups)]
+    
+    print(f"{args.urls} URLs, {args.lookups} lookups (50% hits)")
+    print(f"{'visited set':<12} {'bytes/URL':>10} {'adds/s':>10} {'lookups/s':>11}")
+    for name, build in candidates.items():
+        visited, size, seconds = measured(build)
+        probe_keys = ([urls[p] if p < args.urls else f'{urls[p - args.urls]}#miss'
+                       for p in probes] if name == 'set[str]' else probes)
+        started = time.perf_counter()
+        hits = sum(1 for key in probe_keys if key in visited)
+        lookup_seconds = time.perf_counter() - started
+        # set[str] shares the URL strings with the crawler; count only the set
+        print(f"{name:<12} {size / args.urls:>10.2f} {args.urls / seconds:>10.3g} "
+              f"{args.lookups / lookup_seconds:>11.3g}")
+        del visited
+    print(f"{'URLTable':<12} {table_bytes / args.urls:>10.2f}   "
+          f"(strings, index and ID list; paid once per URL in every case)")
+
+
+def _fill_table(urls):
+    table = URLTable()
+    for url in urls:
+        # Copy so the table owns its strings, as it does for parsed links
+        table.intern(''.join(url))
+    return table
+
+
+if __name__ == '__main__':
+    main()
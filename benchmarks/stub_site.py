@@ -0,0 +1,206 @@
+"""
+Generated stub site for the benchmarks, served from its own process so the
+server does not compete with the crawler for the GIL.
+
+Page /p/<n> of a site with N pages links to the next `links` pages modulo N,
+padded to `page_bytes`. With `hosts` > 1, page m lives on host
+h<m % hosts>.site.test and links are absolute; resolve those names with
+resolve_local. Pages carry an ETag and Last-Modified and answer
+conditional requests with 304. GET /__stats returns the request, byte and
+connection counts as JSON.
+"""
+
+import json
+import multiprocessing
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LAST_MODIFIED = 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+
+def resolve_local(host, port, family=0, type=0, proto=0, flags=0):
+    """getaddrinfo-compatible resolver that maps every host name to 127.0.0.1."""
+    return socket.getaddrinfo('127.0.0.1', port, socket.AF_INET, type, proto, flags)
+
+
+def page_href(m: int, hosts: int, port: int) -> str:
+    return f'http://h{m % hosts}.site.test:{port}/p/{m}' if hosts > 1 else f'/p/{m}'
+
+
+def make_page(n: int, pages: int, links: int, page_bytes: int, hosts: int = 1,
+              port: int = 0) -> bytes:
+    targets = [(n + i) % pages for i in range(1, links + 1)]
+    anchors = ''.join(f'<li><a href="{page_href(m, hosts, port)}">page {m}</a></li>'
+                      for m in targets)
+    html = f'<html><head><title>Page {n}</title></head><body><ul>{anchors}</ul>'
+    padding = max(0, page_bytes - len(html) - 20)
+    return (html + f'<p>{"x" * padding}</p></body></html>').encode()
+
+
+def _serve(port_pipe, pages: int, links: int, page_bytes: int, latency: float, hosts: int):
+    stats = {'requests': 0, 'not_modified': 0, 'bytes': 0, 'connections': 0}
+    lock = threading.Lock()
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def setup(self):
+            super().setup()
+            with lock:
+                stats['connections'] += 1
+        
+        def do_GET(self):
+            if self.path == '/__stats':
+                self._send(200, 'application/json', json.dumps(stats).encode(), count=False)
+                return
+            if latency:
+                time.sleep(latency)
+            if not self.path.startswith('/p/') or not self.path[3:].isdigit():
+                self._send(404, 'text/plain', b'not found')
+                return
+            n = int(self.path[3:])
+            etag = f'"{n}"'
+            if self.headers.get('If-None-Match') == etag:
+                with lock:
+                    stats['not_modified'] += 1
+                self._send(304, None, b'', etag=etag)
+                return
+            self._send(200, 'text/html; charset=utf-8',
+                       make_page(n, pages, links, page_bytes, hosts, port),
+                       etag=etag)
+        
+        def _send(self, status, content_type, body, etag=None, count=True):
+            self.send_response(status)
+            if content_type:
+                self.send_header('Content-Type', content_type)
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', LAST_MODIFIED)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            if count:
+                with lock:
+                    stats['requests'] += 1
+                    stats['bytes'] += len(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+    
+    server = Server(('127.0.0.1', 0), Handler)
+    port = server.server_address[1]
+    port_pipe.send(port)
+    server.serve_forever()
+
+
+class StubSite:
+    """Context manager that runs a generated site in a child process."""
+    
+    def __init__(self, pages: int = 2000, links: int = 10, page_bytes: int = 4096,
+                 latency: float = 0.0, hosts: int = 1):
+        self.args = (pages, links, page_bytes, latency, hosts)
+        self.port = None
+        self._process = None
+    
+    def __enter__(self) -> 'StubSite':
+        parent, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(child, *self.args),
+                                                daemon=True)
+        self._process.start()
+        self.port = parent.recv()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._process.terminate()
+        self._process.join()
+    
+    def url(self, path: str = '/p/0', host: str = '127.0.0.1') -> str:
+        return f'http://{host}:{self.port}{path}'
+    
+    def stats(self) -> dict:
+        import requests
+        return requests.get(self.url('/__stats')).json()
+
+
+def _serve_tls(port_pipe, directory: str, pages: int, links: int, page_bytes: int,
+               latency: float):
+    import asyncio
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                else:
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if latency:
+            await asyncio.sleep(latency)
+        path = scope['path']
+        if path.startswith('/p/') and path[3:].isdigit():
+            status, body = 200, make_page(int(path[3:]), pages, links, page_bytes)
+        else:
+            status, body = 404, b'not found'
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/html; charset=utf-8')]})
+        await send({'type': 'http.response.body', 'body': body})
+    
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    config = Config()
+    config.bind = [f'127.0.0.1:{port}']
+    config.certfile = config.keyfile = f'{directory}/server.pem'
+    config.accesslog = config.errorlog = None
+    # Let one h2 connection carry a whole benchmark crawl
+    config.h2_max_concurrent_streams = 1000
+    config.keep_alive_max_requests = 10 ** 9
+    port_pipe.send(port)
+    asyncio.run(serve(app, config))
+
+
+class TLSStubSite(StubSite):
+    """
+    The generated site over HTTPS with hypercorn, negotiating h2 or
+    HTTP/1.1 by ALPN, for www.site.test. Needs hypercorn and trustme;
+    ca_file is the certificate authority clients must trust.
+    """
+    
+    def __enter__(self) -> 'TLSStubSite':
+        import tempfile
+        import trustme
+        self._directory = tempfile.TemporaryDirectory()
+        ca = trustme.CA()
+        self.ca_file = f'{self._directory.name}/ca.pem'
+        ca.cert_pem.write_to_path(self.ca_file)
+        ca.issue_cert('www.site.test').private_key_and_cert_chain_pem.write_to_path(
+            f'{self._directory.name}/server.pem')
+        parent, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve_tls, args=(child, self._directory.name, *self.args[:4]), daemon=True)
+        self._process.start()
+        self.port = parent.recv()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        return self
+    
+    def __exit__(self, *exc_info):
+        super().__exit__(*exc_info)
+        self._directory.cleanup()
+    
+    def url(self, path: str = '/p/0', host: str = 'www.site.test') -> str:
+        return f'https://{host}:{self.port}{path}'
@@ -8,22 +8,58 @@ GitHub: https://github.com/mehrabmahmoudifar
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+import asyncio
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse, urlunparse, parse_qs, urlencode, unquote
+from lxml import etree
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse, urlsplit, urlunparse, parse_qs, urlencode, unquote
 import networkx as nx
+import numpy as np
 import matplotlib.pyplot as plt
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, deque
 import json
 import logging
 import argparse
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import fnmatch
+import functools
+import heapq
+import shutil
+import tempfile
+from array import array
+import re
+import queue
+import socket
+import codecs
+import sqlite3
+import multiprocessing
+import traceback
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor, Future, InvalidStateError,
+                                wait, FIRST_COMPLETED)
 from tqdm import tqdm
-from typing import Set, Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Iterator, Callable, Sequence
 import sys
 import os
 from pyvis.network import Network
 
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for engine="async"
+    aiohttp = None
+
+try:
+    import httpx
+    import httpcore
+except ImportError:  # Optional dependency, only needed for http2=True
+    httpx = httpcore = None
+
 # Logging Configuration
 logging.basicConfig(
     level=logging.INFO,
@@ -35,40 +71,3202 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# ==========================================
-# Section 1: Web Crawler
-# ==========================================
+# ==========================================
+# Section 1: Web Crawler
+# ==========================================
+class UtilizationTracker:
+    """
+    Track the fraction of crawl workers that are busy over time.
+    Updated from the scheduler loop only, so no locking is needed.
+    """
+    
+    def __init__(self, capacity: int, sample_interval: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the tracker.
+        
+        Args:
+            capacity: Number of worker slots (threads or in-flight fetches)
+            sample_interval: Length of each utilization sample in seconds
+            clock: Monotonic time source in seconds, e.g. a fake one for tests
+        """
+        self.capacity = capacity
+        self.sample_interval = sample_interval
+        self.clock = clock
+        self.busy = 0
+        self.samples: List[Tuple[float, float]] = []
+        self._busy_seconds = 0.0
+        self._window_busy = 0.0
+        self._started = None
+        self._last = None
+        self._window_start = None
+    
+    def start(self):
+        """Start the utilization clock."""
+        now = self.clock()
+        self._started = self._last = self._window_start = now
+    
+    def _advance(self, now: float):
+        """Accumulate busy worker-seconds up to now, closing finished sample windows."""
+        while now - self._window_start >= self.sample_interval:
+            window_end = self._window_start + self.sample_interval
+            self._window_busy += self.busy * (window_end - self._last)
+            self._busy_seconds += self.busy * (window_end - self._last)
+            self.samples.append((
+                round(window_end - self._started, 3),
+                self._window_busy / (self.capacity * self.sample_interval)
+            ))
+            self._last = self._window_start = window_end
+            self._window_busy = 0.0
+        
+        self._window_busy += self.busy * (now - self._last)
+        self._busy_seconds += self.busy * (now - self._last)
+        self._last = now
+    
+    def task_started(self):
+        """Record a worker picking up a URL."""
+        self._advance(self.clock())
+        self.busy += 1
+    
+    def task_finished(self):
+        """Record a worker finishing a URL."""
+        self._advance(self.clock())
+        self.busy -= 1
+    
+    def utilization(self) -> float:
+        """Return the overall busy-worker fraction since start()."""
+        if self._started is None:
+            return 0.0
+        now = self.clock()
+        self._advance(now)
+        elapsed = now - self._started
+        if elapsed <= 0:
+            return 0.0
+        return self._busy_seconds / (self.capacity * elapsed)
+    
+    def summary(self) -> Dict:
+        """Return overall utilization and the per-interval samples."""
+        return {
+            'capacity': self.capacity,
+            'utilization': round(self.utilization(), 4),
+            'samples': [(t, round(u, 4)) for t, u in self.samples]
+        }
+
+
+class CrawlBudget:
+    """
+    Limits that end a crawl early: pages, link depth, downloaded bytes, wall
+    time and pages per host.
+    
+    Every check is O(1) and made by the dispatcher. Depth is tracked per URL
+    ID as links are queued, so URLs beyond max_depth never enter the frontier;
+    the other limits are counters compared before each dispatch. Once one is
+    reached no new page is started, while pages already in flight finish and
+    are recorded, so the graph stays consistent.
+    
+    Bytes are only counted as pages download, so with max_bytes the
+    dispatcher also holds back while the pages in flight, at the average
+    page size so far, are expected to use up the rest of the budget; with
+    hundreds of fetches in flight it would otherwise overshoot by as many
+    pages. Pages still downloading when max_bytes runs out, and pages in
+    flight when max_time passes (a hard deadline), are cut off: they are
+    neither recorded nor journaled, so a resumed crawl fetches them again.
+    """
+    
+    LIMITS = ('max_pages', 'max_depth', 'max_bytes', 'max_time', 'max_pages_per_host')
+    # Returned by fetches that the byte or time budget stopped part-way
+    CUT_OFF = object()
+    
+    def __init__(self, max_pages: Optional[int] = None, max_depth: Optional[int] = None,
+                 max_bytes: Optional[int] = None, max_time: Optional[float] = None,
+                 max_pages_per_host: Optional[int] = None):
+        """
+        Initialize the budget; None means unlimited.
+        
+        Args:
+            max_pages: Pages to crawl in total, including pages restored from a checkpoint
+            max_depth: Link distance from the start URL (0 crawls only the start URL)
+            max_bytes: HTML body bytes to download in this run
+            max_time: Seconds of wall time for this run
+            max_pages_per_host: Pages to crawl from any one host
+        """
+        for name, value in (('max_pages', max_pages), ('max_depth', max_depth),
+                            ('max_bytes', max_bytes), ('max_time', max_time),
+                            ('max_pages_per_host', max_pages_per_host)):
+            if value is not None and value < 0:
+                raise ValueError(f"{name} must not be negative, got {value}")
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.max_time = max_time
+        self.max_pages_per_host = max_pages_per_host
+        self.pages = 0
+        self.bytes = 0
+        self.in_flight = 0
+        self.finished = 0
+        self.host_pages: Counter = Counter()
+        self.beyond_depth = 0
+        self.beyond_host_cap = 0
+        self.stop_reason: Optional[str] = None
+        # Per URL ID: depth + 1 (0 = not linked yet)
+        self._depth = array('i')
+        self._bytes_lock = threading.Lock()
+        self._started = None
+    
+    def start(self):
+        """Start the wall-time clock."""
+        self._started = time.monotonic()
+    
+    def elapsed(self) -> float:
+        """Return seconds since start()."""
+        return time.monotonic() - self._started if self._started is not None else 0.0
+    
+    def remaining(self) -> Optional[float]:
+        """Return seconds left before max_time, or None without a time limit."""
+        if self.max_time is None or self._started is None:
+            return None
+        return max(0.0, self.max_time - self.elapsed())
+    
+    def out_of_time(self) -> bool:
+        """Whether max_time has passed; fetches in flight check this to give up early."""
+        if self.remaining() != 0.0:
+            return False
+        if self.stop_reason is None:
+            self.stop_reason = 'max_time'
+        return True
+    
+    def out_of_bytes(self) -> bool:
+        """Whether max_bytes has been downloaded."""
+        return self.max_bytes is not None and self.bytes >= self.max_bytes
+    
+    def set_depth(self, url_id: int, depth: int):
+        """Record the depth of a seed URL."""
+        if url_id >= len(self._depth):
+            self._depth.frombytes(bytes((url_id + 1 - len(self._depth)) * self._depth.itemsize))
+        self._depth[url_id] = depth + 1
+    
+    def link(self, target: int, source: int) -> bool:
+        """
+        Note a link and decide whether its target is within max_depth.
+        
+        The target's depth becomes one more than the source's, unless an
+        earlier link already placed it closer to the start URL.
+        
+        Args:
+            target: ID of the linked URL
+            source: ID of the page that links to it
+        
+        Returns:
+            True if the target may be queued
+        """
+        if self.max_depth is None:
+            return True
+        depth = self.depth(source)
+        return self.reach(target, None if depth is None else depth + 1)
+    
+    def reach(self, target: int, depth: Optional[int]) -> bool:
+        """
+        Note that a URL can be reached at depth, e.g. through a link from
+        another shard, and decide whether it is within max_depth.
+        
+        Args:
+            target: ID of the URL
+            depth: Its distance from the start URL on this path, None if unknown
+        
+        Returns:
+            True if the URL may be queued
+        """
+        if self.max_depth is None:
+            return True
+        if target >= len(self._depth):
+            grow = max(target + 1 - len(self._depth), len(self._depth))
+            self._depth.frombytes(bytes(grow * self._depth.itemsize))
+        known = self._depth[target]
+        if depth is not None and (not known or depth + 1 < known):
+            self._depth[target] = known = depth + 1
+        if known and known - 1 <= self.max_depth:
+            return True
+        self.beyond_depth += 1
+        return False
+    
+    def depth(self, url_id: int) -> Optional[int]:
+        """Return the depth of a URL, or None if unknown or without max_depth."""
+        if self.max_depth is None or url_id >= len(self._depth) or not self._depth[url_id]:
+            return None
+        return self._depth[url_id] - 1
+    
+    def allows_host(self, host: str) -> bool:
+        """Whether host is still under max_pages_per_host; counts refusals."""
+        if self.max_pages_per_host is None or self.host_pages[host] < self.max_pages_per_host:
+            return True
+        self.beyond_host_cap += 1
+        return False
+    
+    def page_started(self, host: Optional[str] = None, fetching: bool = True):
+        """
+        Count a dispatched page.
+        
+        Args:
+            host: Host of the page; only needed with max_pages_per_host
+            fetching: False for pages restored from a checkpoint, which are
+                counted without being fetched
+        """
+        self.pages += 1
+        if host is not None:
+            self.host_pages[host] += 1
+        if fetching:
+            self.in_flight += 1
+    
+    def page_finished(self):
+        """Count the end of a page fetch, whether it succeeded, failed or was cut off."""
+        self.in_flight -= 1
+        self.finished += 1
+    
+    def bytes_committed(self) -> bool:
+        """
+        Whether the pages in flight are expected to download the rest of
+        max_bytes, so another page should not start yet. Until the first
+        page finishes there is no page size to go by and one page at a time
+        is let through.
+        """
+        if self.max_bytes is None or not self.in_flight:
+            return False
+        if not self.finished:
+            return True
+        # Bytes of pages still in flight are counted twice, which errs on the safe side
+        return self.bytes + self.in_flight * self.bytes / self.finished >= self.max_bytes
+    
+    def add_bytes(self, count: int):
+        """Count downloaded body bytes; safe to call from fetch threads."""
+        with self._bytes_lock:
+            self.bytes += count
+    
+    def exhausted(self) -> bool:
+        """
+        Check the page, byte and time limits, recording the first one reached
+        in stop_reason.
+        
+        Returns:
+            True if no further page may be dispatched
+        """
+        if self.stop_reason is None:
+            if self.max_pages is not None and self.pages >= self.max_pages:
+                self.stop_reason = 'max_pages'
+            elif self.out_of_bytes():
+                self.stop_reason = 'max_bytes'
+            else:
+                self.out_of_time()
+        return self.stop_reason is not None
+    
+    def summary(self) -> Dict:
+        """
+        Get the limits and what was spent against them.
+        
+        Returns:
+            Dictionary with the limits, pages, bytes, seconds, stop_reason
+            (None if the crawl ran out of URLs) and the number of links dropped
+            by max_depth and max_pages_per_host
+        """
+        return {
+            **{name: getattr(self, name) for name in self.LIMITS},
+            'pages': self.pages,
+            'bytes': self.bytes,
+            'seconds': round(self.elapsed(), 3),
+            'stop_reason': self.stop_reason,
+            'beyond_depth': self.beyond_depth,
+            'beyond_host_cap': self.beyond_host_cap,
+        }
+
+
+class HostRateLimiter:
+    """
+    Per-host token-bucket rate limiter.
+    
+    Each host gets its own bucket, so independent subdomains are throttled
+    independently. Callers reserve a token under a short lock and then wait
+    outside it, which makes the limiter safe for both threads and coroutines.
+    """
+    
+    def __init__(self, rate: float, burst: int = 1,
+                 host_rules: Optional[Dict[str, Tuple[float, int]]] = None):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            rate: Default requests per second per host (0 disables limiting)
+            burst: Default bucket size, i.e. requests allowed back to back
+            host_rules: Optional {host_pattern: (rate, burst)} overrides, matched with
+                fnmatch in insertion order (e.g. {'shop.example.com': (0.5, 1)})
+        """
+        self.rate = rate
+        self.burst = burst
+        self.host_rules = dict(host_rules or {})
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def _limits_for(self, host: str) -> Tuple[float, int]:
+        """Return the (rate, burst) that applies to a host."""
+        for pattern, limits in self.host_rules.items():
+            if fnmatch.fnmatch(host, pattern):
+                return limits
+        return self.rate, self.burst
+    
+    def reserve(self, host: str) -> float:
+        """
+        Take one token from the host's bucket.
+        
+        Args:
+            host: Host (netloc) the request goes to
+            
+        Returns:
+            Seconds the caller must wait before sending the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self._limits_for(host)
+                # [tokens, last update, rate, burst]
+                bucket = self._buckets[host] = [float(burst), now, rate, burst]
+            
+            tokens, updated, rate, burst = bucket
+            if rate <= 0:
+                return 0.0
+            
+            # Refill, then take a token; a negative balance queues the caller
+            tokens = min(burst, tokens + (now - updated) * rate) - 1
+            bucket[0], bucket[1] = tokens, now
+            return -tokens / rate if tokens < 0 else 0.0
+    
+    def acquire(self, host: str):
+        """Block the calling thread until a request to host is allowed."""
+        delay = self.reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def acquire_async(self, host: str):
+        """Suspend the calling coroutine until a request to host is allowed."""
+        delay = self.reserve(host)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def slow_down(self, host: str, delay: float):
+        """
+        Space requests to host at least delay seconds apart, e.g. for a
+        robots.txt Crawl-delay. Never raises a host's limit.
+        
+        Args:
+            host: Host (netloc) to throttle
+            delay: Minimum seconds between requests
+        """
+        if delay <= 0:
+            return
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self._limits_for(host)
+                bucket = self._buckets[host] = [float(burst), time.monotonic(), rate, burst]
+            rate = 1.0 / delay
+            if bucket[2] <= 0 or rate < bucket[2]:
+                bucket[0], bucket[2], bucket[3] = min(bucket[0], 1.0), rate, 1
+
+
+def parse_retry_after(value: Optional[str], limit: float = 120.0) -> Optional[float]:
+    """
+    Parse a Retry-After header given in seconds or as an HTTP date.
+    
+    Args:
+        value: Raw header value
+        limit: Upper bound on the returned delay in seconds
+        
+    Returns:
+        Delay in seconds, or None if missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0.0), limit)
+
+
+def page_encoding(content_type: Optional[str]) -> str:
+    """
+    Pick the character encoding of an HTML page from its Content-Type header.
+    
+    Both engines decode by this rule, so a page yields the same links either
+    way: the charset parameter if Python knows it, otherwise UTF-8. (requests
+    would fall back to ISO-8859-1 for text/html, aiohttp to UTF-8.) The body
+    is not sniffed, since streamed pages are decoded as they arrive.
+    
+    Args:
+        content_type: Raw Content-Type header value
+        
+    Returns:
+        Codec name
+    """
+    for param in (content_type or '').split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            try:
+                return codecs.lookup(value.strip().strip('"\'')).name
+            except LookupError:
+                break
+    return 'utf-8'
+
+
+class RobotsRules:
+    """
+    The robots.txt rules that apply to this crawler on one host, compiled for
+    fast matching.
+    
+    RFC 9309 lets the longest matching pattern win, with Allow winning ties.
+    Literal patterns go into a dict keyed by pattern, so the longest literal
+    match takes one lookup per distinct pattern length. Patterns with
+    wildcards form a single regex alternation ordered by priority.
+    """
+    
+    def __init__(self, rules: List[Tuple[bool, str]], crawl_delay: Optional[float] = None,
+                 sitemaps: Optional[List[str]] = None):
+        """
+        Compile a list of rules.
+        
+        Args:
+            rules: (allow, pattern) pairs; patterns may use * and a trailing $
+            crawl_delay: Crawl-delay in seconds, if given
+            sitemaps: Sitemap URLs listed in the file
+        """
+        self.crawl_delay = crawl_delay
+        self.sitemaps = sitemaps or []
+        # Highest priority first: longest pattern, then Allow over Disallow
+        rules = sorted(set(rules), key=lambda rule: (len(rule[1]), rule[0]), reverse=True)
+        self._prefixes: Dict[str, bool] = {}
+        self._exact: Dict[str, bool] = {}
+        wildcards = []
+        for allow, pattern in rules:
+            if '*' in pattern:
+                wildcards.append((allow, pattern))
+            elif pattern.endswith('$'):
+                self._exact.setdefault(pattern[:-1], allow)
+            else:
+                self._prefixes.setdefault(pattern, allow)
+        self._lengths = sorted({len(pattern) for pattern in self._prefixes}, reverse=True)
+        # One alternation in priority order: the first alternative that
+        # matches is the best wildcard rule
+        self._wildcard_rules = [(len(pattern), allow) for allow, pattern in wildcards]
+        self._wildcards = re.compile('|'.join(
+            f'({self._translate(pattern)})' for _, pattern in wildcards)) if wildcards else None
+        
+        # Files that allow or disallow everything need no matching at all
+        self._all: Optional[bool] = None
+        if all(allow for allow, _ in rules):
+            self._all = True
+        elif (not any(allow for allow, _ in rules)
+              and {(False, '/'), (False, '*')} & set(rules)):
+            self._all = False
+    
+    @staticmethod
+    def _translate(pattern: str) -> str:
+        """Translate a robots.txt path pattern into an anchored-prefix regex."""
+        end = pattern.endswith('$')
+        if end:
+            pattern = pattern[:-1]
+        regex = '.*'.join(re.escape(part) for part in pattern.split('*'))
+        return regex + r'\Z' if end else regex
+    
+    @classmethod
+    def parse(cls, text: str, user_agent: str = '*') -> 'RobotsRules':
+        """
+        Parse robots.txt, keeping the groups that apply to user_agent.
+        
+        Args:
+            text: File contents
+            user_agent: Product token of this crawler; groups naming it are used
+                instead of the * groups if there are any
+        
+        Returns:
+            Compiled rules
+        """
+        token = user_agent.lower()
+        groups: List[Tuple[List[str], List[Tuple[bool, str]], List[float]]] = []
+        agents: List[str] = []
+        sitemaps = []
+        in_rules = True
+        for line in text.splitlines():
+            key, _, value = line.split('#', 1)[0].partition(':')
+            key, value = key.strip().lower(), value.strip()
+            if key == 'user-agent':
+                if in_rules:
+                    agents = []
+                    groups.append((agents, [], []))
+                    in_rules = False
+                agents.append(value.lower())
+            elif key == 'sitemap':
+                sitemaps.append(value)
+            elif key in ('allow', 'disallow', 'crawl-delay') and groups:
+                in_rules = True
+                if key == 'crawl-delay':
+                    try:
+                        groups[-1][2].append(float(value))
+                    except ValueError:
+                        pass
+                elif value:
+                    if not value.startswith(('/', '*')):
+                        value = '/' + value
+                    groups[-1][1].append((key == 'allow', value))
+        
+        chosen = [group for group in groups if token != '*' and token in group[0]]
+        if not chosen:
+            chosen = [group for group in groups if '*' in group[0]]
+        rules = [rule for group in chosen for rule in group[1]]
+        delays = [delay for group in chosen for delay in group[2]]
+        return cls(rules, max(delays) if delays else None, sitemaps)
+    
+    def allowed(self, path: str) -> bool:
+        """
+        Check a URL path (with its query string) against the rules.
+        
+        Args:
+            path: Path and query of the URL, e.g. '/search?q=x'
+        
+        Returns:
+            True if the crawler may fetch it
+        """
+        if self._all is not None:
+            return self._all
+        best, allow = -1, True
+        for length in self._lengths:
+            if length <= len(path):
+                rule = self._prefixes.get(path[:length])
+                if rule is not None:
+                    best, allow = length, rule
+                    break
+        rule = self._exact.get(path)
+        if rule is not None and (len(path) + 1, rule) > (best, allow):
+            best, allow = len(path) + 1, rule
+        match = self._wildcards.match(path) if self._wildcards else None
+        if match is not None and self._wildcard_rules[match.lastindex - 1] > (best, allow):
+            return self._wildcard_rules[match.lastindex - 1][1]
+        return allow
+
+
+class RobotsPolicy:
+    """
+    Per-origin cache of robots.txt rules with expiry.
+    
+    The crawler fetches each origin's robots.txt once, before its first page,
+    and consults the cached rules whenever it takes a URL off the frontier.
+    Origins not loaded yet (or expired) are reported as allowed, so callers
+    check loaded() first when they can fetch the file.
+    """
+    
+    MAX_SIZE = 500 * 1024
+    
+    def __init__(self, user_agent: str = '*', ttl: float = 24 * 3600.0,
+                 error_ttl: float = 600.0):
+        """
+        Initialize an empty policy.
+        
+        Args:
+            user_agent: Product token matched against User-agent lines
+            ttl: Seconds to keep a fetched robots.txt
+            error_ttl: Seconds to keep the disallow-all policy of an origin
+                whose robots.txt could not be fetched (5xx or network error)
+        """
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._lock = threading.Lock()
+        # origin -> (expiry, rules)
+        self._origins: Dict[str, Tuple[float, RobotsRules]] = {}
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self.fetched = 0
+        self.blocked = 0
+    
+    @staticmethod
+    def split(url: str) -> Tuple[str, str]:
+        """
+        Split an absolute URL into its origin and the path that rules match.
+        Cheaper than urlsplit, which matters when checking every link.
+        
+        Args:
+            url: Absolute URL
+        
+        Returns:
+            Tuple of (lowercased 'scheme://netloc', path with query string)
+        """
+        start = url.find('//') + 2
+        end = len(url)
+        for separator in '/?#':
+            index = url.find(separator, start, end)
+            if index != -1:
+                end = index
+        path = url[end:].split('#', 1)[0]
+        if not path.startswith('/'):
+            path = '/' + path
+        return url[:end].lower(), path
+    
+    @classmethod
+    def origin(cls, url: str) -> str:
+        """Return 'scheme://netloc' of url, the scope of one robots.txt."""
+        return cls.split(url)[0]
+    
+    def loaded(self, origin: str) -> bool:
+        """Whether origin has unexpired rules."""
+        entry = self._origins.get(origin)
+        return entry is not None and entry[0] > time.monotonic()
+    
+    def fetch_lock(self, origin: str) -> threading.Lock:
+        """Lock that threads hold while fetching origin's robots.txt."""
+        with self._lock:
+            return self._fetch_locks.setdefault(origin, threading.Lock())
+    
+    def load(self, origin: str, status: Optional[int], body: bytes = b'') -> RobotsRules:
+        """
+        Store the rules for origin from a robots.txt response.
+        
+        Args:
+            origin: 'scheme://netloc' the file was fetched from
+            status: Final HTTP status, or None if the fetch failed
+            body: Response body
+        
+        Returns:
+            The stored rules: parsed for 2xx, allow-all for other 4xx, and
+            disallow-all for 5xx, 429 and network errors (RFC 9309)
+        """
+        ttl = self.ttl
+        if status is not None and 200 <= status < 300:
+            rules = RobotsRules.parse(body[:self.MAX_SIZE].decode('utf-8', errors='replace'),
+                                      self.user_agent)
+        elif status is not None and 400 <= status < 500 and status != 429:
+            rules = RobotsRules([])
+        else:
+            rules = RobotsRules([(False, '/')])
+            ttl = self.error_ttl
+            logger.warning(f"robots.txt of {origin} unavailable ({status or 'network error'}); "
+                           f"not crawling it for {ttl:.0f}s")
+        with self._lock:
+            self._origins[origin] = (time.monotonic() + ttl, rules)
+            self.fetched += 1
+        return rules
+    
+    def sitemaps(self, origin: str) -> List[str]:
+        """Return the Sitemap URLs listed in origin's cached robots.txt."""
+        entry = self._origins.get(origin)
+        return list(entry[1].sitemaps) if entry else []
+    
+    def allowed(self, url: str) -> bool:
+        """
+        Check url against its origin's cached rules.
+        
+        Args:
+            url: Absolute URL
+        
+        Returns:
+            False if the cached rules disallow url; True otherwise, including
+            for origins that are not loaded
+        """
+        origin, path = self.split(url)
+        entry = self._origins.get(origin)
+        if entry is None:
+            return True
+        if entry[1].allowed(path) or path == '/robots.txt':
+            return True
+        with self._lock:
+            self.blocked += 1
+        return False
+
+
+_LASTMOD_RE = re.compile(r'(\d{4})(?:-(\d\d)(?:-(\d\d)(?:[T ](\d\d):(\d\d)'
+                         r'(?::(\d\d)(?:\.\d+)?)?)?)?)?\s*(Z|[+-]\d\d:?\d\d)?\Z')
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[int]:
+    """
+    Parse a sitemap <lastmod>, a W3C datetime such as '2024-05-01' or
+    '2024-05-01T12:30:00+02:00'.
+    
+    Args:
+        value: Raw element text
+        
+    Returns:
+        Unix timestamp in seconds (midnight UTC for dates without a time),
+        or None if missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        # Fast path for the common full forms; Python < 3.11 rejects a 'Z' suffix
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return int(moment.timestamp())
+    except ValueError:
+        pass
+    match = _LASTMOD_RE.match(value)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, zone = match.groups()
+    try:
+        moment = datetime(int(year), int(month or 1), int(day or 1), int(hour or 0),
+                          int(minute or 0), int(second or 0), tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    if zone and zone != 'Z':
+        offset = timedelta(hours=int(zone[1:3]), minutes=int(zone[-2:]))
+        moment -= offset if zone[0] == '+' else -offset
+    return int(moment.timestamp())
+
+
+class _SitemapTarget:
+    """lxml parser target that keeps the <loc> and <lastmod> of sitemap entries."""
+    
+    # Element depth of <url> / <sitemap> and of their <loc> / <lastmod>;
+    # deeper elements such as <image:loc> belong to extensions
+    ENTRY_DEPTH = 2
+    
+    def __init__(self):
+        self.urls: List[Tuple[str, Optional[str]]] = []
+        self.sitemaps: List[str] = []
+        self._depth = 0
+        self._field: Optional[str] = None
+        self._text: List[str] = []
+        self._entry: Dict[str, str] = {}
+    
+    def start(self, tag, attrib):
+        self._depth += 1
+        if self._depth == self.ENTRY_DEPTH + 1:
+            name = tag[tag.rfind('}') + 1:]
+            if name in ('loc', 'lastmod'):
+                self._field = name
+                self._text = []
+    
+    def end(self, tag):
+        self._depth -= 1
+        if self._field is not None and self._depth == self.ENTRY_DEPTH:
+            self._entry[self._field] = ''.join(self._text).strip()
+            self._field = None
+        elif self._depth == self.ENTRY_DEPTH - 1:
+            loc = self._entry.get('loc')
+            if loc:
+                if tag[tag.rfind('}') + 1:] == 'sitemap':
+                    self.sitemaps.append(loc)
+                else:
+                    self.urls.append((loc, self._entry.get('lastmod')))
+            self._entry = {}
+    
+    def data(self, data):
+        if self._field is not None:
+            self._text.append(data)
+    
+    def close(self):
+        pass
+
+
+class SitemapStream:
+    """
+    Incremental parser of one sitemap, sitemap index or plain-text sitemap.
+    
+    Bytes are fed as they download and the page entries completed so far are
+    handed back, so a caller can queue URLs while the rest of the file is
+    still arriving. Gzipped files are recognized by their magic number, not
+    by URL or Content-Type, and inflated in bounded steps; XML goes through
+    an lxml parser target that builds no tree. Memory therefore stays
+    constant whatever the size of the file. Input beyond max_size
+    decompressed bytes or max_urls page entries is ignored, which also
+    defuses gzip bombs.
+    """
+    
+    # Limits of the sitemap protocol for one uncompressed file
+    MAX_SIZE = 50 * 1024 * 1024
+    MAX_URLS = 50000
+    INFLATE_SIZE = 256 * 1024
+    
+    def __init__(self, max_size: int = MAX_SIZE, max_urls: int = MAX_URLS):
+        """
+        Initialize the stream.
+        
+        Args:
+            max_size: Decompressed bytes to parse
+            max_urls: Page entries to return
+        """
+        self.max_size = max_size
+        self.max_urls = max_urls
+        self.size = 0
+        self.entries = 0
+        self.truncated = False
+        self._head = b''
+        self._inflater = None
+        self._target = _SitemapTarget()
+        self._parser: Optional[etree.XMLParser] = None
+        # Unfinished last line of a plain-text sitemap (None until sniffed)
+        self._line: Optional[bytes] = None
+    
+    @property
+    def sitemaps(self) -> List[str]:
+        """URLs of the child sitemaps listed so far, if this is a sitemap index."""
+        return self._target.sitemaps
+    
+    def feed(self, chunk: bytes) -> List[Tuple[str, Optional[str]]]:
+        """
+        Parse the next chunk of the file.
+        
+        Args:
+            chunk: Bytes as received
+        
+        Returns:
+            (loc, lastmod) pairs of the page entries completed by this chunk;
+            lastmod is the raw text or None
+        """
+        if self._head is not None:
+            self._head += chunk
+            if len(self._head) < 2:
+                return []
+            chunk, self._head = self._head, None
+            if chunk.startswith(b'\x1f\x8b'):
+                self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._inflater is None:
+            self._parse(chunk)
+        else:
+            while chunk and not self.truncated:
+                self._parse(self._inflater.decompress(chunk, self.INFLATE_SIZE))
+                chunk = self._inflater.unconsumed_tail
+        return self._drain()
+    
+    def close(self) -> List[Tuple[str, Optional[str]]]:
+        """
+        Finish parsing.
+        
+        Returns:
+            The page entries not returned by feed() yet
+        """
+        if self._head:
+            self._parse(self._head)
+        self._head = None
+        if self._inflater is not None and not self.truncated:
+            self._parse(self._inflater.flush())
+        if self._parser is not None:
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError:
+                # The document was cut off at max_size
+                if not self.truncated:
+                    raise
+        elif self._line:
+            self._add_line(self._line)
+        return self._drain()
+    
+    def _parse(self, data: bytes):
+        """Parse decompressed bytes, sniffing XML or plain text from the first ones."""
+        if self.truncated or not data:
+            return
+        if self.size + len(data) > self.max_size:
+            data = data[:self.max_size - self.size]
+            self.truncated = True
+        self.size += len(data)
+        if self._parser is None and self._line is None:
+            data = data.lstrip(b'\xef\xbb\xbf \t\r\n')
+            if not data:
+                return
+            if data.startswith(b'<'):
+                self._parser = etree.XMLParser(target=self._target, resolve_entities=False,
+                                               no_network=True)
+            else:
+                self._line = b''
+        if self._parser is not None:
+            self._parser.feed(data)
+        else:
+            lines = (self._line + data).split(b'\n')
+            self._line = lines.pop()
+            for line in lines:
+                self._add_line(line)
+    
+    def _add_line(self, line: bytes):
+        """Take one URL from a plain-text sitemap."""
+        url = line.strip().decode('utf-8', errors='replace')
+        if url.startswith(('http://', 'https://')):
+            self._target.urls.append((url, None))
+    
+    def _drain(self) -> List[Tuple[str, Optional[str]]]:
+        """Hand over the page entries collected so far, up to max_urls in all."""
+        urls, self._target.urls = self._target.urls, []
+        if self.entries + len(urls) > self.max_urls:
+            urls = urls[:self.max_urls - self.entries]
+            self.truncated = True
+        self.entries += len(urls)
+        return urls
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller for per-host request concurrency.
+    
+    Every host starts at a small concurrency limit. After each window of
+    responses the limit grows by one if p95 latency and the 429/503 rate are
+    within bounds, and is cut multiplicatively otherwise. A 429/503 response
+    triggers an immediate cut, and its Retry-After pauses the host entirely.
+    """
+    
+    THROTTLE_STATUSES = (429, 503)
+    
+    def __init__(self, max_limit: int, initial_limit: int = 2, min_limit: int = 1,
+                 target_latency: float = 2.0, max_error_rate: float = 0.05,
+                 window: int = 20, decrease_factor: float = 0.5):
+        """
+        Initialize the controller.
+        
+        Args:
+            max_limit: Upper bound on concurrent requests per host
+            initial_limit: Concurrency every host starts with
+            min_limit: Lower bound on concurrent requests per host
+            target_latency: p95 response time in seconds above which we back off
+            max_error_rate: Fraction of 429/503/failed responses above which we back off
+            window: Number of responses per evaluation window
+            decrease_factor: Multiplier applied to the limit when backing off
+        """
+        self.max_limit = max_limit
+        self.initial_limit = min(initial_limit, max_limit)
+        self.min_limit = min_limit
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.decrease_factor = decrease_factor
+        self._hosts: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+    
+    def _state(self, host: str) -> Dict:
+        """Return the mutable state for a host, creating it on first use."""
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                'limit': float(self.initial_limit),
+                'in_flight': 0,
+                'latencies': [],
+                'errors': 0,
+                'since_decrease': 0,
+                'resume_at': 0.0
+            }
+        return state
+    
+    def try_acquire(self, host: str) -> bool:
+        """
+        Claim a concurrency slot for host if one is free.
+        
+        Args:
+            host: Host (netloc) of the URL about to be fetched
+            
+        Returns:
+            True if the caller may dispatch a request to host
+        """
+        with self._lock:
+            state = self._state(host)
+            if time.monotonic() < state['resume_at']:
+                return False
+            if state['in_flight'] >= int(state['limit']):
+                return False
+            state['in_flight'] += 1
+            return True
+    
+    def release(self, host: str):
+        """Return a slot claimed with try_acquire."""
+        with self._lock:
+            self._state(host)['in_flight'] -= 1
+    
+    def _decrease(self, state: Dict):
+        """Cut the limit, at most once per limit's worth of responses."""
+        if state['since_decrease'] >= int(state['limit']):
+            state['limit'] = max(float(self.min_limit), state['limit'] * self.decrease_factor)
+            state['since_decrease'] = 0
+    
+    def record(self, host: str, latency: float, status: Optional[int],
+               retry_after: Optional[float] = None):
+        """
+        Feed one response into the controller.
+        
+        Args:
+            host: Host the request went to
+            latency: Response time in seconds
+            status: HTTP status code, or None if the request failed
+            retry_after: Parsed Retry-After delay in seconds, if any
+        """
+        with self._lock:
+            state = self._state(host)
+            state['latencies'].append(latency)
+            state['since_decrease'] += 1
+            
+            throttled = status in self.THROTTLE_STATUSES
+            if throttled or status is None:
+                state['errors'] += 1
+            if throttled:
+                self._decrease(state)
+                if retry_after:
+                    state['resume_at'] = max(state['resume_at'], time.monotonic() + retry_after)
+            
+            if len(state['latencies']) < self.window:
+                return
+            
+            # Evaluate the completed window
+            latencies = sorted(state['latencies'])
+            p95 = latencies[int(0.95 * (len(latencies) - 1))]
+            error_rate = state['errors'] / len(latencies)
+            state['latencies'] = []
+            state['errors'] = 0
+            
+            if p95 > self.target_latency or error_rate > self.max_error_rate:
+                self._decrease(state)
+            else:
+                state['limit'] = min(float(self.max_limit), state['limit'] + 1)
+    
+    def limit(self, host: str) -> int:
+        """Return the current concurrency limit for host."""
+        with self._lock:
+            return int(self._state(host)['limit'])
+    
+    def stats(self) -> Dict[str, Dict]:
+        """Return the current limit and in-flight count per host."""
+        with self._lock:
+            return {
+                host: {'limit': int(state['limit']), 'in_flight': state['in_flight']}
+                for host, state in self._hosts.items()
+            }
+
+
+class LinkExtractor:
+    """
+    Base class for HTML link extraction backends.
+    
+    Backends only locate raw href values; resolving and normalizing them is
+    left to the crawler so every backend yields the same link list.
+    """
+    
+    name = ''
+    
+    def extract(self, html: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Find the document base and anchor targets.
+        
+        Args:
+            html: HTML content
+            
+        Returns:
+            Tuple of (href of the first <base href>, or None; list of <a href> values)
+        """
+        raise NotImplementedError
+
+    def incremental(self):
+        """
+        Create a parser that takes the document in pieces, if the backend can.
+        
+        Returns:
+            Tuple of (state, feed, close): feed(text) parses the next piece,
+            close() finishes the document, and state exposes base_href, hrefs
+            and in_body as parsing progresses. None if the backend needs the
+            whole document.
+        """
+        return None
+
+
+class BeautifulSoupLinkExtractor(LinkExtractor):
+    """Reference backend building a full BeautifulSoup tree with 'html.parser'."""
+    
+    name = 'bs4'
+    
+    def extract(self, html: str) -> Tuple[Optional[str], List[str]]:
+        soup = BeautifulSoup(html, 'html.parser')
+        base_tag = soup.find('base', href=True)
+        base_href = base_tag['href'] if base_tag else None
+        return base_href, [tag['href'] for tag in soup.find_all('a', href=True)]
+
+
+class _LinkTarget:
+    """lxml parser target that keeps only <base href> and <a href>."""
+    
+    def __init__(self):
+        self.base_href = None
+        self.hrefs = []
+        self.in_body = False
+    
+    def start(self, tag, attrib):
+        if tag == 'a':
+            href = attrib.get('href')
+            if href is not None:
+                self.hrefs.append(href)
+        elif tag == 'base' and self.base_href is None:
+            self.base_href = attrib.get('href')
+        elif tag == 'body':
+            self.in_body = True
+    
+    def end(self, tag):
+        pass
+    
+    def data(self, data):
+        pass
+    
+    def close(self):
+        return self.base_href, self.hrefs
+
+
+class LxmlLinkExtractor(LinkExtractor):
+    """
+    Fast backend streaming libxml2 parse events into a target, no tree is built.
+    Differs from bs4 only on malformed markup: for duplicate href attributes the
+    first wins, and markup inside <title>/<textarea> is treated as text.
+    """
+    
+    name = 'lxml'
+    
+    def extract(self, html: str) -> Tuple[Optional[str], List[str]]:
+        if not html:
+            return None, []
+        parser = etree.HTMLParser(target=_LinkTarget())
+        parser.feed(html)
+        return parser.close()
+
+    def incremental(self):
+        target = _LinkTarget()
+        parser = etree.HTMLParser(target=target)
+        return target, parser.feed, parser.close
+
+
+class _LinkTokenizer(HTMLParser):
+    """Standard library tokenizer that only inspects <a> and <base> start tags."""
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.base_href = None
+        self.hrefs = []
+        self.in_body = False
+    
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a' and tag != 'base':
+            if tag == 'body':
+                self.in_body = True
+            return
+        # Last duplicate attribute wins, as in BeautifulSoup
+        href = None
+        for name, value in attrs:
+            if name == 'href':
+                href = value or ''
+        if href is None:
+            return
+        if tag == 'a':
+            self.hrefs.append(href)
+        elif self.base_href is None:
+            self.base_href = href
+
+
+class TokenizerLinkExtractor(LinkExtractor):
+    """Pure-Python backend on html.parser's tokenizer, without tree building."""
+    
+    name = 'tokenizer'
+    
+    def extract(self, html: str) -> Tuple[Optional[str], List[str]]:
+        tokenizer = _LinkTokenizer()
+        tokenizer.feed(html)
+        tokenizer.close()
+        return tokenizer.base_href, tokenizer.hrefs
+
+    def incremental(self):
+        tokenizer = _LinkTokenizer()
+        return tokenizer, tokenizer.feed, tokenizer.close
+
+
+LINK_EXTRACTORS = {
+    extractor.name: extractor
+    for extractor in (LxmlLinkExtractor, TokenizerLinkExtractor, BeautifulSoupLinkExtractor)
+}
+
+
+class URLNormalizer:
+    """
+    Normalize and validate URLs against the crawled domain.
+    
+    Query parameters are sorted, and parameters whose name matches one of the
+    strip_params patterns (tracking and session IDs by default) are dropped,
+    from the query as well as from ;name=value path parameters.
+    
+    Results are memoized in a bounded LRU keyed on (base, href), where base is
+    reduced to the part of the page URL that can affect resolution: nothing for
+    absolute hrefs, the origin for root-relative ones, the directory for
+    relative paths. Navigation links repeated on every page therefore hit the
+    cache. Holds no crawl state, so it can be shipped to parser processes.
+    """
+    
+    # Precompiled split of a URL into scheme, authority and path
+    _SCHEME_RE = re.compile(r'[a-zA-Z][a-zA-Z0-9+.-]*:')
+    _BASE_RE = re.compile(r'([a-zA-Z][a-zA-Z0-9+.-]*:)?(//[^/?#]*)?([^?#]*)(\?[^#]*)?')
+    _SKIP_PREFIXES = ('javascript:', 'mailto:', 'tel:', 'data:', '#')
+    # Tracking and session parameters that never select different content
+    DEFAULT_STRIP_PARAMS = ('utm_*', 'gclid', 'fbclid', 'msclkid', 'mc_eid', '_ga',
+                            'phpsessid', 'jsessionid', 'aspsessionid*', 'sessionid', 'session_id')
+    
+    def __init__(self, domain: str, base_domain: str, cache_size: int = 65536,
+                 strip_params: Optional[Sequence[str]] = None):
+        """
+        Initialize the normalizer.
+        
+        Args:
+            domain: Domain (netloc) of the start URL
+            base_domain: Registered domain whose subdomains count as internal
+            cache_size: Maximum number of memoized (base, href) entries
+            strip_params: Case-insensitive fnmatch patterns of parameter names to
+                drop (default: DEFAULT_STRIP_PARAMS; empty keeps every parameter)
+        """
+        self.domain = domain.lower()
+        self.base_domain = base_domain.lower()
+        self.cache_size = cache_size
+        self.strip_params = tuple(self.DEFAULT_STRIP_PARAMS if strip_params is None
+                                  else strip_params)
+        self._strip_re = (re.compile('|'.join(fnmatch.translate(pattern.lower())
+                                              for pattern in self.strip_params))
+                          if self.strip_params else None)
+        self._build_cache()
+    
+    def _build_cache(self):
+        """Wrap the uncached normalizer in a fresh LRU cache."""
+        self._cached = functools.lru_cache(maxsize=self.cache_size)(self._normalize)
+    
+    def __getstate__(self):
+        # The LRU wrapper is not picklable; each process builds its own
+        state = self.__dict__.copy()
+        del state['_cached']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_cache()
+    
+    def _resolution_base(self, href: str, base_url: str) -> Optional[str]:
+        """
+        Reduce base_url to the part that urljoin actually uses for href.
+        
+        Args:
+            href: Stripped href value
+            base_url: Page URL the href appeared on
+            
+        Returns:
+            Equivalent base for resolving href, or None if href is absolute
+        """
+        if not base_url or self._SCHEME_RE.match(href):
+            return None
+        scheme, authority, path, query = self._BASE_RE.match(base_url).groups()
+        scheme = scheme or ''
+        if href.startswith('//'):
+            return scheme
+        authority = authority or ''
+        if href.startswith('/'):
+            return scheme + authority
+        if href.startswith('?'):
+            return scheme + authority + path
+        if not href:
+            return scheme + authority + path + (query or '')
+        return scheme + authority + path[:path.rfind('/') + 1]
+    
+    def normalize(self, url: str, base_url: str = None, cache: bool = True) -> Optional[str]:
+        """
+        Normalize and validate a URL.
+        
+        Args:
+            url: The URL to normalize
+            base_url: Base URL for resolving relative URLs
+            cache: Memoize the result; URLs seen only once, such as sitemap
+                entries, skip the LRU so they do not evict navigation links
+            
+        Returns:
+            Normalized URL or None if invalid
+        """
+        try:
+            url = url.strip()
+            # Skip non-HTTP protocols
+            if url.startswith(self._SKIP_PREFIXES):
+                return None
+            if not cache:
+                return self._normalize(url, self._resolution_base(url, base_url))
+            return self._cached(url, self._resolution_base(url, base_url))
+        except Exception:
+            return None
+    
+    def cache_stats(self) -> Dict:
+        """Return LRU hits, misses, current size and hit rate."""
+        info = self._cached.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'hit_rate': info.hits / lookups if lookups else 0.0
+        }
+    
+    def _normalize(self, url: str, base_url: Optional[str]) -> Optional[str]:
+        """Uncached normalization of a stripped, non-skipped URL."""
+        try:
+            # Resolve relative URLs
+            if base_url:
+                url = urljoin(base_url, url)
+            
+            parsed = urlparse(url)
+            
+            # Only HTTP/HTTPS allowed
+            if parsed.scheme not in ('http', 'https'):
+                return None
+            
+            # Only internal URLs (netloc is already parsed, skip is_internal)
+            url_domain = parsed.netloc.lower()
+            if url_domain != self.domain and not url_domain.endswith('.' + self.base_domain):
+                return None
+            
+            if not parsed.query and not parsed.params:
+                # Nothing to sort or strip: skip the query round trip
+                normalized = f"{parsed.scheme}://{url_domain}{parsed.path or '/'}"
+                if normalized.endswith('/') and normalized.count('/') > 3:
+                    normalized = normalized[:-1]
+                return normalized
+            
+            # Normalize query parameters
+            query_params = parse_qs(parsed.query, keep_blank_values=True)
+            params = parsed.params
+            if self._strip_re is not None:
+                strip = self._strip_re.match
+                query_params = {name: values for name, values in query_params.items()
+                                if not strip(name.lower())}
+                if params:
+                    params = ';'.join(param for param in params.split(';')
+                                      if not strip(param.split('=', 1)[0].lower()))
+            sorted_query = urlencode(sorted(query_params.items()), doseq=True)
+            
+            # Reconstruct normalized URL
+            normalized = urlunparse((
+                parsed.scheme,
+                url_domain,
+                parsed.path or '/',
+                params,
+                sorted_query,
+                ''
+            ))
+            
+            # Remove trailing slash except for root
+            if normalized.endswith('/') and normalized.count('/') > 3:
+                normalized = normalized[:-1]
+            
+            return normalized
+        except Exception:
+            return None
+    
+    def is_internal(self, url: str) -> bool:
+        """Check if URL belongs to the same domain."""
+        try:
+            parsed = urlparse(url)
+            url_domain = parsed.netloc.lower()
+            return (url_domain == self.domain or 
+                    url_domain.endswith('.' + self.base_domain))
+        except:
+            return False
+
+
+class TrapDetector:
+    """
+    Online detection of crawler traps: URL spaces that never run out, such as
+    calendars, session IDs, sort and filter permutations, or relative links
+    that keep appending path segments.
+    
+    Every URL is classified once, when it is first linked, and the verdict is
+    kept in a one-byte-per-ID table, so later links to it cost O(1). A new URL
+    is a trap if
+    
+    - a path segment occurs more than max_segment_repeats times (/a/b/a/b/a/b),
+    - its path template, the host and path with digit runs collapsed to '#'
+      plus the names of its query parameters, already has max_template_urls
+      URLs (/calendar/#/#?view), or
+    - a query parameter has a value other than the first max_param_values seen
+      for that parameter on the same path (session IDs, sort orders).
+    
+    The URLs seen before a limit was reached are kept, so the part of a trap
+    that was already crawled stays in the graph. A limit of None disables
+    that check.
+    """
+    
+    LIMITS = ('max_template_urls', 'max_param_values', 'max_segment_repeats')
+    
+    _DIGITS_RE = re.compile(r'\d+')
+    
+    def __init__(self, max_template_urls: Optional[int] = 10000,
+                 max_param_values: Optional[int] = 1000,
+                 max_segment_repeats: Optional[int] = 2):
+        """
+        Initialize the detector.
+        
+        Args:
+            max_template_urls: URLs allowed per path template
+            max_param_values: Distinct values allowed per query parameter and path
+            max_segment_repeats: Occurrences allowed of one segment in a path
+        """
+        self.max_template_urls = max_template_urls
+        self.max_param_values = max_param_values
+        self.max_segment_repeats = max_segment_repeats
+        # Per URL ID: 0 = not classified, 1 = allowed, 2 = trap
+        self._verdicts = bytearray()
+        self._templates: Counter = Counter()
+        self._values: Dict[Tuple[str, str], set] = {}
+        self.checked = 0
+        # Trap description -> URLs pruned
+        self.pruned: Counter = Counter()
+    
+    def allows(self, url_id: int, url: str) -> bool:
+        """
+        Check whether a URL may be crawled, classifying it on first sight.
+        
+        Args:
+            url_id: ID of the URL in the crawler's URLTable
+            url: The normalized URL
+        
+        Returns:
+            False if the URL belongs to a detected trap
+        """
+        if url_id < len(self._verdicts):
+            verdict = self._verdicts[url_id]
+            if verdict:
+                return verdict == 1
+        else:
+            self._verdicts.extend(bytes(max(url_id + 1 - len(self._verdicts),
+                                            len(self._verdicts))))
+        self.checked += 1
+        trap = self.classify(url)
+        if trap is None:
+            self._verdicts[url_id] = 1
+            return True
+        self._verdicts[url_id] = 2
+        self.pruned[trap] += 1
+        return False
+    
+    def exempt(self, url_id: int):
+        """
+        Always allow a URL, without counting it against any template or
+        parameter; used for URLs the site lists in its sitemaps.
+        
+        Args:
+            url_id: ID of the URL in the crawler's URLTable
+        """
+        if url_id >= len(self._verdicts):
+            self._verdicts.extend(bytes(max(url_id + 1 - len(self._verdicts),
+                                            len(self._verdicts))))
+        self._verdicts[url_id] = 1
+    
+    def classify(self, url: str) -> Optional[str]:
+        """
+        Classify a URL not seen before and count it if it is allowed.
+        
+        Args:
+            url: The normalized URL
+        
+        Returns:
+            Description of the trap the URL falls into, or None
+        """
+        _, host, path, query, _ = urlsplit(url)
+        if self.max_segment_repeats is not None:
+            segments = [segment for segment in path.split('/') if segment]
+            if (len(segments) > self.max_segment_repeats
+                    and len(set(segments)) <= len(segments) - self.max_segment_repeats):
+                segment, count = Counter(segments).most_common(1)[0]
+                if count > self.max_segment_repeats:
+                    return f"repeated segment {segment!r} on {host}"
+        
+        pairs = [pair.partition('=')[::2] for pair in query.split('&')] if query else []
+        template = host + self._DIGITS_RE.sub('#', path)
+        if pairs:
+            template += '?' + '&'.join(sorted({name for name, _ in pairs}))
+        if (self.max_template_urls is not None
+                and self._templates[template] >= self.max_template_urls):
+            return f"template {template}"
+        
+        new_values = []
+        if self.max_param_values is not None:
+            for name, value in pairs:
+                values = self._values.setdefault((host + path, name), set())
+                if value not in values:
+                    if len(values) >= self.max_param_values:
+                        return f"parameter {name} on {host}{path}"
+                    new_values.append((values, value))
+        
+        self._templates[template] += 1
+        for values, value in new_values:
+            values.add(value)
+        return None
+    
+    def stats(self, top: int = 10) -> Dict:
+        """
+        Get detection metrics.
+        
+        Args:
+            top: Number of traps to list
+        
+        Returns:
+            Dictionary with URLs checked, URLs pruned, the number of traps and
+            the top traps as (description, URLs pruned) pairs
+        """
+        return {
+            'checked': self.checked,
+            'pruned': sum(self.pruned.values()),
+            'traps': len(self.pruned),
+            'top': self.pruned.most_common(top),
+        }
+
+
+def extract_links(html: str, base_url: str, normalizer: URLNormalizer,
+                  extractor: LinkExtractor) -> List[str]:
+    """
+    Extract and normalize all links from HTML content.
+    
+    Args:
+        html: HTML content
+        base_url: Base URL for resolving relative links
+        normalizer: Normalizer applied to every href
+        extractor: Backend locating <base> and <a> hrefs
+        
+    Returns:
+        List of normalized URLs, excluding links back to the page itself
+    """
+    links = []
+    page_url = normalizer.normalize(base_url)
+    try:
+        base_href, hrefs = extractor.extract(html)
+        
+        # Check for base tag
+        if base_href is not None:
+            base_url = urljoin(base_url, base_href)
+        
+        # Normalize all anchors (every internal link becomes an edge,
+        # regardless of whether its target has been visited yet)
+        for href in hrefs:
+            normalized = normalizer.normalize(href, base_url)
+            if normalized and normalized != page_url:
+                links.append(normalized)
+    except Exception:
+        pass
+    
+    return links
+
+
+class LinkStream:
+    """
+    Incremental link extraction for a page that is still downloading.
+    
+    Body chunks are decoded and fed to the extractor's incremental parser as
+    they arrive. Once the document base is settled, by <base href> or the
+    start of <body>, each href is normalized right away and passed to
+    on_links, so the crawler can queue it before the download completes.
+    Only the parser state and the link list are kept, never the page. A
+    <base> after <body> has started (invalid HTML) is ignored here, while
+    extract_links would apply it to every link.
+    """
+    
+    def __init__(self, extractor: LinkExtractor, base_url: str, normalizer: URLNormalizer,
+                 on_links: Optional[Callable[[List[str]], None]] = None):
+        """
+        Initialize the stream.
+        
+        Args:
+            extractor: Backend whose incremental() parser is used
+            base_url: URL the page is fetched from
+            normalizer: Normalizer applied to every href
+            on_links: Called with each batch of links found before close()
+        """
+        self.extractor = extractor
+        self.base_url = base_url
+        self.normalizer = normalizer
+        self.on_links = on_links
+        self.page_url = normalizer.normalize(base_url)
+        self.links: List[str] = []
+        self._state = None
+    
+    def begin(self, encoding: str):
+        """
+        Start parsing a body, discarding any earlier (failed) attempt.
+        
+        Args:
+            encoding: Character encoding of the body
+        """
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._state, self._feed, self._close = self.extractor.incremental()
+        self._base = self.base_url
+        self._settled = False
+        self.links = []
+    
+    def feed(self, chunk: bytes):
+        """Parse the next chunk of the body."""
+        if self._state is None:
+            return
+        try:
+            self._feed(self._decoder.decode(chunk))
+        except Exception:
+            self._state = None
+            return
+        self._advance(final=False)
+    
+    def close(self) -> List[str]:
+        """
+        Finish the document.
+        
+        Returns:
+            All normalized links of the page, excluding links back to itself
+        """
+        if self._state is not None:
+            try:
+                self._feed(self._decoder.decode(b'', final=True))
+                self._close()
+            except Exception:
+                pass
+            self._advance(final=True)
+            self._state = None
+        return self.links
+    
+    def _advance(self, final: bool):
+        """Normalize the hrefs parsed so far once the base is known."""
+        state = self._state
+        if not self._settled:
+            if state.base_href is not None:
+                self._base = urljoin(self.base_url, state.base_href)
+            elif not (state.in_body or final):
+                return
+            self._settled = True
+        
+        found = []
+        for href in state.hrefs:
+            normalized = self.normalizer.normalize(href, self._base)
+            if normalized and normalized != self.page_url:
+                found.append(normalized)
+        state.hrefs.clear()
+        if found:
+            self.links.extend(found)
+            if self.on_links and not final:
+                self.on_links(found)
+
+
+# Per-process state of the parse pool, installed by _init_parse_worker
+_parse_worker_state: Dict = {}
+
+
+def _init_parse_worker(normalizer: URLNormalizer, extractor_name: str):
+    """Install the normalizer and extractor used by _parse_page in a pool process."""
+    _parse_worker_state['normalizer'] = normalizer
+    _parse_worker_state['extractor'] = LINK_EXTRACTORS[extractor_name]()
+
+
+def _parse_page(body: bytes, encoding: str, base_url: str) -> List[str]:
+    """
+    Parse stage run in a pool process: decode a page and extract its links.
+    
+    Args:
+        body: Raw response body
+        encoding: Character encoding of the body
+        base_url: URL the body was fetched from
+        
+    Returns:
+        Deduplicated list of normalized URLs
+    """
+    html = body.decode(encoding, errors='replace')
+    links = extract_links(html, base_url, _parse_worker_state['normalizer'],
+                          _parse_worker_state['extractor'])
+    return list(dict.fromkeys(links))
+
+
+class URLTable:
+    """
+    Interning table mapping each normalized URL to a dense integer ID.
+    
+    Every URL string is stored exactly once; the crawl state and the graph
+    hold small integers and only resolve them back to strings for output.
+    """
+    
+    def __init__(self):
+        """Initialize an empty table."""
+        self._ids: Dict[str, int] = {}
+        self._urls: List[str] = []
+    
+    def intern(self, url: str) -> int:
+        """
+        Return the ID of a URL, assigning the next free one if it is new.
+        
+        Args:
+            url: Normalized URL
+            
+        Returns:
+            Dense integer ID
+        """
+        url_id = self._ids.get(url)
+        if url_id is None:
+            url_id = self._ids[url] = len(self._urls)
+            self._urls.append(url)
+        return url_id
+    
+    def get_id(self, url: str) -> Optional[int]:
+        """Return the ID of a URL, or None if it was never interned."""
+        return self._ids.get(url)
+    
+    def url(self, url_id: int) -> str:
+        """Resolve an ID back to its URL."""
+        return self._urls[url_id]
+    
+    def since(self, start: int) -> List[str]:
+        """Return the URLs interned with IDs from start onwards, in ID order."""
+        return self._urls[start:]
+    
+    def __len__(self) -> int:
+        return len(self._urls)
+    
+    def __contains__(self, url: str) -> bool:
+        return url in self._ids
+
+
+class IDBitSet:
+    """
+    Exact set of dense URL IDs stored as one bit per ID.
+    
+    URLTable hands out IDs 0..n-1, so membership fits in a bitmap of n/8
+    bytes instead of a hash set of int objects (about 59 bytes per entry).
+    The URL strings in URLTable still cost well over 100 bytes per URL, so
+    this removes the visited set's share of crawl memory, not most of it.
+    """
+    
+    __slots__ = ('_bits', '_count')
+    
+    def __init__(self):
+        """Initialize an empty set."""
+        self._bits = bytearray()
+        self._count = 0
+    
+    def add(self, url_id: int):
+        """Add an ID to the set."""
+        byte = url_id >> 3
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(max(byte + 1 - len(self._bits), len(self._bits))))
+        mask = 1 << (url_id & 7)
+        if not self._bits[byte] & mask:
+            self._bits[byte] |= mask
+            self._count += 1
+    
+    def discard(self, url_id: int):
+        """Remove an ID from the set if present."""
+        if url_id in self:
+            self._bits[url_id >> 3] &= ~(1 << (url_id & 7)) & 0xFF
+            self._count -= 1
+    
+    def __contains__(self, url_id: int) -> bool:
+        byte = url_id >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] >> (url_id & 7) & 1)
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def to_array(self) -> np.ndarray:
+        """Return the IDs in the set as a sorted int32 array."""
+        bits = np.unpackbits(np.frombuffer(bytes(self._bits), dtype=np.uint8), bitorder='little')
+        return np.flatnonzero(bits).astype(np.int32)
+
+
+class CompactGraph:
+    """
+    Compact directed graph over integer node IDs.
+    
+    During the crawl edges are appended to two parallel int32 arrays (8 bytes
+    per edge). Queries freeze them into CSR (successors) and CSC (predecessors)
+    arrays. Exposes the subset of the nx.DiGraph API used by the crawler and
+    StatsGenerator; to_networkx() builds a full DiGraph on request.
+    
+    The crawler adds a page's links in one go, so each node's out-edges
+    usually form one contiguous run of the edge arrays. Its position is kept
+    per node (12 bytes), and successors() of such a node slices the run
+    instead of freezing; the crawler looks up successors mid-crawl, when a
+    re-sort of every edge per lookup would make it quadratic.
+    """
+    
+    def __init__(self):
+        """Initialize an empty graph."""
+        self._src = array('i')
+        self._dst = array('i')
+        self._is_node = bytearray()
+        # Per node: index + 1 of its first out-edge while they are one
+        # contiguous run (0 = no out-edges, -1 = scattered), and their count
+        self._run_start = array('q')
+        self._run_length = array('i')
+        self._node_count = 0
+        self._frozen = None
+    
+    def add_node(self, node: int):
+        """Add a node ID (no-op if present)."""
+        if node >= len(self._is_node):
+            grow = node + 1 - len(self._is_node)
+            self._is_node.extend(bytes(grow))
+            self._run_start.frombytes(bytes(grow * self._run_start.itemsize))
+            self._run_length.frombytes(bytes(grow * self._run_length.itemsize))
+        if not self._is_node[node]:
+            self._is_node[node] = 1
+            self._node_count += 1
+            self._frozen = None
+    
+    def add_edge(self, source: int, target: int):
+        """
+        Append an edge. Unlike nx.DiGraph, duplicates are not merged here,
+        so callers add each (source, target) pair once.
+        """
+        self.add_node(source)
+        self.add_node(target)
+        start = self._run_start[source]
+        if not start:
+            self._run_start[source] = len(self._src) + 1
+            self._run_length[source] = 1
+        elif start > 0 and start - 1 + self._run_length[source] == len(self._src):
+            self._run_length[source] += 1
+        else:
+            self._run_start[source] = -1
+        self._src.append(source)
+        self._dst.append(target)
+        self._frozen = None
+    
+    def __contains__(self, node: int) -> bool:
+        return 0 <= node < len(self._is_node) and bool(self._is_node[node])
+    
+    def number_of_nodes(self) -> int:
+        return self._node_count
+    
+    def number_of_edges(self) -> int:
+        return len(self._src)
+    
+    def nodes(self) -> List[int]:
+        """Return node IDs in ascending (i.e. discovery) order."""
+        return np.flatnonzero(np.frombuffer(self._is_node, dtype=np.uint8)).tolist()
+    
+    def edge_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return copies of the (sources, targets) edge arrays in insertion order."""
+        return np.array(self._src, dtype=np.int32), np.array(self._dst, dtype=np.int32)
+    
+    def freeze(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Build (or return the cached) CSR and CSC arrays.
+        
+        Returns:
+            Tuple of (out_offsets, out_targets, in_offsets, in_sources); the
+            successors of n are out_targets[out_offsets[n]:out_offsets[n + 1]]
+        """
+        if self._frozen is None:
+            size = len(self._is_node)
+            src = np.frombuffer(self._src, dtype=np.int32) if self._src else np.zeros(0, np.int32)
+            dst = np.frombuffer(self._dst, dtype=np.int32) if self._dst else np.zeros(0, np.int32)
+            
+            # Stable sorts keep each node's links in the order they were found
+            by_src = np.argsort(src, kind='stable')
+            by_dst = np.argsort(dst, kind='stable')
+            out_offsets = np.zeros(size + 1, dtype=np.int64)
+            in_offsets = np.zeros(size + 1, dtype=np.int64)
+            np.cumsum(np.bincount(src, minlength=size), out=out_offsets[1:])
+            np.cumsum(np.bincount(dst, minlength=size), out=in_offsets[1:])
+            self._frozen = (out_offsets, dst[by_src], in_offsets, src[by_dst])
+        return self._frozen
+    
+    def successors(self, node: int) -> List[int]:
+        start = self._run_start[node] if node < len(self._run_start) else 0
+        if start >= 0:
+            return self._dst[start - 1:start - 1 + self._run_length[node]].tolist() if start else []
+        out_offsets, out_targets, _, _ = self.freeze()
+        return out_targets[out_offsets[node]:out_offsets[node + 1]].tolist()
+    
+    def predecessors(self, node: int) -> List[int]:
+        _, _, in_offsets, in_sources = self.freeze()
+        return in_sources[in_offsets[node]:in_offsets[node + 1]].tolist()
+    
+    def out_degree(self, node: Optional[int] = None):
+        """Return the out-degree of node, or (node, degree) pairs for all nodes."""
+        degrees = np.diff(self.freeze()[0])
+        if node is not None:
+            return int(degrees[node])
+        return ((n, int(degrees[n])) for n in self.nodes())
+    
+    def in_degree(self, node: Optional[int] = None):
+        """Return the in-degree of node, or (node, degree) pairs for all nodes."""
+        degrees = np.diff(self.freeze()[2])
+        if node is not None:
+            return int(degrees[node])
+        return ((n, int(degrees[n])) for n in self.nodes())
+    
+    def to_networkx(self, urls: Optional[URLTable] = None) -> nx.DiGraph:
+        """
+        Build an nx.DiGraph copy of the graph.
+        
+        Args:
+            urls: Table used to label nodes with URLs instead of IDs
+            
+        Returns:
+            NetworkX DiGraph
+        """
+        label = urls.url if urls is not None else int
+        graph = nx.DiGraph()
+        graph.add_nodes_from(label(n) for n in self.nodes())
+        graph.add_edges_from((label(u), label(v)) for u, v in zip(self._src, self._dst))
+        return graph
+
+
+def _sorted_difference(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Return the elements of sorted array a that are not in sorted array b."""
+    if not len(b):
+        return a
+    idx = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[idx] != a]
+
+
+class GraphSnapshot:
+    """
+    Crawl graph stored as sorted ID arrays, for diffing successive runs.
+    
+    Nodes, crawled pages and edges (as int64 keys source << 32 | target)
+    are kept as sorted arrays, so comparing two runs is a handful of
+    binary searches instead of a networkx graph comparison. Runs line up
+    because an incremental crawler interns the previous run's URLs first,
+    giving every known URL the same ID in both snapshots.
+    """
+    
+    def __init__(self, urls: List[str], nodes: np.ndarray, pages: np.ndarray,
+                 edges: np.ndarray, changes: Optional[np.ndarray] = None):
+        """
+        Initialize the snapshot.
+        
+        Args:
+            urls: URL of every ID, in ID order
+            nodes: Sorted IDs of all graph nodes
+            pages: Sorted IDs of the pages that were crawled
+            edges: Sorted, unique edge keys (source << 32 | target)
+            changes: Per-ID count of runs in which the page's links changed
+        """
+        self.urls = urls
+        self.nodes = nodes
+        self.pages = pages
+        self.edges = edges
+        self.changes = changes if changes is not None else np.zeros(len(urls), dtype=np.uint32)
+    
+    @staticmethod
+    def edge_keys(sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Pack edge arrays into sorted, unique int64 keys."""
+        return np.unique((sources.astype(np.int64) << 32) | targets.astype(np.int64))
+    
+    def save(self, filename: str):
+        """
+        Write the snapshot to an .npz file.
+        
+        Args:
+            filename: Output filename
+        """
+        urls = np.frombuffer('\n'.join(self.urls).encode('utf-8'), dtype=np.uint8)
+        np.savez_compressed(filename, urls=urls, nodes=self.nodes, pages=self.pages,
+                            edges=self.edges, changes=self.changes)
+    
+    @classmethod
+    def load(cls, filename: str) -> 'GraphSnapshot':
+        """
+        Read a snapshot written by save().
+        
+        Args:
+            filename: Snapshot filename
+            
+        Returns:
+            GraphSnapshot instance
+        """
+        with np.load(filename) as data:
+            text = data['urls'].tobytes().decode('utf-8')
+            return cls(text.split('\n') if text else [], data['nodes'], data['pages'],
+                       data['edges'], data['changes'])
+    
+    def compare(self, previous: 'GraphSnapshot') -> Dict[str, np.ndarray]:
+        """
+        Diff this snapshot against the previous run's and update change counts.
+        
+        Args:
+            previous: Snapshot of the previous run; its URLs must be a prefix of ours
+            
+        Returns:
+            Dict of sorted arrays: added_nodes and removed_nodes (IDs),
+            added_edges and removed_edges (edge keys) and changed_pages
+            (IDs of pages crawled in both runs whose outgoing links differ)
+        """
+        if self.urls[:len(previous.urls)] != previous.urls:
+            raise ValueError("Snapshots do not share URL IDs; crawl with the previous "
+                             "snapshot loaded to get comparable runs")
+        
+        added_edges = _sorted_difference(self.edges, previous.edges)
+        removed_edges = _sorted_difference(previous.edges, self.edges)
+        sources = np.unique(np.concatenate([added_edges >> 32, removed_edges >> 32]))
+        both = _sorted_difference(self.pages, _sorted_difference(self.pages, previous.pages))
+        changed_pages = _sorted_difference(sources, _sorted_difference(sources, both))
+        
+        self.changes[:len(previous.changes)] += previous.changes
+        self.changes[changed_pages] += 1
+        return {
+            'added_nodes': _sorted_difference(self.nodes, previous.nodes),
+            'removed_nodes': _sorted_difference(previous.nodes, self.nodes),
+            'added_edges': added_edges,
+            'removed_edges': removed_edges,
+            'changed_pages': changed_pages.astype(np.int32),
+        }
+    
+    def write_diff(self, diff: Dict[str, np.ndarray], filename: str) -> Dict[str, int]:
+        """
+        Save a diff from compare() to JSON, with IDs resolved to URLs.
+        
+        Args:
+            diff: Result of compare()
+            filename: Output filename
+            
+        Returns:
+            Dictionary of counts per diff category
+        """
+        url = self.urls.__getitem__
+        summary = {key: len(values) for key, values in diff.items()}
+        data = {'summary': summary}
+        for key, values in diff.items():
+            if key.endswith('_edges'):
+                data[key] = [[url(int(key_ >> 32)), url(int(key_ & 0xFFFFFFFF))] for key_ in values]
+            else:
+                data[key] = [url(int(node)) for node in values]
+        
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return summary
+
+
+class Frontier:
+    """
+    FIFO queue of URL IDs waiting to be crawled.
+    
+    Each ID is queued at most once over the whole crawl, tracked in a
+    one-byte-per-ID table, so popular links never pile up duplicates.
+    Subclasses provide the actual storage through _push/_pop.
+    """
+    
+    def __init__(self):
+        """Initialize an empty frontier."""
+        self._queued = bytearray()
+        self._size = 0
+    
+    def add(self, url_id: int, source: Optional[int] = None) -> bool:
+        """
+        Queue a URL ID unless it has been queued before.
+        
+        Args:
+            url_id: ID from the crawler's URLTable
+            source: ID of the page that links to it (None for seeds); FIFO
+                frontiers ignore it, PriorityFrontier scores with it
+            
+        Returns:
+            True if the ID was queued
+        """
+        if url_id >= len(self._queued):
+            self._queued.extend(bytes(max(url_id + 1 - len(self._queued), len(self._queued))))
+        if self._queued[url_id]:
+            return False
+        self._queued[url_id] = 1
+        self._size += 1
+        self._push(url_id)
+        return True
+    
+    def pop(self) -> int:
+        """Remove and return the oldest queued ID."""
+        if not self._size:
+            raise KeyError('pop from an empty frontier')
+        self._size -= 1
+        return self._pop()
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __bool__(self) -> bool:
+        return self._size > 0
+    
+    def close(self):
+        """Release any resources held by the frontier."""
+    
+    def _push(self, url_id: int):
+        raise NotImplementedError
+    
+    def _pop(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryFrontier(Frontier):
+    """Frontier held entirely in memory."""
+    
+    def __init__(self):
+        super().__init__()
+        self._queue = deque()
+    
+    def _push(self, url_id: int):
+        self._queue.append(url_id)
+    
+    def _pop(self) -> int:
+        return self._queue.popleft()
+
+
+class PriorityFrontier(Frontier):
+    """
+    In-memory frontier that hands out the most important URLs first.
+    
+    The priority of a queued URL is
+        
+        url weight - depth_weight * BFS depth + inlink_weight * log2(in-links)
+            + change_weight * changes
+    
+    where the URL weight sums url_weights entries whose regex matches, the
+    depth is the shortest link distance from a seed seen so far and in-links
+    count the crawled pages linking to it. For incremental crawls, changes
+    is the number of past runs in which the page's links changed (see
+    GraphSnapshot.compare); URLs the previous runs did not know count one
+    more than the most changed page, so they are crawled first. Override
+    score() for other orderings.
+    
+    The heap holds plain ints, (OFFSET - priority) << 32 | url_id, so equal
+    priorities pop in discovery order and an entry costs one int. A URL whose
+    priority changes is pushed again and its stale entries are skipped when
+    popped; in-links are bucketed by powers of two, so that happens a few
+    dozen times per URL at most. Push and pop are O(log n).
+    """
+    
+    OFFSET = 1 << 30
+    
+    def __init__(self, url_of: Callable[[int], str], depth_weight: int = 1,
+                 inlink_weight: int = 1, url_weights: Optional[Dict[str, int]] = None,
+                 change_weight: int = 1, changes: Optional[np.ndarray] = None):
+        """
+        Initialize the frontier.
+        
+        Args:
+            url_of: Resolves a URL ID to its URL, for url_weights
+            depth_weight: Priority lost per link of distance from the seeds
+            inlink_weight: Priority gained per doubling of the in-link count
+            url_weights: {regex: weight} added to URLs the regex matches
+                (re.search), e.g. {r'/docs/': 5, r'[?&]page=\\d+': -10}
+            change_weight: Priority gained per past run in which the page changed
+            changes: Per-ID change counts of the previous run's GraphSnapshot
+                (None outside incremental crawls)
+        """
+        super().__init__()
+        self.url_of = url_of
+        self.depth_weight = depth_weight
+        self.inlink_weight = inlink_weight
+        self.url_weights = [(re.compile(pattern), weight)
+                            for pattern, weight in (url_weights or {}).items()]
+        self.change_weight = change_weight
+        self.changes = changes
+        self._new_changes = int(changes.max()) + 1 if changes is not None and len(changes) else 1
+        self._heap: List[int] = []
+        # Per ID: depth + 1 (0 = unknown), in-links, URL weight (with the
+        # change bonus), current priority
+        self._depth = array('i')
+        self._inlinks = array('i')
+        self._weight = array('i')
+        self._priority = array('i')
+        self.stale_pops = 0
+    
+    def add(self, url_id: int, source: Optional[int] = None) -> bool:
+        if url_id >= len(self._queued):
+            grow = max(url_id + 1 - len(self._queued), len(self._queued))
+            self._queued.extend(bytes(grow))
+            for table in (self._depth, self._inlinks, self._weight, self._priority):
+                table.frombytes(bytes(grow * table.itemsize))
+        state = self._queued[url_id]
+        if state == 2:
+            return False
+        
+        if source is None:
+            depth = 1
+        else:
+            # Pages restored from a checkpoint were never queued here; treat them as seeds
+            source_depth = self._depth[source] if source < len(self._depth) else 0
+            depth = (source_depth or 1) + 1
+        if state == 0:
+            self._queued[url_id] = 1
+            self._size += 1
+            self._depth[url_id] = depth
+            self._inlinks[url_id] = source is not None
+            if self.url_weights:
+                url = self.url_of(url_id)
+                self._weight[url_id] = sum(weight for pattern, weight in self.url_weights
+                                           if pattern.search(url))
+            if self.changes is not None:
+                changes = (int(self.changes[url_id]) if url_id < len(self.changes)
+                           else self._new_changes)
+                self._weight[url_id] += self.change_weight * changes
+        else:
+            self._inlinks[url_id] += source is not None
+            self._depth[url_id] = min(self._depth[url_id], depth)
+        
+        priority = max(-self.OFFSET, min(self.OFFSET - 1, self.score(url_id)))
+        if state == 0 or priority != self._priority[url_id]:
+            self._priority[url_id] = priority
+            heapq.heappush(self._heap, (self.OFFSET - priority) << 32 | url_id)
+        return state == 0
+    
+    def score(self, url_id: int) -> int:
+        """
+        Compute the priority of a queued URL; higher pops first.
+        
+        Args:
+            url_id: ID of a queued URL
+        
+        Returns:
+            Integer priority
+        """
+        return (self._weight[url_id]
+                - self.depth_weight * (self._depth[url_id] - 1)
+                + self.inlink_weight * self._inlinks[url_id].bit_length())
+    
+    def pop(self) -> int:
+        """Remove and return the queued ID with the highest priority."""
+        if not self._size:
+            raise KeyError('pop from an empty frontier')
+        while True:
+            key = heapq.heappop(self._heap)
+            url_id = key & 0xFFFFFFFF
+            if self._queued[url_id] == 1 and self.OFFSET - (key >> 32) == self._priority[url_id]:
+                self._queued[url_id] = 2
+                self._size -= 1
+                return url_id
+            self.stale_pops += 1
+
+
+class DiskFrontier(Frontier):
+    """
+    Frontier that spills to append-only segment files on disk.
+    
+    New IDs go to an in-memory tail buffer and IDs are served from an
+    in-memory head buffer. Whenever the tail reaches half the memory budget
+    it is written out as a segment file; segments are read back in FIFO
+    order once the head runs dry. The queue itself stays within the budget
+    no matter how large it grows.
+    
+    Only the 4-byte IDs are spilled. Their URL strings stay in the
+    crawler's in-memory URLTable, next to the per-ID tables (including the
+    frontier's own byte per ID recording what was queued), so crawl memory
+    still grows with every URL discovered; what this saves is the queue's
+    share of it. Segments are scratch files without an index and are not
+    reloaded after a crash: a resumed crawl rebuilds its frontier from the
+    CrawlCheckpoint journal and spills it afresh.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, memory_budget: int = 16 * 1024 * 1024):
+        """
+        Initialize the frontier.
+        
+        Args:
+            directory: Directory for segment files (a temporary one if None)
+            memory_budget: Bytes of IDs kept in memory before spilling to disk
+        """
+        super().__init__()
+        self._owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix='frontier-')
+        os.makedirs(self.directory, exist_ok=True)
+        self.segment_size = max(1, memory_budget // 2 // array('i').itemsize)
+        self._head = array('i')
+        self._head_pos = 0
+        self._tail = array('i')
+        self._segments: deque = deque()
+        self._next_segment = 0
+        self.spilled_segments = 0
+    
+    def _push(self, url_id: int):
+        self._tail.append(url_id)
+        if len(self._tail) >= self.segment_size:
+            self._spill()
+    
+    def _spill(self):
+        """Write the tail buffer out as a new segment file."""
+        path = os.path.join(self.directory, f'segment-{self._next_segment:08d}.bin')
+        self._next_segment += 1
+        with open(path, 'wb') as f:
+            self._tail.tofile(f)
+        self._segments.append((path, len(self._tail)))
+        self._tail = array('i')
+        self.spilled_segments += 1
+    
+    def _pop(self) -> int:
+        if self._head_pos >= len(self._head):
+            self._refill()
+        url_id = self._head[self._head_pos]
+        self._head_pos += 1
+        return url_id
+    
+    def _refill(self):
+        """Load the oldest segment, or the tail buffer if nothing was spilled."""
+        if self._segments:
+            path, count = self._segments.popleft()
+            self._head = array('i')
+            with open(path, 'rb') as f:
+                self._head.fromfile(f, count)
+            os.remove(path)
+        else:
+            self._head, self._tail = self._tail, array('i')
+        self._head_pos = 0
+    
+    def close(self):
+        """Delete segment files, and the directory if it was created here."""
+        for path, _ in self._segments:
+            if os.path.exists(path):
+                os.remove(path)
+        self._segments.clear()
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class CrawlCheckpoint:
+    """
+    Append-only journal of crawl progress for resuming interrupted crawls.
+    
+    Each crawled page appends one JSON line holding the URLs interned since
+    the previous record, the page's ID and the IDs it links to; URLs seeded
+    from sitemaps are journaled the same way, without a page. Replaying
+    the journal rebuilds the URL table, visited set and graph; the frontier
+    is every linked or seeded ID that was never crawled. Records are handed to a
+    background writer thread, so fetch workers never wait on disk.
+    """
+    
+    JOURNAL = 'crawl.journal'
+    
+    def __init__(self, directory: str, interval: float = 5.0):
+        """
+        Initialize the checkpoint.
+        
+        Args:
+            directory: Directory holding the journal file
+            interval: Seconds between flushes of the journal to disk
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, self.JOURNAL)
+        self.interval = interval
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        # Bytes of complete records found by replay(), where appending resumes
+        self._replayed_size: Optional[int] = None
+    
+    def exists(self) -> bool:
+        """Return True if a journal from an earlier run is present."""
+        return os.path.exists(self.path)
+    
+    def replay(self) -> Iterator[Tuple[List[str], Optional[int], List[int]]]:
+        """
+        Read back the journal records in the order they were written.
+        
+        A partially written last line (from a crash mid-write) is ignored,
+        and open(resume=True) cuts it off before appending.
+        
+        Yields:
+            Tuples of (new_urls, page_id, linked_ids), or (new_urls, None,
+            seeded_ids) for URLs seeded from sitemaps
+        """
+        self._replayed_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('no line end')
+                    record = json.loads(line)
+                except ValueError:  # also JSONDecodeError and UnicodeDecodeError
+                    logger.warning(f"Ignoring truncated checkpoint record in {self.path}")
+                    break
+                self._replayed_size += len(line)
+                if 's' in record:
+                    yield record['u'], None, record['s']
+                else:
+                    yield record['u'], record['p'], record['l']
+    
+    def open(self, resume: bool = False):
+        """
+        Start the writer thread.
+        
+        Args:
+            resume: Append to the existing journal instead of starting a new one
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if resume and self._replayed_size is not None and self.exists():
+            # Records appended after a truncated one would be lost with it
+            os.truncate(self.path, self._replayed_size)
+        f = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        self._writer = threading.Thread(target=self._run, args=(f,),
+                                        name='crawl-checkpoint', daemon=True)
+        self._writer.start()
+    
+    def record(self, new_urls: List[str], page: int, links: List[int]):
+        """
+        Queue a crawled page for the journal.
+        
+        Args:
+            new_urls: URLs interned since the previous record, in ID order
+            page: ID of the crawled page
+            links: IDs of the pages it links to
+        """
+        self._queue.put((new_urls, page, links))
+    
+    def seed(self, new_urls: List[str], seeds: List[int]):
+        """
+        Queue URLs seeded from a sitemap for the journal.
+        
+        Args:
+            new_urls: URLs interned since the previous record, in ID order
+            seeds: IDs of the seeded URLs
+        """
+        self._queue.put((new_urls, None, seeds))
+    
+    def _run(self, f):
+        """Writer loop: append queued records, syncing every interval."""
+        last_sync = time.monotonic()
+        with f:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.interval)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    break
+                if item:
+                    new_urls, page, links = item
+                    record = ({'u': new_urls, 's': links} if page is None
+                              else {'u': new_urls, 'p': page, 'l': links})
+                    f.write(json.dumps(record, separators=(',', ':')) + '\n')
+                if time.monotonic() - last_sync >= self.interval:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    last_sync = time.monotonic()
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def close(self):
+        """Write out all queued records and stop the writer thread."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+
+class HTTPCache:
+    """
+    On-disk cache of page validators and extracted links, keyed by normalized URL.
+    
+    Re-crawls send If-None-Match / If-Modified-Since for cached pages and,
+    on a 304, reuse the stored links without downloading or parsing the
+    page. Entries live in SQLite, so lookups never require loading the
+    whole cache into memory.
+    """
+    
+    FILENAME = 'http_cache.sqlite'
+    NOT_MODIFIED = object()
+    
+    def __init__(self, directory: str, commit_every: int = 256):
+        """
+        Initialize the cache.
+        
+        Args:
+            directory: Directory holding the cache database
+            commit_every: Number of stored pages between commits
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, self.FILENAME)
+        self.commit_every = commit_every
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._staged: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._uncommitted = 0
+        self.revalidated = 0
+        self.stored = 0
+    
+    def open(self):
+        """Open (or create) the cache database."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, '
+                         'etag TEXT, last_modified TEXT, links TEXT NOT NULL)')
+    
+    def headers(self, url: str) -> Dict[str, str]:
+        """
+        Build conditional request headers for a cached page.
+        
+        Args:
+            url: Normalized URL
+            
+        Returns:
+            If-None-Match / If-Modified-Since headers, empty if the page is not cached
+        """
+        with self._lock:
+            row = self._db.execute('SELECT etag, last_modified FROM pages WHERE url = ?',
+                                   (url,)).fetchone()
+        headers = {}
+        if row:
+            if row[0]:
+                headers['If-None-Match'] = row[0]
+            if row[1]:
+                headers['If-Modified-Since'] = row[1]
+        return headers
+    
+    def links(self, url: str) -> List[str]:
+        """Return the cached links of a page the server reported as not modified."""
+        with self._lock:
+            row = self._db.execute('SELECT links FROM pages WHERE url = ?', (url,)).fetchone()
+            self.revalidated += 1
+        return json.loads(row[0]) if row else []
+    
+    def stage(self, url: str, etag: Optional[str], last_modified: Optional[str]):
+        """
+        Remember the validators of a freshly downloaded page until its links are known.
+        
+        Args:
+            url: Normalized URL
+            etag: ETag response header
+            last_modified: Last-Modified response header
+        """
+        if etag or last_modified:
+            with self._lock:
+                self._staged[url] = (etag, last_modified)
+    
+    def discard(self, url: str):
+        """
+        Drop the staged validators of a page whose links will not be stored,
+        e.g. one the crawl budget cut off.
+        
+        Args:
+            url: Normalized URL
+        """
+        with self._lock:
+            self._staged.pop(url, None)
+    
+    def store(self, url: str, links: List[str]):
+        """
+        Save the links of a page staged by stage().
+        
+        Args:
+            url: Normalized URL
+            links: Normalized links extracted from the page
+        """
+        with self._lock:
+            validators = self._staged.pop(url, None)
+            if validators is None:
+                return
+            self._db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)',
+                             (url, *validators, json.dumps(links, separators=(',', ':'))))
+            self.stored += 1
+            self._uncommitted += 1
+            if self._uncommitted >= self.commit_every:
+                self._db.commit()
+                self._uncommitted = 0
+    
+    def stats(self) -> Dict:
+        """Return counts of revalidated (304) and newly stored pages."""
+        return {'revalidated': self.revalidated, 'stored': self.stored}
+    
+    def close(self):
+        """Commit pending entries and close the database."""
+        if self._db is not None:
+            with self._lock:
+                self._db.commit()
+                self._db.close()
+                self._db = None
+                self._staged.clear()
+                self._uncommitted = 0
+
+
+class DNSCache:
+    """
+    Thread-safe getaddrinfo cache shared by all fetch workers.
+    
+    getaddrinfo does not report record TTLs, so answers are kept for a fixed
+    ttl and failures for negative_ttl. Concurrent lookups of the same name wait
+    for a single resolution instead of each querying the resolver.
+    """
+    
+    def __init__(self, ttl: float = 300.0, negative_ttl: float = 30.0,
+                 resolver: Callable = socket.getaddrinfo):
+        """
+        Initialize the cache.
+        
+        Args:
+            ttl: Seconds to keep resolved addresses (0 resolves every connection)
+            negative_ttl: Seconds to remember that a name failed to resolve
+            resolver: getaddrinfo-compatible callable, e.g. a stub for offline tests
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.resolver = resolver
+        self._lock = threading.Lock()
+        # (host, port, family) -> (expiry, addresses or socket.gaierror)
+        self._entries: Dict[Tuple, Tuple[float, object]] = {}
+        self._pending: Dict[Tuple, threading.Event] = {}
+        self.lookups = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.resolutions = 0
+        self.failures = 0
+        self.resolve_time = 0.0
+        self.max_resolve_time = 0.0
+    
+    def resolve(self, host: str, port: int, family: int = socket.AF_UNSPEC) -> List[Tuple]:
+        """
+        Resolve host to TCP addresses, from the cache when possible.
+        
+        Args:
+            host: Host name or address literal
+            port: Port number
+            family: Address family to resolve for
+        
+        Returns:
+            getaddrinfo results: (family, type, proto, canonname, sockaddr) tuples
+        
+        Raises:
+            socket.gaierror: If the name does not resolve (possibly cached)
+        """
+        key = (host, port, family)
+        counted = False
+        while True:
+            with self._lock:
+                if not counted:
+                    self.lookups += 1
+                    counted = True
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    result = entry[1]
+                    if isinstance(result, socket.gaierror):
+                        self.negative_hits += 1
+                        raise socket.gaierror(*result.args)
+                    self.hits += 1
+                    return result
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            pending.wait()
+        
+        try:
+            started = time.perf_counter()
+            try:
+                result = self.resolver(host, port, family, socket.SOCK_STREAM)
+            except socket.gaierror as error:
+                result = error
+            elapsed = time.perf_counter() - started
+            failed = isinstance(result, socket.gaierror)
+            with self._lock:
+                self.resolutions += 1
+                self.failures += failed
+                self.resolve_time += elapsed
+                self.max_resolve_time = max(self.max_resolve_time, elapsed)
+                ttl = self.negative_ttl if failed else self.ttl
+                if ttl > 0:
+                    self._entries[key] = (time.monotonic() + ttl, result)
+        finally:
+            # Wake lookups of the same name once the answer is cached
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+        
+        if failed:
+            raise result
+        return result
+    
+    def stats(self) -> Dict:
+        """
+        Get lookup and resolution metrics.
+        
+        Returns:
+            Dictionary with lookups, hits, negative_hits, resolutions, failures,
+            hit_rate and resolution times in milliseconds (mean_ms, max_ms)
+        """
+        with self._lock:
+            cached = self.hits + self.negative_hits
+            return {
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'resolutions': self.resolutions,
+                'failures': self.failures,
+                'hit_rate': cached / self.lookups if self.lookups else 0.0,
+                'mean_ms': 1000 * self.resolve_time / self.resolutions if self.resolutions else 0.0,
+                'max_ms': 1000 * self.max_resolve_time,
+            }
+
+
+class ConnectionStats:
+    """
+    Thread-safe counts of HTTP requests and newly opened connections.
+    
+    Every connection opened costs a TCP (and for HTTPS a TLS) handshake; the
+    reuse rate is the share of requests served on a kept-alive connection.
+    """
+    
+    def __init__(self):
+        """Initialize empty counters."""
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections: Counter = Counter()
+    
+    def request_sent(self):
+        """Count one request."""
+        with self._lock:
+            self.requests += 1
+    
+    def connection_opened(self, host: str):
+        """Count one new connection to host."""
+        with self._lock:
+            self.connections[host] += 1
+    
+    def summary(self) -> Dict:
+        """
+        Summarize connection reuse.
+        
+        Returns:
+            Dictionary with requests, connections (opened), reuse_rate and
+            hosts (number of hosts connected to)
+        """
+        with self._lock:
+            opened = sum(self.connections.values())
+            return {
+                'requests': self.requests,
+                'connections': opened,
+                'reuse_rate': 1 - opened / self.requests if self.requests else 0.0,
+                'hosts': len(self.connections),
+            }
+
+
+class _CrawlHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose urllib3 pools report requests and new connections and
+    resolve hosts through a DNSCache.
+    """
+    
+    def __init__(self, stats: ConnectionStats, dns: DNSCache, **kwargs):
+        self.stats = stats
+        self.dns = dns
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+        dns = self.dns
+        
+        # Count at connect() rather than _new_conn(): pools silently reconnect
+        # connections the server closed, and each of those is a handshake too
+        def counting(pool_class):
+            class CountingConnection(pool_class.ConnectionCls):
+                def connect(self):
+                    stats.connection_opened(self.host)
+                    return super().connect()
+
+                def _new_conn(self):
+                    # Connect to each cached address in turn, moving on when
+                    # one refuses or times out as urllib3's create_connection
+                    # does. urllib3 connects to _dns_host, which is also what
+                    # self.host returns, so it is restored for the certificate
+                    # and the Host header of every request on the connection
+                    try:
+                        addresses = dns.resolve(self.host, self.port, allowed_gai_family())
+                    except socket.gaierror as error:
+                        raise NewConnectionError(self, f"Failed to resolve {self.host}: {error}")
+                    host = self._dns_host
+                    failure = NewConnectionError(self, f"No addresses for {self.host}")
+                    try:
+                        for *_, sockaddr in addresses:
+                            self._dns_host = sockaddr[0]
+                            try:
+                                return super()._new_conn()
+                            except (NewConnectionError, ConnectTimeoutError, OSError) as error:
+                                failure = error
+                    finally:
+                        self._dns_host = host
+                    raise failure
+            
+            class CountingPool(pool_class):
+                ConnectionCls = CountingConnection
+            return CountingPool
+        
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: counting(pool_class)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+    
+    def send(self, request, **kwargs):
+        self.stats.request_sent()
+        return super().send(request, **kwargs)
+
+
+class _DNSCacheBackend:
+    """httpcore network backend that resolves hosts through a DNSCache."""
+    
+    def __init__(self, dns: DNSCache, backend):
+        self.dns = dns
+        self.backend = backend
+    
+    def connect_tcp(self, host: str, port: int, **kwargs):
+        try:
+            addresses = self.dns.resolve(host, port)
+        except socket.gaierror as error:
+            raise httpcore.ConnectError(f"Failed to resolve {host}: {error}") from error
+        failure = httpcore.ConnectError(f"No addresses for {host}")
+        for *_, sockaddr in addresses:
+            try:
+                return self.backend.connect_tcp(sockaddr[0], port, **kwargs)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as error:
+                failure = error
+        raise failure
+    
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+class _AsyncDNSResolver:
+    """aiohttp resolver backed by a DNSCache; resolutions run in a thread."""
+    
+    def __init__(self, dns: DNSCache):
+        self.dns = dns
+    
+    async def resolve(self, host: str, port: int = 0,
+                      family: int = socket.AF_INET) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        addresses = await loop.run_in_executor(None, self.dns.resolve, host, port, family)
+        return [{'hostname': host, 'host': sockaddr[0], 'port': port, 'family': address_family,
+                 'proto': proto, 'flags': socket.AI_NUMERICHOST | socket.AI_NUMERICSERV}
+                for address_family, _, proto, _, sockaddr in addresses]
+    
+    async def close(self):
+        pass
+
+
+class _HTTP2Session:
+    """
+    Stand-in for requests.Session that fetches over HTTP/2 with httpx.
+    
+    All worker threads share one httpx client, which multiplexes their requests
+    as concurrent streams over a single connection per origin (falling back to
+    HTTP/1.1 where the server does not negotiate h2). Only the calls made by
+    WebCrawler._fetch_body are provided.
+    """
+    
+    def __init__(self, headers: Dict[str, str], stats: ConnectionStats, dns: DNSCache,
+                 max_keepalive: int):
+        """
+        Initialize the client.
+        
+        Args:
+            headers: Default request headers
+            stats: Counters for requests and new connections
+            dns: Cache to resolve hosts through
+            max_keepalive: Idle connections to keep open
+        """
+        # Connection-specific headers such as "Connection: keep-alive" are
+        # forbidden in HTTP/2
+        self.headers = {name: value for name, value in headers.items()
+                        if name.lower() != 'connection'}
+        self.stats = stats
+        # httpx logs every request at INFO, which would put each fetch in the crawl log
+        for name in ('httpx', 'httpcore'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+        transport = httpx.HTTPTransport(
+            http2=True,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=max_keepalive)
+        )
+        # httpx does not expose httpcore's network backend option
+        pool = transport._pool
+        pool._network_backend = _DNSCacheBackend(dns, pool._network_backend)
+        self.client = httpx.Client(transport=transport, headers=self.headers,
+                                   follow_redirects=True)
+    
+    def get(self, url: str, timeout: Optional[float] = None,
+            headers: Optional[Dict[str, str]] = None, **kwargs) -> '_HTTP2Response':
+        """
+        Start a streamed GET request; redirects are always followed.
+        
+        Args:
+            url: URL to fetch
+            timeout: Timeout in seconds
+            headers: Extra request headers
+        
+        Returns:
+            Response to use as a context manager
+        """
+        self.stats.request_sent()
+        trace = functools.partial(self._trace, urlparse(url).hostname)
+        return _HTTP2Response(functools.partial(
+            self.client.stream, 'GET', url, headers=headers, timeout=timeout,
+            extensions={'trace': trace}
+        ))
+    
+    def _trace(self, host: str, event: str, info: Dict):
+        """httpcore trace hook counting new connections."""
+        if event == 'connection.connect_tcp.complete':
+            self.stats.connection_opened(host)
+
+
+class _HTTP2Response:
+    """Streamed httpx response with the requests.Response attributes _fetch_body uses."""
+    
+    RESENDS = 2
+    
+    def __init__(self, open_stream: Callable):
+        self._open_stream = open_stream
+        self._stream = None
+        self._response = None
+    
+    def __enter__(self) -> '_HTTP2Response':
+        for attempt in range(self.RESENDS + 1):
+            self._stream = self._open_stream()
+            try:
+                self._response = self._stream.__enter__()
+                return self
+            except (httpx.WriteError, httpx.ReadError, httpx.RemoteProtocolError, KeyError) as error:
+                # The server closed the shared connection before answering
+                # (GOAWAY, e.g. at its per-connection request limit), failing
+                # every stream in flight; a GET is safe to resend right away.
+                # httpcore can report such a torn-down stream as a KeyError.
+                if attempt == self.RESENDS:
+                    raise httpx.RemoteProtocolError(str(error)) from error
+    
+    def __exit__(self, *exc_info):
+        return self._stream.__exit__(*exc_info)
+    
+    @property
+    def status_code(self) -> int:
+        return self._response.status_code
+    
+    @property
+    def headers(self):
+        return self._response.headers
+    
+    @property
+    def url(self) -> str:
+        return str(self._response.url)
+    
+    @property
+    def content(self) -> bytes:
+        return self._response.read()
+    
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        return self._response.iter_bytes(chunk_size)
+
+
 class WebCrawler:
     """
     Web crawler that discovers and maps internal links within a domain.
     Implements rate limiting, retry logic, and URL normalization.
     """
     
-    def __init__(self, start_url: str, max_workers: int = 5, rate_limit: float = 1.0):
+    ENGINES = ('thread', 'async')
+    GRAPH_STORES = ('networkx', 'compact')
+    FRONTIERS = ('memory', 'disk', 'priority')
+    CHUNK_SIZE = 64 * 1024
+    CONNECTION_POOLS = 256
+    MAX_SITEMAPS = 1000
+    
+    def __init__(self, start_url: str, max_workers: int = 5, rate_limit: float = 1.0,
+                 engine: str = 'thread', max_concurrency: int = 1000,
+                 host_rate_limits: Optional[Dict[str, Tuple[float, int]]] = None,
+                 adaptive: bool = False, link_extractor: str = 'lxml',
+                 parse_workers: int = 0, graph_store: str = 'networkx',
+                 frontier: str = 'memory', frontier_dir: Optional[str] = None,
+                 frontier_memory: int = 16 * 1024 * 1024,
+                 checkpoint_dir: Optional[str] = None, resume: bool = False,
+                 http_cache_dir: Optional[str] = None, previous_snapshot: Optional[str] = None,
+                 max_page_size: int = 10 * 1024 * 1024, stream_parse: bool = False,
+                 max_connections_per_host: Optional[int] = None, http2: bool = False,
+                 dns_ttl: float = 300.0, dns_resolver: Optional[Callable] = None,
+                 respect_robots: bool = True, priority_weights: Optional[Dict[str, int]] = None,
+                 url_weights: Optional[Dict[str, int]] = None, max_pages: Optional[int] = None,
+                 max_depth: Optional[int] = None, max_bytes: Optional[int] = None,
+                 max_time: Optional[float] = None, max_pages_per_host: Optional[int] = None,
+                 strip_params: Optional[Sequence[str]] = None, detect_traps: bool = True,
+                 trap_limits: Optional[Dict[str, Optional[int]]] = None, sitemaps: bool = False,
+                 sitemap_urls: Optional[Sequence[str]] = None,
+                 shard: Optional['ShardExchange'] = None):
         """
         Initialize the web crawler.
         
         Args:
             start_url: The URL to start crawling from
             max_workers: Maximum number of concurrent threads
-            rate_limit: Minimum time between requests in seconds
+            rate_limit: Minimum time between requests to the same host in seconds
+            engine: Crawl engine, 'thread' (ThreadPoolExecutor) or 'async' (asyncio + aiohttp)
+            max_concurrency: Maximum number of in-flight fetches for the async engine
+            host_rate_limits: Optional {host_pattern: (requests_per_second, burst)}
+                overrides of the per-host rate limit
+            adaptive: Adjust per-host concurrency from latency and 429/503 rates (AIMD),
+                using max_workers (thread) or max_concurrency (async) as the ceiling
+            link_extractor: HTML link extraction backend: 'lxml', 'tokenizer' or 'bs4'
+            parse_workers: Number of processes for link extraction and normalization;
+                0 parses in the fetch workers
+            graph_store: 'networkx' (nx.DiGraph) or 'compact' (CompactGraph) for id_graph
+            frontier: 'memory', 'disk' (spills queued URLs to segment files) or
+                'priority' (most important URLs first, see PriorityFrontier)
+            frontier_dir: Directory for the disk frontier (a temporary one if None)
+            frontier_memory: Bytes of queued URL IDs the disk frontier keeps in memory
+            checkpoint_dir: Directory for an append-only crawl journal (no checkpoints if None)
+            resume: Restore the crawl state from the journal in checkpoint_dir, if any
+            http_cache_dir: Directory for an ETag / Last-Modified cache of extracted links,
+                used to revalidate pages instead of re-downloading them (no cache if None)
+            previous_snapshot: GraphSnapshot file of an earlier run; if it exists, its URLs
+                keep their IDs so snapshot().compare() yields a diff, and pages that
+                changed often in past runs are crawled first: across the crawl with
+                the priority frontier, among each page's links with FIFO frontiers
+            max_page_size: Bytes of an HTML page to download; longer pages are truncated
+            stream_parse: Parse pages while they download and queue their links
+                before the download completes (lxml and tokenizer extractors only)
+            max_connections_per_host: Cap on open connections to one host
+                (default: max_workers, or unlimited up to max_concurrency for async)
+            http2: Fetch with httpx over HTTP/2, multiplexing all requests to a
+                host over one connection (thread engine only, needs httpx[http2])
+            dns_ttl: Seconds to cache resolved host addresses for all workers
+            dns_resolver: getaddrinfo-compatible resolver (default: socket.getaddrinfo)
+            respect_robots: Fetch each host's robots.txt before its first page, skip
+                disallowed URLs and honor Crawl-delay
+            priority_weights: {'depth': ..., 'inlinks': ..., 'changes': ...} weights
+                of the priority frontier (default: 1 each)
+            url_weights: {regex: weight} priority adjustments of the priority frontier
+            max_pages: Stop after this many pages, counting pages restored by resume
+            max_depth: Only follow links up to this distance from start_url
+            max_bytes: Stop once this many HTML body bytes were downloaded in this run
+            max_time: Wall-clock deadline in seconds; pages in flight when it passes
+                are abandoned
+            max_pages_per_host: Crawl at most this many pages from any one host
+            strip_params: fnmatch patterns of query parameters to drop while normalizing
+                (default: URLNormalizer.DEFAULT_STRIP_PARAMS)
+            detect_traps: Prune calendars, session IDs and other endless URL spaces
+                (see TrapDetector)
+            trap_limits: Overrides of the TrapDetector limits, e.g. {'max_param_values': 50}
+            sitemaps: Seed the frontier from the sitemaps listed in robots.txt, or
+                /sitemap.xml if it lists none, before crawling
+            sitemap_urls: Further sitemap or sitemap index URLs to seed from
+            shard: This crawler's end of a DistributedCrawler link exchange; it then
+                crawls only the URLs of its shard (set by DistributedCrawler)
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine: {engine!r} (expected one of {self.ENGINES})")
+        if engine == 'async' and aiohttp is None:
+            raise ImportError("The async engine requires aiohttp: pip install aiohttp")
+        if http2 and engine != 'thread':
+            raise ValueError("http2 is only supported by the thread engine")
+        if http2 and httpx is None:
+            raise ImportError("HTTP/2 requires httpx: pip install 'httpx[http2]'")
+        if graph_store not in self.GRAPH_STORES:
+            raise ValueError(f"Unknown graph store: {graph_store!r} "
+                             f"(expected one of {self.GRAPH_STORES})")
+        if frontier not in self.FRONTIERS:
+            raise ValueError(f"Unknown frontier: {frontier!r} (expected one of {self.FRONTIERS})")
+        if link_extractor not in LINK_EXTRACTORS:
+            raise ValueError(f"Unknown link extractor: {link_extractor!r} "
+                             f"(expected one of {tuple(LINK_EXTRACTORS)})")
+        if stream_parse and parse_workers > 0:
+            raise ValueError("stream_parse parses in the fetch workers; "
+                             "it cannot be combined with parse_workers")
+        if stream_parse and LINK_EXTRACTORS[link_extractor].incremental is LinkExtractor.incremental:
+            raise ValueError(f"The {link_extractor!r} link extractor cannot parse incrementally")
+        if resume and checkpoint_dir is None:
+            raise ValueError("resume requires a checkpoint_dir")
+        self.budget = CrawlBudget(max_pages, max_depth, max_bytes, max_time, max_pages_per_host)
+        unknown = set(trap_limits or ()) - set(TrapDetector.LIMITS)
+        if unknown:
+            raise ValueError(f"Unknown trap limits: {sorted(unknown)} "
+                             f"(expected some of {TrapDetector.LIMITS})")
+        self.traps = TrapDetector(**(trap_limits or {})) if detect_traps else None
+        
         self.start_url = start_url
         self.parsed_start = urlparse(start_url)
         self.domain = self.parsed_start.netloc
         self.base_domain = self._extract_base_domain(self.domain)
-        self.visited: Set[str] = set()
-        self.to_visit: Set[str] = {start_url}
-        self.graph = nx.DiGraph()
+        self.urls = URLTable()
+        self.previous: Optional[GraphSnapshot] = None
+        if previous_snapshot and os.path.exists(previous_snapshot):
+            self.previous = GraphSnapshot.load(previous_snapshot)
+            for url in self.previous.urls:
+                self.urls.intern(url)
+        self.visited = IDBitSet()
+        if frontier == 'disk':
+            self.to_visit: Frontier = DiskFrontier(frontier_dir, frontier_memory)
+        elif frontier == 'priority':
+            weights = priority_weights or {}
+            self.to_visit = PriorityFrontier(self.urls.url, weights.get('depth', 1),
+                                             weights.get('inlinks', 1), url_weights,
+                                             weights.get('changes', 1),
+                                             self.previous.changes if self.previous else None)
+        else:
+            self.to_visit = MemoryFrontier()
+        self.id_graph = CompactGraph() if graph_store == 'compact' else nx.DiGraph()
+        self.checkpoint = CrawlCheckpoint(checkpoint_dir) if checkpoint_dir else None
+        self._journaled_urls = 0
+        self.shard = shard
+        self.sitemaps = sitemaps
+        self.sitemap_urls = list(sitemap_urls or ())
+        self.sitemap_stats = {'files': 0, 'urls': 0, 'seconds': 0.0}
+        # Per URL ID: sitemap <lastmod> as a Unix timestamp (0 = not given)
+        self.lastmod = array('q')
+        self._seeded = False
+        start_id = self.urls.intern(start_url)
+        self.budget.set_depth(start_id, 0)
+        if resume and self.checkpoint.exists():
+            self._restore_checkpoint()
+        else:
+            if self._owns(start_id):
+                self.to_visit.add(start_id)
+            resume = False
+        self.resume = resume
+        self.http_cache = HTTPCache(http_cache_dir) if http_cache_dir else None
+        self._url_graph: Optional[nx.DiGraph] = None
         self.page_content: Dict[str, str] = {}
         self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.engine = engine
         self.rate_limit = rate_limit
-        self.last_request_time = 0
+        self.rate_limiter = HostRateLimiter(
+            1.0 / rate_limit if rate_limit > 0 else 0, host_rules=host_rate_limits
+        )
+        capacity = max_concurrency if engine == 'async' else max_workers
+        self.utilization = UtilizationTracker(capacity)
+        self.concurrency = AdaptiveConcurrency(capacity) if adaptive else None
+        # Per host: URLs parked until it has a free concurrency slot, oldest first
+        self._deferred: Dict[str, deque] = {}
+        self.robots = RobotsPolicy() if respect_robots else None
+        self._robots_locks: Dict[str, asyncio.Lock] = {}
+        self.link_extractor = LINK_EXTRACTORS[link_extractor]()
+        self.normalizer = URLNormalizer(self.domain, self.base_domain, strip_params=strip_params)
+        self.parse_workers = parse_workers
+        self.max_page_size = max_page_size
+        self.stream_parse = stream_parse
+        self._early_links: queue.SimpleQueue = queue.SimpleQueue()
+        self._wakeup = None
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
-        logger.info(f"Crawler initialized - Domain: {self.domain}")
+        # Keep one pool per host for up to CONNECTION_POOLS hosts, each large
+        # enough for every worker, so keep-alive connections are never evicted
+        # or discarded; pool_block makes max_connections_per_host a hard cap
+        self.max_connections_per_host = max_connections_per_host
+        self.connection_stats = ConnectionStats()
+        self.dns = DNSCache(dns_ttl, resolver=dns_resolver or socket.getaddrinfo)
+        adapter = _CrawlHTTPAdapter(
+            self.connection_stats,
+            self.dns,
+            pool_connections=self.CONNECTION_POOLS,
+            pool_maxsize=min(max_workers, max_connections_per_host or max_workers),
+            pool_block=True
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._fetch_errors: Tuple = (requests.exceptions.RequestException,)
+        if http2:
+            self.session = _HTTP2Session(self.session.headers, self.connection_stats,
+                                         self.dns, self.CONNECTION_POOLS)
+            self._fetch_errors = (httpx.HTTPError, httpx.InvalidURL)
+        self.http2 = http2
+        logger.info(f"Crawler initialized - Domain: {self.domain}, Engine: {self.engine}"
+                    f"{' (HTTP/2)' if http2 else ''}"
+                    f"{f', Shard: {shard.index + 1}/{shard.count}' if shard else ''}")
     
     def _extract_base_domain(self, domain: str) -> str:
         """Extract the base domain from a full domain name."""
@@ -88,191 +3286,1572 @@ class WebCrawler:
         Returns:
             Normalized URL or None if invalid
         """
-        try:
-            url = url.strip()
-            # Skip non-HTTP protocols
-            if url.startswith(('javascript:', 'mailto:', 'tel:', 'data:', '#')):
-                return None
+        return self.normalizer.normalize(url, base_url)
+    
+    def _is_internal_url(self, url: str) -> bool:
+        """Check if URL belongs to the same domain."""
+        return self.normalizer.is_internal(url)
+    
+    def _fetch_page(self, url: str, retries: int = 3) -> Optional[str]:
+        """
+        Fetch page content with retry logic and rate limiting.
+        
+        Args:
+            url: URL to fetch
+            retries: Number of retry attempts
             
-            # Resolve relative URLs
-            if base_url:
-                url = urljoin(base_url, url)
+        Returns:
+            HTML content or None if failed
+        """
+        fetched = self._fetch_body(url, retries)
+        if fetched is None or fetched is CrawlBudget.CUT_OFF:
+            return None
+        body, encoding = fetched
+        return body.decode(encoding, errors='replace')
+    
+    def _fetch_body(self, url: str, retries: int = 3, revalidate: bool = False,
+                    links: Optional[LinkStream] = None):
+        """
+        Fetch the raw body of an HTML page with retry logic and rate limiting.
+        
+        Args:
+            url: URL to fetch
+            retries: Number of retry attempts
+            revalidate: Send conditional headers from the HTTP cache and stage
+                the validators of the response for it
+            links: Stream to feed the body into as it downloads; the returned
+                body is then empty
             
-            parsed = urlparse(url)
+        Returns:
+            Tuple of (body bytes, character encoding), HTTPCache.NOT_MODIFIED
+            if a revalidated page is unchanged, CrawlBudget.CUT_OFF if the
+            byte or time budget ran out first, or None if failed or disallowed
+            by robots.txt
+        """
+        if self.robots and not self._robots_allow(url):
+            return None
+        host = urlparse(url).netloc.lower()
+        cache = self.http_cache if revalidate else None
+        headers = cache.headers(url) if cache else None
+        if headers and self._unchanged_per_sitemap(url, headers):
+            return HTTPCache.NOT_MODIFIED
+        for attempt in range(retries):
+            backoff = 2 ** attempt
+            try:
+                # Per-host rate limiting
+                self.rate_limiter.acquire(host)
+                if self.budget.out_of_time():
+                    return CrawlBudget.CUT_OFF
+                
+                started = time.monotonic()
+                # Stream so that only the headers are read before deciding on the body
+                with self.session.get(url, timeout=15, allow_redirects=True,
+                                      headers=headers, stream=True) as response:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if self.concurrency:
+                        self.concurrency.record(host, time.monotonic() - started,
+                                                response.status_code, retry_after)
+                    
+                    is_page = (response.status_code == 200 and
+                               'text/html' in response.headers.get('content-type', '').lower())
+                    length = response.headers.get('content-length', '')
+                    if not is_page and length.isdigit() and int(length) <= self.CHUNK_SIZE:
+                        # Drain small skipped bodies so the connection stays reusable
+                        response.content
+                    
+                    if response.status_code == 200:
+                        if 'text/html' not in response.headers.get('content-type', '').lower():
+                            return None
+                        encoding = page_encoding(response.headers.get('content-type'))
+                        if links is not None:
+                            links.begin(encoding)
+                        body = self._read_body(response, links)
+                        if body is None:
+                            return CrawlBudget.CUT_OFF
+                        # Only complete pages get validators; a cut-off or failed
+                        # read must not have its links cached
+                        if cache:
+                            cache.stage(url, response.headers.get('ETag'),
+                                        response.headers.get('Last-Modified'))
+                        return body, encoding
+                    elif response.status_code == 304 and headers:
+                        return HTTPCache.NOT_MODIFIED
+                    elif response.status_code in (404, 410):
+                        return None
+                    elif retry_after:
+                        backoff = max(backoff, retry_after)
+                    
+            except self._fetch_errors:
+                if self.concurrency:
+                    self.concurrency.record(host, time.monotonic() - started, None)
             
-            # Only HTTP/HTTPS allowed
-            if parsed.scheme not in ('http', 'https'):
-                return None
+            # Exponential backoff
+            if attempt < retries - 1:
+                time.sleep(backoff)
+        
+        return None
+    
+    def _robots_allow(self, url: str) -> bool:
+        """
+        Check url against robots.txt, fetching the file first if its origin
+        has no cached rules. Threads crawling the same new origin wait for a
+        single fetch.
+        
+        Args:
+            url: URL about to be fetched
+        
+        Returns:
+            True if url may be fetched
+        """
+        origin = RobotsPolicy.origin(url)
+        if not self.robots.loaded(origin):
+            with self.robots.fetch_lock(origin):
+                if not self.robots.loaded(origin):
+                    status, body = None, b''
+                    self.rate_limiter.acquire(urlsplit(origin).netloc)
+                    try:
+                        with self.session.get(f"{origin}/robots.txt", timeout=15,
+                                              allow_redirects=True, stream=True) as response:
+                            status = response.status_code
+                            body = self._read_robots(response.iter_content(self.CHUNK_SIZE))
+                    except self._fetch_errors:
+                        pass
+                    self._apply_robots(origin, self.robots.load(origin, status, body))
+        return self.robots.allowed(url)
+    
+    async def _robots_allow_async(self, session: 'aiohttp.ClientSession', url: str) -> bool:
+        """Async counterpart of _robots_allow."""
+        origin = RobotsPolicy.origin(url)
+        if not self.robots.loaded(origin):
+            async with self._robots_locks.setdefault(origin, asyncio.Lock()):
+                if not self.robots.loaded(origin):
+                    status, body = None, b''
+                    await self.rate_limiter.acquire_async(urlsplit(origin).netloc)
+                    try:
+                        async with session.get(f"{origin}/robots.txt",
+                                               allow_redirects=True) as response:
+                            status = response.status
+                            body = b''
+                            async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                                body += chunk
+                                if len(body) >= RobotsPolicy.MAX_SIZE:
+                                    break
+                            body = body[:RobotsPolicy.MAX_SIZE]
+                    except (aiohttp.ClientError, asyncio.TimeoutError):
+                        pass
+                    self._apply_robots(origin, self.robots.load(origin, status, body))
+        return self.robots.allowed(url)
+    
+    @staticmethod
+    def _read_robots(chunks: Iterator[bytes]) -> bytes:
+        """
+        Read a robots.txt body up to RobotsPolicy.MAX_SIZE bytes, leaving the
+        rest of a huge or endless file unread.
+        
+        Args:
+            chunks: Body chunks of the streamed response
+        
+        Returns:
+            At most RobotsPolicy.MAX_SIZE bytes of the body
+        """
+        body = b''
+        for chunk in chunks:
+            body += chunk
+            if len(body) >= RobotsPolicy.MAX_SIZE:
+                break
+        return body[:RobotsPolicy.MAX_SIZE]
+    
+    def _unchanged_per_sitemap(self, url: str, headers: Dict[str, str]) -> bool:
+        """
+        Whether a sitemap dates the last change of a cached page no later than
+        the Last-Modified of the cached copy, so its links can be reused
+        without a request.
+        
+        Args:
+            url: URL about to be fetched
+            headers: Conditional headers from the HTTP cache
+        
+        Returns:
+            True if the page need not be fetched
+        """
+        since = headers.get('If-Modified-Since')
+        url_id = self.urls.get_id(url) if since else None
+        if url_id is None or url_id >= len(self.lastmod) or not self.lastmod[url_id]:
+            return False
+        try:
+            return self.lastmod[url_id] <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    
+    def _seed_from_sitemaps(self):
+        """
+        Queue the URLs listed in sitemaps before crawling.
+        
+        Sitemaps named in the start origin's robots.txt (or its /sitemap.xml if
+        robots.txt names none) and sitemap_urls are read one after another,
+        following sitemap indexes, and their URLs are queued while each file
+        downloads. Seeds count as linked from start_url for max_depth and are
+        exempt from trap detection, since the site lists them itself.
+        """
+        start = time.perf_counter()
+        origin = RobotsPolicy.origin(self.start_url)
+        pending = deque(self.sitemap_urls)
+        if self.sitemaps:
+            listed = []
+            if self.robots:
+                self._robots_allow(self.start_url)
+                listed = self.robots.sitemaps(origin)
+            pending.extend(listed or [f"{origin}/sitemap.xml"])
+        seen = set()
+        while pending and len(seen) < self.MAX_SITEMAPS and not self.budget.out_of_time():
+            url = pending.popleft()
+            if url not in seen:
+                seen.add(url)
+                pending.extend(self._read_sitemap(url))
+        if pending:
+            logger.warning(f"Sitemaps: stopped after {len(seen)} files, "
+                           f"{len(pending)} left unread")
+        self._seeded = True
+        
+        stats = self.sitemap_stats
+        stats['seconds'] = time.perf_counter() - start
+        logger.info(f"Sitemaps: {stats['urls']} URLs seeded from {stats['files']} files "
+                    f"in {stats['seconds']:.2f}s - {len(self.to_visit)} queued")
+    
+    def _read_sitemap(self, url: str) -> List[str]:
+        """
+        Stream one sitemap file into the frontier.
+        
+        Args:
+            url: URL of a sitemap, sitemap index or plain-text sitemap
+        
+        Returns:
+            URLs of the sitemaps it lists if it is a sitemap index
+        """
+        if self.robots and not self._robots_allow(url):
+            return []
+        stream = SitemapStream()
+        try:
+            self.rate_limiter.acquire(urlparse(url).netloc.lower())
+            with self.session.get(url, timeout=15, allow_redirects=True, stream=True) as response:
+                if response.status_code != 200:
+                    logger.info(f"Sitemap {url} unavailable ({response.status_code})")
+                    return []
+                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                    self._seed_urls(stream.feed(chunk))
+                    if stream.truncated:
+                        break
+            self._seed_urls(stream.close())
+        except self._fetch_errors + (etree.XMLSyntaxError, zlib.error) as e:
+            logger.warning(f"Error reading sitemap {url}: {e}")
+        if stream.truncated:
+            logger.warning(f"Sitemap {url} is larger than {stream.max_size} bytes or "
+                           f"{stream.max_urls} URLs; ignored the rest")
+        self.sitemap_stats['files'] += 1
+        return stream.sitemaps
+    
+    def _seed_urls(self, entries: List[Tuple[str, Optional[str]]]):
+        """
+        Journal and queue the page entries of a sitemap.
+        
+        Args:
+            entries: (loc, lastmod) pairs from SitemapStream
+        """
+        seeds = []
+        for loc, lastmod in entries:
+            url = self.normalizer.normalize(loc, cache=False)
+            if url is None:
+                continue
+            url_id = self.urls.intern(url)
+            seeds.append(url_id)
+            modified = parse_lastmod(lastmod)
+            if modified:
+                if url_id >= len(self.lastmod):
+                    self.lastmod.frombytes(bytes((max(url_id + 1 - len(self.lastmod),
+                                                      len(self.lastmod))) * self.lastmod.itemsize))
+                self.lastmod[url_id] = modified
+        if not seeds:
+            return
+        self.sitemap_stats['urls'] += len(seeds)
+        if self.checkpoint:
+            self.checkpoint.seed(self.urls.since(self._journaled_urls), seeds)
+            self._journaled_urls = len(self.urls)
+        for url_id in seeds:
+            self._queue_seed(url_id)
+    
+    def _queue_seed(self, url_id: int):
+        """Queue a URL listed in a sitemap as if start_url linked to it."""
+        start_id = self.urls.get_id(self.start_url)
+        if not self._owns(url_id):
+            self._export_link(url_id, start_id)
+            return
+        if self.traps is not None:
+            self.traps.exempt(url_id)
+        if self.budget.link(url_id, start_id) and url_id not in self.visited:
+            self.to_visit.add(url_id)
+    
+    def _apply_robots(self, origin: str, rules: RobotsRules):
+        """Feed an origin's Crawl-delay into the rate limiter."""
+        if rules.crawl_delay:
+            self.rate_limiter.slow_down(urlsplit(origin).netloc, rules.crawl_delay)
+            logger.info(f"Crawl-delay of {rules.crawl_delay:g}s for {origin}")
+    
+    def _read_body(self, response: requests.Response,
+                   links: Optional[LinkStream] = None) -> bytes:
+        """
+        Read a streamed response body, truncated to max_page_size bytes.
+        
+        Args:
+            response: Response opened with stream=True
+            links: Stream to feed each chunk into instead of keeping it
             
-            # Only internal URLs
-            if not self._is_internal_url(url):
+        Returns:
+            Body bytes (empty if links is given), or None if the byte or time
+            budget ran out before the body was read
+        """
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+            stop = self._take_chunk(chunk, size, chunks, links, response.url)
+            if stop is CrawlBudget.CUT_OFF:
                 return None
+            if stop:
+                break
+            size += len(chunk)
+        return b''.join(chunks)
+    
+    async def _read_body_async(self, response: 'aiohttp.ClientResponse',
+                               links: Optional[LinkStream] = None) -> bytes:
+        """Async counterpart of _read_body."""
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+            stop = self._take_chunk(chunk, size, chunks, links, response.url)
+            if stop is CrawlBudget.CUT_OFF:
+                return None
+            if stop:
+                break
+            size += len(chunk)
+        return b''.join(chunks)
+    
+    def _take_chunk(self, chunk: bytes, size: int, chunks: List[bytes],
+                    links: Optional[LinkStream], url) -> bool:
+        """
+        Keep or parse one body chunk, cutting it at max_page_size.
+        
+        Args:
+            chunk: Bytes just received
+            size: Bytes received before this chunk
+            chunks: Buffer for the body when it is not streamed
+            links: Stream to feed the chunk into, if any
+            url: URL of the response, for logging
+        
+        Returns:
+            True once max_page_size is reached and reading should stop,
+            CrawlBudget.CUT_OFF if the byte or time budget ran out and the
+            page is to be dropped, otherwise False
+        """
+        full = size + len(chunk) >= self.max_page_size
+        if full:
+            chunk = chunk[:self.max_page_size - size]
+        self.budget.add_bytes(len(chunk))
+        if self.budget.out_of_bytes() or self.budget.out_of_time():
+            return CrawlBudget.CUT_OFF
+        if links is not None:
+            links.feed(chunk)
+        else:
+            chunks.append(chunk)
+        if full:
+            logger.debug(f"Truncated {url} at {self.max_page_size} bytes")
+        return full
+    
+    def _extract_links(self, html: str, base_url: str) -> List[str]:
+        """
+        Extract and normalize all links from HTML content.
+        
+        Args:
+            html: HTML content
+            base_url: Base URL for resolving relative links
             
-            # Normalize query parameters
-            query_params = parse_qs(parsed.query, keep_blank_values=True)
-            sorted_query = urlencode(sorted(query_params.items()), doseq=True)
-            
-            # Reconstruct normalized URL
-            normalized = urlunparse((
-                parsed.scheme,
-                parsed.netloc.lower(),
-                parsed.path or '/',
-                parsed.params,
-                sorted_query,
-                ''
-            ))
-            
-            # Remove trailing slash except for root
-            if normalized.endswith('/') and normalized.count('/') > 3:
-                normalized = normalized[:-1]
+        Returns:
+            List of normalized URLs
+        """
+        return extract_links(html, base_url, self.normalizer, self.link_extractor)
+    
+    def _crawl_url(self, url: str) -> Tuple[str, List[str]]:
+        """
+        Crawl a single URL and extract its links.
+        
+        Args:
+            url: URL to crawl
             
-            return normalized
-        except Exception:
-            return None
+        Returns:
+            Tuple of (url, list of extracted links, or None if the crawl
+            budget cut the page off)
+        """
+        stream = self._link_stream(url) if self.stream_parse else None
+        fetched = self._fetch_body(url, revalidate=True, links=stream)
+        if fetched is CrawlBudget.CUT_OFF:
+            return url, None
+        if fetched is None:
+            return url, []
+        if fetched is HTTPCache.NOT_MODIFIED:
+            return url, self.http_cache.links(url)
+        if stream is not None:
+            return url, stream.close()
+        
+        body, encoding = fetched
+        links = self._extract_links(body.decode(encoding, errors='replace'), url)
+        return url, links
     
-    def _is_internal_url(self, url: str) -> bool:
-        """Check if URL belongs to the same domain."""
-        try:
-            parsed = urlparse(url)
-            url_domain = parsed.netloc.lower()
-            return (url_domain == self.domain.lower() or 
-                    url_domain.endswith('.' + self.base_domain.lower()))
-        except:
-            return False
+    def _link_stream(self, url: str) -> LinkStream:
+        """Create a LinkStream for url that publishes its links early."""
+        return LinkStream(self.link_extractor, url, self.normalizer,
+                          on_links=functools.partial(self._publish_links, url))
     
-    def _fetch_page(self, url: str, retries: int = 3) -> Optional[str]:
+    def _publish_links(self, url: str, links: List[str]):
         """
-        Fetch page content with retry logic and rate limiting.
+        Hand links of a page that is still downloading to the dispatcher.
+        Called from fetch threads, so the frontier is only touched by the dispatcher.
+        
+        Args:
+            url: URL of the page
+            links: Normalized links found so far
+        """
+        self._early_links.put((url, links))
+        wakeup = self._wakeup
+        if wakeup is not None and not wakeup.done():
+            try:
+                wakeup.set_result(None)
+            except (InvalidStateError, asyncio.InvalidStateError):
+                pass  # another worker woke the dispatcher first
+    
+    def _queue_early_links(self):
+        """Queue the links published by streaming fetches since the last call."""
+        while True:
+            try:
+                url, links = self._early_links.get_nowait()
+            except queue.Empty:
+                return
+            source = self.urls.intern(url)
+            for link in links:
+                target = self.urls.intern(link)
+                if self.traps is None or self.traps.allows(target, link):
+                    self._queue_link(target, source)
+    
+    async def _fetch_page_async(self, session: 'aiohttp.ClientSession', url: str,
+                                retries: int = 3) -> Optional[str]:
+        """
+        Async counterpart of _fetch_page with the same retry and backoff rules.
         
         Args:
+            session: Shared aiohttp session
             url: URL to fetch
             retries: Number of retry attempts
             
         Returns:
             HTML content or None if failed
         """
+        fetched = await self._fetch_body_async(session, url, retries)
+        if fetched is None or fetched is CrawlBudget.CUT_OFF:
+            return None
+        body, encoding = fetched
+        return body.decode(encoding, errors='replace')
+    
+    async def _fetch_body_async(self, session: 'aiohttp.ClientSession', url: str,
+                                retries: int = 3, revalidate: bool = False,
+                                links: Optional[LinkStream] = None):
+        """
+        Async counterpart of _fetch_body.
+        
+        Args:
+            session: Shared aiohttp session
+            url: URL to fetch
+            retries: Number of retry attempts
+            revalidate: Send conditional headers from the HTTP cache and stage
+                the validators of the response for it
+            links: Stream to feed the body into as it downloads
+            
+        Returns:
+            Tuple of (body bytes, character encoding), HTTPCache.NOT_MODIFIED
+            if a revalidated page is unchanged, CrawlBudget.CUT_OFF if the
+            byte budget ran out first, or None if failed or disallowed by
+            robots.txt
+        """
+        if self.robots and not await self._robots_allow_async(session, url):
+            return None
+        host = urlparse(url).netloc.lower()
+        cache = self.http_cache if revalidate else None
+        headers = cache.headers(url) if cache else None
+        if headers and self._unchanged_per_sitemap(url, headers):
+            return HTTPCache.NOT_MODIFIED
         for attempt in range(retries):
+            backoff = 2 ** attempt
             try:
-                # Rate limiting
-                elapsed = time.time() - self.last_request_time
-                if elapsed < self.rate_limit:
-                    time.sleep(self.rate_limit - elapsed)
+                await self.rate_limiter.acquire_async(host)
                 
-                self.last_request_time = time.time()
-                
-                response = self.session.get(url, timeout=15, allow_redirects=True)
-                
-                if response.status_code == 200:
-                    if 'text/html' in response.headers.get('content-type', '').lower():
-                        return response.text
-                elif response.status_code in (404, 410):
-                    return None
+                started = time.monotonic()
+                async with session.get(url, allow_redirects=True, headers=headers) as response:
+                    fetched = None
+                    if response.status == 200:
+                        if 'text/html' in response.headers.get('content-type', '').lower():
+                            encoding = page_encoding(response.headers.get('content-type'))
+                            if links is not None:
+                                links.begin(encoding)
+                            body = await self._read_body_async(response, links)
+                            if body is None:
+                                return CrawlBudget.CUT_OFF
+                            fetched = body, encoding
+                            if cache:
+                                cache.stage(url, response.headers.get('ETag'),
+                                            response.headers.get('Last-Modified'))
+                    elif response.status == 304 and headers:
+                        fetched = HTTPCache.NOT_MODIFIED
+                    if fetched is None and (response.content_length or self.CHUNK_SIZE + 1) <= self.CHUNK_SIZE:
+                        # Drain small skipped bodies so the connection stays reusable
+                        await response.read()
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if self.concurrency:
+                        self.concurrency.record(host, time.monotonic() - started,
+                                                response.status, retry_after)
                     
-            except requests.exceptions.RequestException:
-                pass
+                    if fetched is not None:
+                        return fetched
+                    elif response.status in (200, 404, 410):
+                        return None
+                    elif response.status != 200 and retry_after:
+                        backoff = max(backoff, retry_after)
+                        
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if self.concurrency:
+                    self.concurrency.record(host, time.monotonic() - started, None)
             
             # Exponential backoff
             if attempt < retries - 1:
-                time.sleep(2 ** attempt)
+                await asyncio.sleep(backoff)
         
         return None
     
-    def _extract_links(self, html: str, base_url: str) -> List[str]:
+    async def _crawl_url_async(self, session: 'aiohttp.ClientSession', url: str,
+                               semaphore: asyncio.BoundedSemaphore) -> Tuple[str, List[str]]:
         """
-        Extract and normalize all links from HTML content.
+        Crawl a single URL on the event loop and release its concurrency slot.
         
         Args:
-            html: HTML content
-            base_url: Base URL for resolving relative links
+            session: Shared aiohttp session
+            url: URL to crawl
+            semaphore: Semaphore slot acquired by the dispatcher for this URL
             
         Returns:
-            List of normalized URLs
+            Tuple of (url, list of extracted links, or None if the crawl
+            budget cut the page off)
         """
-        links = []
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Check for base tag
-            base_tag = soup.find('base', href=True)
-            if base_tag:
-                base_url = urljoin(base_url, base_tag['href'])
-            
-            # Extract all anchor tags
-            for tag in soup.find_all('a', href=True):
-                href = tag['href']
-                normalized = self._normalize_url(href, base_url)
-                if normalized and normalized not in self.visited:
-                    links.append(normalized)
-        except Exception:
-            pass
+            stream = self._link_stream(url) if self.stream_parse else None
+            fetched = await self._fetch_body_async(session, url, revalidate=True, links=stream)
+            if fetched is CrawlBudget.CUT_OFF:
+                return url, None
+            if fetched is None:
+                return url, []
+            if fetched is HTTPCache.NOT_MODIFIED:
+                return url, self.http_cache.links(url)
+            if stream is not None:
+                return url, stream.close()
+            if self._parse_pool is None:
+                body, encoding = fetched
+                return url, self._extract_links(body.decode(encoding, errors='replace'), url)
+            
+            # Hand the raw body to the parse processes, keeping the loop free
+            links = await asyncio.get_running_loop().run_in_executor(
+                self._parse_pool, _parse_page, fetched[0], fetched[1], url)
+            return url, links
+        finally:
+            semaphore.release()
+    
+    def _record_result(self, source: int, links: List[str], pbar: tqdm):
+        """
+        Add a crawled page and its links to the graph and queue new URLs.
+        
+        Args:
+            source: ID of the URL that was crawled
+            links: Normalized links extracted from the page
+            pbar: Progress bar to update
+        """
+        links = list(dict.fromkeys(links))
+        if self.http_cache:
+            self.http_cache.store(self.urls.url(source), links)
+        
+        self.id_graph.add_node(source)
+        targets = []
+        for link in links:
+            target = self.urls.intern(link)
+            # Links into a trap are left out of the graph as well as the frontier
+            if self.traps is None or self.traps.allows(target, link):
+                targets.append(target)
+                self.id_graph.add_edge(source, target)
+        
+        # Incremental crawls queue the links most likely to have changed first;
+        # the priority frontier orders them across the whole crawl instead
+        by_change = self.previous is not None and not isinstance(self.to_visit, PriorityFrontier)
+        for target in (sorted(targets, key=self._change_priority) if by_change else targets):
+            self._queue_link(target, source)
+        
+        if self.checkpoint:
+            self.checkpoint.record(self.urls.since(self._journaled_urls), source, targets)
+            self._journaled_urls = len(self.urls)
+        
+        # Update progress
+        pbar.update(1)
+        pbar.set_postfix({
+            'nodes': self.id_graph.number_of_nodes(),
+            'edges': self.id_graph.number_of_edges()
+        })
+    
+    def _queue_link(self, target: int, source: int):
+        """
+        Queue a linked URL unless it was crawled or lies beyond max_depth. Links
+        into another shard are sent to it instead.
+        """
+        if not self._owns(target):
+            self._export_link(target, source)
+            return
+        depth = self.budget.depth(source)
+        self._queue_reached(target, None if depth is None else depth + 1, source)
+    
+    def _queue_reached(self, url_id: int, depth: Optional[int], source: Optional[int] = None):
+        """
+        Queue a URL reached at depth unless it was crawled or lies beyond
+        max_depth. If it was crawled at a greater depth, its links are queued
+        again: pages finish out of BFS order, and with shards even more so, so
+        the links a page had at its first depth may have been cut off.
         
-        return links
+        Args:
+            url_id: ID of the URL
+            depth: Its distance from the start URL on this path, None if unknown
+            source: ID of the linking page, if any
+        """
+        known = self.budget.depth(url_id)
+        if not self.budget.reach(url_id, depth):
+            return
+        if url_id not in self.visited:
+            self.to_visit.add(url_id, source)
+        elif known is not None and depth is not None and depth < known and url_id in self.id_graph:
+            # A page still in flight may have no node yet; it queues its links
+            # at the new depth when it finishes
+            for target in list(self.id_graph.successors(url_id)):
+                self._queue_link(target, url_id)
     
-    def _crawl_url(self, url: str) -> Tuple[str, List[str]]:
+    def _owns(self, url_id: int) -> bool:
+        """Whether this crawler crawls a URL: always, unless it runs one shard."""
+        return self.shard is None or self.shard.owns(url_id, self.urls.url(url_id))
+    
+    def _export_link(self, target: int, source: int):
+        """Hand a link to the shard that owns its target, with the depth it reaches."""
+        depth = self.budget.depth(source)
+        self.shard.export(target, self.urls.url(target), None if depth is None else depth + 1)
+    
+    def _queue_remote(self, batch: List[Tuple[str, Optional[int]]]):
         """
-        Crawl a single URL and extract its links.
+        Queue the links another shard found into this one.
         
         Args:
-            url: URL to crawl
-            
+            batch: (url, depth) pairs; depth is None without max_depth
+        """
+        for url, depth in batch:
+            self._queue_reached(self.urls.intern(url), depth)
+    
+    def _exchange_links(self):
+        """Queue links received from other shards and send batches that are due."""
+        for batch in self.shard.receive():
+            self._queue_remote(batch)
+        self.shard.flush()
+    
+    def _await_links(self) -> bool:
+        """
+        Wait, once this shard has nothing left to crawl, for links from other shards.
+        
         Returns:
-            Tuple of (url, list of extracted links)
+            True if links arrived, False once the coordinator ends the crawl
         """
-        html = self._fetch_page(url)
-        if html is None:
-            return url, []
+        batch = self.shard.wait()
+        if batch is None:
+            return False
+        self._queue_remote(batch)
+        return True
+    
+    def _change_priority(self, url_id: int) -> int:
+        """Sort key for incremental crawls: new URLs, then the most often changed."""
+        changes = self.previous.changes
+        return -int(changes[url_id]) if url_id < len(changes) else -(1 << 32)
+    
+    def snapshot(self) -> GraphSnapshot:
+        """
+        Capture id_graph and the crawled pages as a GraphSnapshot.
         
-        links = self._extract_links(html, url)
-        return url, links
+        Returns:
+            GraphSnapshot sharing URL IDs with self.previous, if one was loaded
+        """
+        if isinstance(self.id_graph, CompactGraph):
+            nodes = np.asarray(self.id_graph.nodes(), dtype=np.int32)
+            sources, targets = self.id_graph.edge_arrays()
+        else:
+            nodes = np.sort(np.fromiter(self.id_graph.nodes(), dtype=np.int32,
+                                        count=self.id_graph.number_of_nodes()))
+            edges = np.array(list(self.id_graph.edges()), dtype=np.int32).reshape(-1, 2)
+            sources, targets = edges[:, 0], edges[:, 1]
+        return GraphSnapshot(self.urls.since(0), nodes, self.visited.to_array(),
+                             GraphSnapshot.edge_keys(sources, targets))
+    
+    def _restore_checkpoint(self):
+        """
+        Rebuild the URL table, visited set, graph and frontier from the journal.
+        """
+        start = time.perf_counter()
+        linked = []
+        for new_urls, page, links in self.checkpoint.replay():
+            for url in new_urls:
+                self.urls.intern(url)
+            if page is None:
+                # URLs seeded from sitemaps; the sitemaps are not read again
+                linked.append((page, links))
+                self._seeded = True
+                continue
+            self.visited.add(page)
+            self.id_graph.add_node(page)
+            for target in links:
+                self.id_graph.add_edge(page, target)
+            linked.append((page, links))
+        self._journaled_urls = len(self.urls)
+        
+        start_id = self.urls.intern(self.start_url)
+        if start_id not in self.visited and self._owns(start_id):
+            self.to_visit.add(start_id)
+        # Replaying in crawl order gives every page the depth it had when crawled
+        for page, links in linked:
+            if page is None:
+                for url_id in links:
+                    self._queue_seed(url_id)
+                continue
+            self.budget.page_started(self._host(page) if self.budget.max_pages_per_host else None,
+                                     fetching=False)
+            for url_id in links:
+                if self.traps is not None:
+                    self.traps.allows(url_id, self.urls.url(url_id))
+                self._queue_link(url_id, page)
+        logger.info(f"Resumed from checkpoint in {time.perf_counter() - start:.2f}s - "
+                    f"{len(self.visited)} pages crawled, {len(self.to_visit)} queued")
+    
+    def _host(self, url_id: int) -> str:
+        """Return the lowercased host of an interned URL."""
+        return urlparse(self.urls.url(url_id)).netloc.lower()
+    
+    def _next_url(self) -> Optional[int]:
+        """
+        Pop the next unvisited URL that may be dispatched right now.
+        
+        In adaptive mode, URLs whose host has no free concurrency slot are
+        parked per host and handed out, oldest first, once that host frees up.
+        
+        Returns:
+            ID of the URL to crawl, or None if nothing can be dispatched yet
+            or the crawl budget is spent or committed to the pages in flight
+        """
+        if self.budget.exhausted() or self.budget.bytes_committed():
+            return None
+        if self.concurrency is None:
+            while self.to_visit:
+                url_id = self.to_visit.pop()
+                if url_id not in self.visited and self._may_schedule(url_id):
+                    return url_id
+            return None
+        
+        # Parked URLs of hosts that have room again come first
+        for host in list(self._deferred):
+            if self.concurrency.try_acquire(host):
+                parked = self._deferred[host]
+                while parked:
+                    url_id = parked.popleft()
+                    if url_id not in self.visited and self._may_schedule(url_id):
+                        break
+                else:
+                    url_id = None
+                if not parked:
+                    del self._deferred[host]
+                if url_id is not None:
+                    return url_id
+                self.concurrency.release(host)
+        
+        while self.to_visit:
+            url_id = self.to_visit.pop()
+            if url_id in self.visited or not self._may_schedule(url_id):
+                continue
+            host = self._host(url_id)
+            if host not in self._deferred and self.concurrency.try_acquire(host):
+                return url_id
+            self._deferred.setdefault(host, deque()).append(url_id)
+        
+        return None
+    
+    def _may_schedule(self, url_id: int) -> bool:
+        """Whether robots.txt and max_pages_per_host allow crawling a URL now."""
+        if (self.budget.max_pages_per_host is not None
+                and not self.budget.allows_host(self._host(url_id))):
+            return False
+        return self.robots is None or self.robots.allowed(self.urls.url(url_id))
     
-    def crawl(self) -> nx.DiGraph:
+    def _start_page(self, url_id: int) -> str:
         """
-        Execute the crawling process using concurrent threads.
+        Mark a URL visited and charge it to the crawl budget.
+        
+        Args:
+            url_id: ID of the URL being dispatched
+        
+        Returns:
+            The URL
+        """
+        self.visited.add(url_id)
+        self.budget.page_started(self._host(url_id) if self.budget.max_pages_per_host else None)
+        return self.urls.url(url_id)
+    
+    def _release_url(self, url_id: int):
+        """Return the adaptive concurrency slot held by a finished URL."""
+        if self.concurrency:
+            self.concurrency.release(self._host(url_id))
+    
+    def _abandon_pages(self, fetching, parsing=()):
+        """
+        Forget pages cut off by max_time. They are not journaled, so a resumed
+        crawl queues and fetches them again.
+        
+        Args:
+            fetching: IDs of pages whose fetch is still running
+            parsing: IDs of fetched pages still being parsed
+        """
+        for url_id in fetching:
+            self._release_url(url_id)
+            self.utilization.task_finished()
+            self.budget.page_finished()
+            self._drop_page(url_id)
+        for url_id in parsing:
+            self._drop_page(url_id)
+    
+    def _drop_page(self, url_id: int):
+        """Forget a dispatched page that will not be recorded, so it is fetched again."""
+        self.visited.discard(url_id)
+        if self.http_cache:
+            self.http_cache.discard(self.urls.url(url_id))
+    
+    def _wait_timeout(self) -> Optional[float]:
+        """Seconds the dispatcher may block: it wakes for parked URLs and for max_time."""
+        timeouts = [timeout for timeout in (0.5 if self._deferred else None,
+                                            self.budget.remaining())
+                    if timeout is not None]
+        return min(timeouts) if timeouts else None
+    
+    @property
+    def graph(self) -> nx.DiGraph:
+        """
+        URL-labelled view of id_graph, resolved from IDs when first needed.
+        Large crawls should pass id_graph and urls to the exporters instead.
+        """
+        if (self._url_graph is None
+                or self._url_graph.number_of_nodes() != self.id_graph.number_of_nodes()
+                or self._url_graph.number_of_edges() != self.id_graph.number_of_edges()):
+            if isinstance(self.id_graph, CompactGraph):
+                self._url_graph = self.id_graph.to_networkx(self.urls)
+            else:
+                self._url_graph = nx.relabel_nodes(self.id_graph, self.urls.url, copy=True)
+        return self._url_graph
+    
+    def crawl(self, resolve: bool = True):
+        """
+        Execute the crawling process with the configured engine.
+        
+        Args:
+            resolve: Return the URL-labelled graph; if False, return id_graph,
+                whose node IDs resolve through self.urls
         
         Returns:
-            NetworkX DiGraph representing the website structure
+            NetworkX DiGraph representing the website structure, or id_graph
+            (nx.DiGraph or CompactGraph) if resolve is False
         """
         logger.info(f"Starting crawl from: {self.start_url}")
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            with tqdm(desc="Crawling pages", unit="page") as pbar:
-                while self.to_visit:
-                    # Prepare batch of URLs
-                    batch = []
-                    while self.to_visit and len(batch) < self.max_workers * 2:
-                        url = self.to_visit.pop()
-                        if url not in self.visited:
-                            batch.append(url)
-                            self.visited.add(url)
-                    
-                    if not batch:
+        if self.parse_workers > 0:
+            self._parse_pool = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                initializer=_init_parse_worker,
+                initargs=(self.normalizer, self.link_extractor.name)
+            )
+        
+        if self.checkpoint:
+            self.checkpoint.open(resume=self.resume)
+        if self.http_cache:
+            self.http_cache.open()
+        
+        self.utilization.start()
+        self.budget.start()
+        try:
+            if ((self.sitemaps or self.sitemap_urls) and not self._seeded
+                    and self._owns(self.urls.get_id(self.start_url))):
+                self._seed_from_sitemaps()
+            desc, position = ("Crawling pages", None) if self.shard is None else (
+                f"Shard {self.shard.index + 1}/{self.shard.count}", self.shard.index)
+            with tqdm(desc=desc, unit="page", position=position) as pbar:
+                if self.engine == 'async':
+                    asyncio.run(self._crawl_async(pbar))
+                else:
+                    self._crawl_threaded(pbar)
+        finally:
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown()
+                self._parse_pool = None
+            if self.checkpoint:
+                self.checkpoint.close()
+            if self.http_cache:
+                self.http_cache.close()
+            if not self.to_visit:
+                self.to_visit.close()
+        
+        logger.info(f"Worker utilization: {self.utilization.utilization():.1%}")
+        logger.info(f"URL normalizer cache hit rate: {self.normalizer.cache_stats()['hit_rate']:.1%}")
+        connections = self.connection_stats.summary()
+        logger.info(f"Connections: {connections['connections']} opened for "
+                    f"{connections['requests']} requests to {connections['hosts']} hosts "
+                    f"(reuse {connections['reuse_rate']:.1%})")
+        dns = self.dns.stats()
+        logger.info(f"DNS: {dns['lookups']} lookups, {dns['hit_rate']:.1%} cached, "
+                    f"{dns['resolutions']} resolved in {dns['mean_ms']:.1f} ms on average "
+                    f"(max {dns['max_ms']:.1f} ms), {dns['failures']} failed")
+        if self.robots:
+            logger.info(f"robots.txt: {self.robots.fetched} fetched, "
+                        f"{self.robots.blocked} URLs disallowed")
+        if self.traps:
+            traps = self.traps.stats(top=3)
+            if traps['pruned']:
+                logger.info(f"Traps: {traps['pruned']} URLs pruned in {traps['traps']} traps, "
+                            f"largest: {', '.join(f'{trap} ({count})' for trap, count in traps['top'])}")
+        budget = self.budget.summary()
+        if budget['stop_reason']:
+            logger.info(f"Crawl budget: stopped by {budget['stop_reason']} after {len(self.visited)} "
+                        f"pages, {budget['bytes']} bytes and {budget['seconds']:.1f}s; "
+                        f"{len(self.to_visit)} URLs left in the frontier")
+        if budget['beyond_depth'] or budget['beyond_host_cap']:
+            logger.info(f"Crawl budget: {budget['beyond_depth']} links beyond max_depth, "
+                        f"{budget['beyond_host_cap']} URLs over max_pages_per_host skipped")
+        if self.http_cache:
+            cache_stats = self.http_cache.stats()
+            logger.info(f"HTTP cache: {cache_stats['revalidated']} pages not modified, "
+                        f"{cache_stats['stored']} entries updated")
+        if self.concurrency:
+            logger.info(f"Adaptive concurrency limits: "
+                        f"{ {host: s['limit'] for host, s in self.concurrency.stats().items()} }")
+        if self.shard:
+            exchange = self.shard.summary()
+            logger.info(f"Shard {self.shard.index + 1}/{self.shard.count}: {len(self.visited)} pages, "
+                        f"{exchange['links_sent']} links sent in {exchange['batches_sent']} batches, "
+                        f"{exchange['links_received']} received")
+        return self.graph if resolve else self.id_graph
+    
+    def _crawl_threaded(self, pbar: tqdm):
+        """
+        Crawl using a pool of OS threads, each blocking on the shared session.
+        Keeps max_workers pages in flight, so a slow page only occupies its own worker.
+        With parse_workers, threads only fetch and parsing runs in the process pool.
+        
+        Args:
+            pbar: Progress bar to update
+        """
+        # Fetch workers only download when a parse pool is configured
+        fetch = (self._crawl_url if self._parse_pool is None
+                 else functools.partial(self._fetch_body, revalidate=True))
+        parse_backlog = self.parse_workers * 4
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = {}
+        parsing = {}
+        try:
+            while pending or parsing or (
+                    (self.to_visit or self._deferred) and not self.budget.exhausted()) or (
+                    self.shard is not None and self._await_links()):
+                if self.budget.out_of_time():
+                    self._abandon_pages(pending.values(), parsing.values())
+                    break
+                if self.shard is not None:
+                    self._exchange_links()
+                
+                # Streaming fetches wake the dispatcher when they publish links
+                if self.stream_parse:
+                    if self._wakeup is None or self._wakeup.done():
+                        self._wakeup = Future()
+                    self._queue_early_links()
+                
+                # Refill every free worker as soon as it frees up, unless the
+                # parse processes are falling behind
+                while len(pending) < self.max_workers and len(parsing) <= parse_backlog:
+                    url_id = self._next_url()
+                    if url_id is None:
                         break
-                    
-                    # Submit crawl tasks
-                    futures = {executor.submit(self._crawl_url, url): url for url in batch}
-                    
-                    # Process completed tasks
-                    for future in as_completed(futures):
-                        try:
-                            source_url, links = future.result()
-                            
-                            # Add to graph
-                            self.graph.add_node(source_url)
-                            for link in links:
-                                self.graph.add_edge(source_url, link)
-                                if link not in self.visited:
-                                    self.to_visit.add(link)
-                            
-                            # Update progress
-                            pbar.update(1)
-                            pbar.set_postfix({
-                                'nodes': self.graph.number_of_nodes(),
-                                'edges': self.graph.number_of_edges()
-                            })
-                        except Exception:
-                            pass
-        
-        return self.graph
+                    pending[executor.submit(fetch, self._start_page(url_id))] = url_id
+                    self.utilization.task_started()
+                
+                if not pending and not parsing:
+                    # Every remaining host is paused by Retry-After
+                    time.sleep(0.1)
+                    continue
+                
+                # Process whichever pages finish first
+                waiting = [*pending, *parsing]
+                if self._wakeup is not None:
+                    waiting.append(self._wakeup)
+                done, _ = wait(waiting, timeout=self._wait_timeout(),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future is self._wakeup:
+                        continue
+                    try:
+                        if future in parsing:
+                            self._record_result(parsing.pop(future), future.result(), pbar)
+                            continue
+                        
+                        url_id = pending.pop(future)
+                        self._release_url(url_id)
+                        self.utilization.task_finished()
+                        self.budget.page_finished()
+                        if self._parse_pool is None:
+                            _, links = future.result()
+                            if links is None:
+                                # Cut off by the budget: a resumed crawl fetches it again
+                                self._drop_page(url_id)
+                            else:
+                                self._record_result(url_id, links, pbar)
+                        elif future.result() is CrawlBudget.CUT_OFF:
+                            self._drop_page(url_id)
+                        elif future.result() is None:
+                            self._record_result(url_id, [], pbar)
+                        elif future.result() is HTTPCache.NOT_MODIFIED:
+                            self._record_result(
+                                url_id, self.http_cache.links(self.urls.url(url_id)), pbar)
+                        else:
+                            body, encoding = future.result()
+                            parsing[self._parse_pool.submit(
+                                _parse_page, body, encoding, self.urls.url(url_id))] = url_id
+                    except Exception:
+                        pass
+        finally:
+            # Abandoned fetches stop at their next chunk; do not wait for them
+            executor.shutdown(wait=not pending)
+        self._wakeup = None
+    
+    async def _crawl_async(self, pbar: tqdm):
+        """
+        Crawl on a single event loop with up to max_concurrency in-flight fetches.
+        
+        Args:
+            pbar: Progress bar to update
+        """
+        semaphore = asyncio.BoundedSemaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency,
+                                         limit_per_host=self.max_connections_per_host or 0,
+                                         resolver=_AsyncDNSResolver(self.dns),
+                                         use_dns_cache=False)
+        timeout = aiohttp.ClientTimeout(total=15)
+        
+        # Same connection accounting as the thread engine's adapter
+        stats = self.connection_stats
+        trace = aiohttp.TraceConfig()
+        
+        async def on_request_start(session, context, params):
+            context.host = params.url.host
+            stats.request_sent()
+        
+        async def on_connection_create_end(session, context, params):
+            stats.connection_opened(context.host)
+        
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        
+        async with aiohttp.ClientSession(headers=dict(self.session.headers),
+                                         connector=connector, timeout=timeout,
+                                         trace_configs=[trace]) as session:
+            pending = {}
+            while pending or ((self.to_visit or self._deferred) and not self.budget.exhausted()) or (
+                    self.shard is not None and self._await_links()):
+                if self.budget.out_of_time():
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    self._abandon_pages(pending.values())
+                    break
+                if self.shard is not None:
+                    self._exchange_links()
+                
+                # Streaming fetches wake the dispatcher when they publish links
+                if self.stream_parse:
+                    if self._wakeup is None or self._wakeup.done():
+                        self._wakeup = asyncio.get_running_loop().create_future()
+                    self._queue_early_links()
+                
+                # Dispatch new URLs while concurrency slots are free
+                while not semaphore.locked():
+                    url_id = self._next_url()
+                    if url_id is None:
+                        break
+                    await semaphore.acquire()
+                    pending[asyncio.ensure_future(self._crawl_url_async(
+                        session, self._start_page(url_id), semaphore))] = url_id
+                    self.utilization.task_started()
+                
+                if not pending:
+                    # Every remaining host is paused by Retry-After
+                    await asyncio.sleep(0.1)
+                    continue
+                
+                # Process whichever fetches finish first
+                waiting = [*pending]
+                if self._wakeup is not None:
+                    waiting.append(self._wakeup)
+                done, _ = await asyncio.wait(waiting, timeout=self._wait_timeout(),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is self._wakeup:
+                        continue
+                    url_id = pending.pop(task)
+                    self._release_url(url_id)
+                    self.utilization.task_finished()
+                    self.budget.page_finished()
+                    try:
+                        _, links = task.result()
+                        if links is None:
+                            # Cut off by the budget: a resumed crawl fetches it again
+                            self._drop_page(url_id)
+                        else:
+                            self._record_result(url_id, links, pbar)
+                    except Exception:
+                        pass
+            self._wakeup = None
+
+
+class ShardExchange:
+    """
+    A worker's end of the link exchange of a DistributedCrawler.
+    
+    Every URL belongs to one shard, chosen by a CRC-32 of its host (or of the
+    whole URL), so all processes agree without talking to each other. The
+    owner of each URL ID is computed once and kept in a one-byte-per-ID
+    table. Links into other shards are buffered per shard and sent through
+    the coordinator in batches of batch_size, or after flush_interval
+    seconds, and each URL is sent at most once unless a shorter depth turns
+    up later. The coordinator forwards every batch to its owner and counts
+    them to tell when all workers are idle with nothing in transit.
+    """
+    
+    SHARD_BY = ('host', 'url')
+    
+    def __init__(self, index: int, count: int, inbox, outbox, shard_by: str = 'host',
+                 batch_size: int = 1000, flush_interval: float = 0.05):
+        """
+        Initialize the exchange.
+        
+        Args:
+            index: This worker's shard, from 0
+            count: Number of shards
+            inbox: Queue of link batches (or None to stop) from the coordinator
+            outbox: Queue of messages to the coordinator
+            shard_by: 'host' or 'url'
+            batch_size: Links per batch sent to one shard
+            flush_interval: Seconds before a partial batch is sent
+        """
+        self.index = index
+        self.count = count
+        self.inbox = inbox
+        self.outbox = outbox
+        self.shard_by = shard_by
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffers: List[List[Tuple[str, Optional[int]]]] = [[] for _ in range(count)]
+        # Per URL ID: owning shard + 1 (0 = not computed yet)
+        self._owners = bytearray()
+        # Per URL ID: smallest depth + 1 sent to its owner (0 = never sent)
+        self._sent = array('i')
+        self._last_flush = time.monotonic()
+        self._parent = os.getppid()
+        self.stopped = False
+        self.received = 0
+        self.batches_sent = 0
+        self.links_sent = 0
+        self.links_received = 0
+    
+    def shard_of(self, url: str) -> int:
+        """Return the shard that owns a URL."""
+        return self.owner(url, self.count, self.shard_by)
+    
+    @staticmethod
+    def owner(url: str, count: int, shard_by: str = 'host') -> int:
+        """Return the shard that owns a URL when the crawl has count shards."""
+        if shard_by == 'host':
+            origin = RobotsPolicy.origin(url)
+            url = origin[origin.find('//') + 2:]
+        return zlib.crc32(url.encode('utf-8')) % count
+    
+    def owns(self, url_id: int, url: str) -> bool:
+        """
+        Check whether this worker's shard owns a URL.
+        
+        Args:
+            url_id: ID of the URL in the worker's URLTable
+            url: The normalized URL
+        
+        Returns:
+            True if this worker crawls the URL
+        """
+        if url_id >= len(self._owners):
+            self._owners.extend(bytes(max(url_id + 1 - len(self._owners), len(self._owners))))
+        owner = self._owners[url_id]
+        if not owner:
+            owner = self._owners[url_id] = self.shard_of(url) + 1
+        return owner - 1 == self.index
+    
+    def export(self, url_id: int, url: str, depth: Optional[int]):
+        """
+        Buffer a link for the shard that owns it; owns() must have been called.
+        
+        Args:
+            url_id: ID of the URL in the worker's URLTable
+            url: The normalized URL
+            depth: Its distance from the start URL, None without max_depth
+        """
+        if url_id >= len(self._sent):
+            self._sent.frombytes(bytes(max(url_id + 1 - len(self._sent),
+                                           len(self._sent)) * self._sent.itemsize))
+        rank = depth + 1 if depth is not None else 0x7FFFFFFF
+        sent = self._sent[url_id]
+        if sent and sent <= rank:
+            return
+        self._sent[url_id] = rank
+        shard = self._owners[url_id] - 1
+        buffer = self._buffers[shard]
+        buffer.append((url, depth))
+        if len(buffer) >= self.batch_size:
+            self._send(shard)
+    
+    def flush(self, force: bool = False):
+        """
+        Send the buffered links.
+        
+        Args:
+            force: Send even if flush_interval has not passed since the last flush
+        """
+        if not force and time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        for shard, buffer in enumerate(self._buffers):
+            if buffer:
+                self._send(shard)
+        self._last_flush = time.monotonic()
+    
+    def _send(self, shard: int):
+        """Hand one shard's buffer to the coordinator."""
+        buffer = self._buffers[shard]
+        self._buffers[shard] = []
+        self.outbox.put(('links', shard, buffer))
+        self.batches_sent += 1
+        self.links_sent += len(buffer)
+    
+    def _take(self, batch) -> Optional[List[Tuple[str, Optional[int]]]]:
+        """Count a batch taken from the inbox; None is the stop signal."""
+        if batch is None:
+            self.stopped = True
+            return None
+        self.received += 1
+        self.links_received += len(batch)
+        return batch
+    
+    def receive(self) -> List[List[Tuple[str, Optional[int]]]]:
+        """Return the batches that arrived since the last call, without blocking."""
+        batches = []
+        while not self.stopped:
+            try:
+                batch = self._take(self.inbox.get_nowait())
+            except queue.Empty:
+                break
+            if batch is not None:
+                batches.append(batch)
+        return batches
+    
+    def wait(self) -> Optional[List[Tuple[str, Optional[int]]]]:
+        """
+        Send all buffered links, report this worker idle and block until a
+        batch arrives.
+        
+        Returns:
+            The batch, or None once the coordinator ends the crawl (or exits)
+        """
+        self.flush(force=True)
+        # The coordinator knows how many batches it forwarded here; the count
+        # consumed tells it whether any are still in transit
+        self.outbox.put(('idle', self.index, self.received))
+        while not self.stopped:
+            try:
+                return self._take(self.inbox.get(timeout=1.0))
+            except queue.Empty:
+                if os.getppid() != self._parent:
+                    self.stopped = True
+        return None
+    
+    def summary(self) -> Dict:
+        """Return counts of batches and links sent and received."""
+        return {
+            'batches_sent': self.batches_sent,
+            'links_sent': self.links_sent,
+            'batches_received': self.received,
+            'links_received': self.links_received,
+        }
+
+
+def _run_shard(index: int, count: int, start_url: str, options: Dict, inbox, outbox,
+               shard_by: str, batch_size: int):
+    """
+    Worker process of a DistributedCrawler: crawl one shard and send back its
+    graph as a GraphSnapshot.
+    """
+    try:
+        exchange = ShardExchange(index, count, inbox, outbox, shard_by, batch_size)
+        crawler = WebCrawler(start_url, shard=exchange, **options)
+        crawler.crawl(resolve=False)
+        summary = exchange.summary()
+        summary['pages'] = len(crawler.visited)
+        summary['budget'] = crawler.budget.summary()
+        outbox.put(('done', index, crawler.snapshot(), summary))
+    except Exception:
+        outbox.put(('error', index, traceback.format_exc()))
+
+
+class DistributedCrawler:
+    """
+    Crawl with several local worker processes, each a WebCrawler that owns one
+    shard of the URL space (see ShardExchange).
+    
+    Every worker has its own frontier, visited set, robots.txt cache, rate
+    limiter and journal, and crawls only the URLs of its shard; links into
+    other shards travel in batches through this coordinator. Sharding by host
+    puts each host in exactly one process, so per-host rate limits,
+    Crawl-delay and max_pages_per_host behave as in a single process. The
+    crawl ends when every worker is idle and has consumed every batch
+    forwarded to it. The workers' graphs are then merged by URL into
+    id_graph, which equals the graph of a single-process crawl except where
+    that depends on crawl order anyway: trap detection, which each worker
+    applies to the links it finds, and the crawl budgets. max_pages and
+    max_bytes are split evenly over the workers, so together they stay
+    within them, though a shard that runs out of URLs leaves its share
+    unused. max_time, max_depth and max_pages_per_host apply to each worker
+    as they are.
+    """
+    
+    # Directories each worker gets a subdirectory of
+    SHARD_DIRS = ('checkpoint_dir', 'http_cache_dir', 'frontier_dir')
+    # Budgets divided between the workers
+    SPLIT_BUDGETS = ('max_pages', 'max_bytes')
+    
+    def __init__(self, start_url: str, shards: int = 4, shard_by: str = 'host',
+                 batch_size: int = 1000, **options):
+        """
+        Initialize the coordinator.
+        
+        Args:
+            start_url: The URL to start crawling from
+            shards: Number of worker processes (at most 255)
+            shard_by: 'host' or 'url'; URL sharding spreads a single large host
+                over all workers, but each then rate-limits it separately
+            batch_size: Links per batch sent to another shard
+            **options: WebCrawler arguments for every worker; checkpoint_dir,
+                http_cache_dir and frontier_dir get a subdirectory per shard.
+                max_pages and max_bytes are divided between the workers
+        """
+        if not 1 <= shards <= 255:
+            raise ValueError(f"shards must be between 1 and 255, got {shards}")
+        if shard_by not in ShardExchange.SHARD_BY:
+            raise ValueError(f"Unknown shard_by: {shard_by!r} "
+                             f"(expected one of {ShardExchange.SHARD_BY})")
+        if 'shard' in options:
+            raise ValueError("shard is set by DistributedCrawler for each worker")
+        self.start_url = start_url
+        self.shards = shards
+        self.shard_by = shard_by
+        self.batch_size = batch_size
+        self.options = options
+        self.urls = URLTable()
+        self.previous: Optional[GraphSnapshot] = None
+        previous_snapshot = options.get('previous_snapshot')
+        if previous_snapshot and os.path.exists(previous_snapshot):
+            self.previous = GraphSnapshot.load(previous_snapshot)
+            for url in self.previous.urls:
+                self.urls.intern(url)
+        self.id_graph = (CompactGraph() if options.get('graph_store') == 'compact'
+                         else nx.DiGraph())
+        self.visited = IDBitSet()
+        self.summaries: List[Optional[Dict]] = [None] * shards
+        self._url_graph: Optional[nx.DiGraph] = None
+    
+    # The merged graph has the attributes these read: id_graph, urls, visited
+    graph = WebCrawler.graph
+    snapshot = WebCrawler.snapshot
+    
+    def worker_options(self, index: int) -> Dict:
+        """
+        Build the WebCrawler arguments of one worker.
+        
+        Args:
+            index: Shard number, from 0
+        
+        Returns:
+            Keyword arguments for WebCrawler
+        """
+        options = dict(self.options)
+        for name in self.SHARD_DIRS:
+            if options.get(name):
+                options[name] = os.path.join(options[name], f'shard-{index}')
+        # Remainders go to the shards from the start URL's on, so a budget
+        # smaller than the shard count still fetches the start page
+        rank = (index - ShardExchange.owner(self.start_url, self.shards, self.shard_by)) % self.shards
+        for name in self.SPLIT_BUDGETS:
+            if options.get(name) is not None:
+                share, extra = divmod(options[name], self.shards)
+                options[name] = share + (rank < extra)
+        return options
+    
+    def crawl(self, resolve: bool = True):
+        """
+        Run the workers until the crawl is complete and merge their graphs.
+        
+        Args:
+            resolve: Return the URL-labelled graph; if False, return id_graph,
+                whose node IDs resolve through self.urls
+        
+        Returns:
+            NetworkX DiGraph representing the website structure, or id_graph
+            if resolve is False
+        """
+        logger.info(f"Starting distributed crawl from: {self.start_url} "
+                    f"({self.shards} shards by {self.shard_by})")
+        start = time.perf_counter()
+        context = multiprocessing.get_context()
+        outbox = context.Queue()
+        inboxes = [context.Queue() for _ in range(self.shards)]
+        workers = [context.Process(target=_run_shard, name=f'crawl-shard-{index}',
+                                   args=(index, self.shards, self.start_url,
+                                         self.worker_options(index), inboxes[index], outbox,
+                                         self.shard_by, self.batch_size))
+                   for index in range(self.shards)]
+        for worker in workers:
+            worker.start()
+        try:
+            snapshots, exchanged = self._coordinate(workers, inboxes, outbox)
+        except BaseException:
+            for worker in workers:
+                worker.terminate()
+            raise
+        finally:
+            for inbox in inboxes:
+                # Batches for workers that stopped early are never read
+                inbox.cancel_join_thread()
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+        
+        self._merge(snapshots)
+        logger.info(f"Distributed crawl: {len(self.visited)} pages "
+                    f"({', '.join(str(summary['pages']) for summary in self.summaries)} per shard) "
+                    f"in {time.perf_counter() - start:.1f}s; {exchanged[1]} links exchanged "
+                    f"in {exchanged[0]} batches")
+        return self.graph if resolve else self.id_graph
+    
+    def _coordinate(self, workers: List, inboxes: List, outbox) -> Tuple[List[GraphSnapshot],
+                                                                         Tuple[int, int]]:
+        """
+        Forward link batches between the workers until all of them are done.
+        
+        A worker reports idle with the number of batches it has consumed, after
+        sending all of its own. Messages from one process arrive in order, so
+        once every worker's last report is idle and matches the batches
+        forwarded to it, no links are left anywhere and the workers are stopped.
+        
+        Returns:
+            Tuple of (snapshot per shard, (batches, links) forwarded)
+        """
+        count = self.shards
+        forwarded = [0] * count
+        consumed = [0] * count
+        idle = [False] * count
+        snapshots: List[Optional[GraphSnapshot]] = [None] * count
+        batches = links = 0
+        stopping = False
+        next_check = time.monotonic() + 1.0
+        while any(snapshot is None for snapshot in snapshots):
+            try:
+                message = outbox.get(timeout=1.0)
+            except queue.Empty:
+                message = None
+            if time.monotonic() >= next_check:
+                next_check = time.monotonic() + 1.0
+                for index, worker in enumerate(workers):
+                    if snapshots[index] is None and not worker.is_alive():
+                        raise RuntimeError(f"Crawl shard {index} exited with code "
+                                           f"{worker.exitcode}")
+            if message is None:
+                continue
+            kind, index = message[0], message[1]
+            if kind == 'links':
+                # index is the shard the links belong to
+                if snapshots[index] is None:
+                    inboxes[index].put(message[2])
+                    forwarded[index] += 1
+                batches += 1
+                links += len(message[2])
+            elif kind == 'idle':
+                idle[index] = True
+                consumed[index] = message[2]
+            elif kind == 'done':
+                snapshots[index] = message[2]
+                self.summaries[index] = message[3]
+            else:
+                raise RuntimeError(f"Crawl shard {index} failed:\n{message[2]}")
+            if not stopping and all(snapshots[i] is not None
+                                    or (idle[i] and consumed[i] == forwarded[i])
+                                    for i in range(count)):
+                stopping = True
+                for i in range(count):
+                    if snapshots[i] is None:
+                        inboxes[i].put(None)
+        return snapshots, (batches, links)
+    
+    def _merge(self, snapshots: List[GraphSnapshot]):
+        """
+        Merge the workers' graphs into id_graph and visited, interning their URLs.
+        
+        Args:
+            snapshots: GraphSnapshot of every worker
+        """
+        nodes, pages, sources, targets = [], [], [], []
+        for snapshot in snapshots:
+            ids = np.fromiter((self.urls.intern(url) for url in snapshot.urls),
+                              dtype=np.int64, count=len(snapshot.urls))
+            nodes.append(ids[snapshot.nodes])
+            pages.append(ids[snapshot.pages])
+            sources.append(ids[snapshot.edges >> 32])
+            targets.append(ids[snapshot.edges & 0xFFFFFFFF])
+        edges = GraphSnapshot.edge_keys(np.concatenate(sources), np.concatenate(targets))
+        for node in np.unique(np.concatenate(nodes)).tolist():
+            self.id_graph.add_node(node)
+        if isinstance(self.id_graph, CompactGraph):
+            for key in edges.tolist():
+                self.id_graph.add_edge(key >> 32, key & 0xFFFFFFFF)
+        else:
+            self.id_graph.add_edges_from(zip((edges >> 32).tolist(),
+                                             (edges & 0xFFFFFFFF).tolist()))
+        for page in np.concatenate(pages).tolist():
+            self.visited.add(page)
 
 # ==========================================
 # Section 2: Statistics Generator
@@ -280,16 +4859,22 @@ class WebCrawler:
 class StatsGenerator:
     """Generate and save statistics and data from the crawled graph."""
     
-    def __init__(self, graph: nx.DiGraph, start_url: str):
+    def __init__(self, graph, start_url: str, urls: Optional[URLTable] = None):
         """
         Initialize the stats generator.
         
         Args:
-            graph: NetworkX graph from crawler
+            graph: nx.DiGraph or CompactGraph from crawler, keyed by URL or by URL ID
             start_url: Starting URL of the crawl
+            urls: Table resolving node IDs to URLs when graph is keyed by ID
         """
         self.graph = graph
         self.start_url = start_url
+        self.urls = urls
+    
+    def _url(self, node) -> str:
+        """Resolve a graph node to its URL."""
+        return self.urls.url(node) if self.urls is not None else node
     
     def save_stats(self, filename: str) -> Dict:
         """
@@ -328,10 +4913,10 @@ class StatsGenerator:
         links_data = []
         for node in self.graph.nodes():
             links_data.append({
-                'url': node,
+                'url': self._url(node),
                 'in_degree': in_degree[node],
                 'out_degree': out_degree[node],
-                'outgoing_links': list(self.graph.successors(node))
+                'outgoing_links': [self._url(target) for target in self.graph.successors(node)]
             })
         
         # Sort by outgoing links
@@ -635,6 +5220,23 @@ class InteractiveGraphGenerator:
 # Main: Input Management and Execution
 # ==========================================
 
+def parse_size(value: str) -> int:
+    """
+    Parse a byte count with an optional K, M, G or T suffix (powers of 1024).
+    
+    Args:
+        value: Size such as '750000', '500M' or '1.5G'
+    
+    Returns:
+        Number of bytes
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d*)?)\s*([KMGT]?)(?:I?B)?\s*', value, re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** ' KMGT'.index(unit.upper() or ' '))
+
+
 def get_safe_filename_base(url: str) -> str:
     """
     Convert URL to safe filename base.
@@ -662,6 +5264,69 @@ def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Web Crawler & Graph Generator')
     parser.add_argument('url', nargs='?', help='Starting URL to crawl')
+    parser.add_argument('--engine', choices=WebCrawler.ENGINES, default='thread',
+                        help='Crawl engine: thread (default) or async (requires aiohttp)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker threads; with --adaptive this is the per-host ceiling '
+                             '(default: 5, or 50 with --adaptive)')
+    parser.add_argument('--extractor', choices=tuple(LINK_EXTRACTORS), default='lxml',
+                        help='HTML link extraction backend (default: lxml)')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Processes for link extraction (default: 0, parse in fetch threads)')
+    parser.add_argument('--graph-store', choices=WebCrawler.GRAPH_STORES, default='networkx',
+                        help='In-memory graph: networkx (default) or compact arrays for huge crawls')
+    parser.add_argument('--frontier', choices=WebCrawler.FRONTIERS, default='memory',
+                        help='URL queue: memory (default), disk to keep queued IDs out of RAM, '
+                             'or priority to crawl shallow, well-linked pages first')
+    parser.add_argument('--url-weight', action='append', default=[], metavar='REGEX=WEIGHT',
+                        help='Priority frontier weight for URLs matching REGEX (repeatable)')
+    parser.add_argument('--max-pages', type=int, default=None, metavar='N',
+                        help='Stop after crawling N pages')
+    parser.add_argument('--max-depth', type=int, default=None, metavar='N',
+                        help='Only follow links up to N clicks from the start URL')
+    parser.add_argument('--max-bytes', type=parse_size, default=None, metavar='SIZE',
+                        help='Stop after downloading SIZE of HTML, e.g. 500M or 2G')
+    parser.add_argument('--max-time', type=float, default=None, metavar='SECONDS',
+                        help='Stop after SECONDS of crawling, abandoning pages still in flight')
+    parser.add_argument('--max-pages-per-host', type=int, default=None, metavar='N',
+                        help='Crawl at most N pages from any one host')
+    parser.add_argument('--strip-param', action='append', default=[], metavar='PATTERN',
+                        help='Also drop query parameters matching PATTERN, e.g. "ref" or '
+                             '"filter_*" (repeatable; tracking and session IDs are always dropped)')
+    parser.add_argument('--no-trap-detection', action='store_true',
+                        help='Crawl calendars, session IDs and other endless URL spaces in full')
+    parser.add_argument('--trap-limit', action='append', default=[], metavar='NAME=N',
+                        help=f'Override a trap detection limit ({", ".join(TrapDetector.LIMITS)})')
+    parser.add_argument('--sitemaps', action='store_true',
+                        help='Seed the crawl with the URLs of the sitemaps named in robots.txt '
+                             '(or /sitemap.xml)')
+    parser.add_argument('--sitemap', action='append', default=[], metavar='URL',
+                        help='Also seed from this sitemap or sitemap index (repeatable)')
+    parser.add_argument('--stream-parse', action='store_true',
+                        help='Parse pages while they download and queue links before they finish')
+    parser.add_argument('--connections-per-host', type=int, default=None,
+                        help='Cap on open connections to one host (default: one per worker)')
+    parser.add_argument('--dns-ttl', type=float, default=300.0,
+                        help='Seconds to cache resolved host addresses (default: 300)')
+    parser.add_argument('--ignore-robots', action='store_true',
+                        help='Do not fetch or obey robots.txt')
+    parser.add_argument('--http2', action='store_true',
+                        help='Fetch over HTTP/2 with httpx, one multiplexed connection per host')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Tune per-host concurrency from latency and 429/503 responses')
+    parser.add_argument('--checkpoint', action='store_true',
+                        help='Journal crawl progress to <site>_checkpoint/ so it can be resumed')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted crawl from <site>_checkpoint/ (implies --checkpoint)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Diff against the previous run in <site>_graph.npz and write <site>_diff.json')
+    parser.add_argument('--http-cache', action='store_true',
+                        help='Revalidate pages against <site>_http_cache/ with ETag / Last-Modified')
+    parser.add_argument('--shards', type=int, default=1, metavar='N',
+                        help='Crawl with N worker processes, each owning a shard of the hosts '
+                             '(default: 1)')
+    parser.add_argument('--shard-by', choices=ShardExchange.SHARD_BY, default='host',
+                        help='Assign URLs to shards by host (default) or by whole URL')
     args = parser.parse_args()
 
     target_url = args.url
@@ -683,22 +5348,71 @@ def main():
     json_filename = f"{base_name}_links.json"
     html_filename = f"{base_name}_interactive.html"
     stats_filename = f"{base_name}_stats.json"
+    checkpoint_dir = f"{base_name}_checkpoint" if args.checkpoint or args.resume else None
+    http_cache_dir = f"{base_name}_http_cache" if args.http_cache else None
+    snapshot_filename = f"{base_name}_graph.npz"
+    diff_filename = f"{base_name}_diff.json"
     
     print(f"Target: {target_url}")
     print(f"Base Filename: {base_name}")
     print("-" * 70)
 
+    trap_limits = {}
+    for spec in args.trap_limit:
+        name, _, limit = spec.partition('=')
+        if name not in TrapDetector.LIMITS or not limit.isdigit():
+            parser.error(f"--trap-limit expects NAME=N with NAME one of "
+                         f"{', '.join(TrapDetector.LIMITS)}, got {spec!r}")
+        trap_limits[name] = int(limit)
+    
+    url_weights = {}
+    for spec in args.url_weight:
+        pattern, _, weight = spec.rpartition('=')
+        try:
+            url_weights[pattern] = int(weight)
+        except ValueError:
+            parser.error(f"--url-weight expects REGEX=WEIGHT, got {spec!r}")
+
     try:
         # Step 1: Crawl website
-        crawler = WebCrawler(target_url, max_workers=5)
-        graph = crawler.crawl()
+        workers = args.workers or (50 if args.adaptive else 5)
+        options = dict(max_workers=workers, engine=args.engine,
+                       adaptive=args.adaptive, link_extractor=args.extractor,
+                       parse_workers=args.parse_workers, graph_store=args.graph_store,
+                       frontier=args.frontier, checkpoint_dir=checkpoint_dir,
+                       resume=args.resume, http_cache_dir=http_cache_dir,
+                       previous_snapshot=snapshot_filename if args.incremental else None,
+                       stream_parse=args.stream_parse,
+                       max_connections_per_host=args.connections_per_host,
+                       http2=args.http2, dns_ttl=args.dns_ttl,
+                       respect_robots=not args.ignore_robots,
+                       url_weights=url_weights or None, max_pages=args.max_pages,
+                       max_depth=args.max_depth, max_bytes=args.max_bytes,
+                       max_time=args.max_time, max_pages_per_host=args.max_pages_per_host,
+                       strip_params=URLNormalizer.DEFAULT_STRIP_PARAMS + tuple(args.strip_param),
+                       detect_traps=not args.no_trap_detection,
+                       trap_limits=trap_limits or None, sitemaps=args.sitemaps,
+                       sitemap_urls=args.sitemap)
+        if args.shards > 1:
+            crawler = DistributedCrawler(target_url, shards=args.shards, shard_by=args.shard_by,
+                                         **options)
+        else:
+            crawler = WebCrawler(target_url, **options)
+        graph = crawler.crawl(resolve=False)
         
-        # Step 2: Save data
-        stats_gen = StatsGenerator(graph, target_url)
+        # Step 2: Save data (URLs are resolved from IDs only while writing)
+        stats_gen = StatsGenerator(graph, target_url, urls=crawler.urls)
         stats_gen.save_stats(stats_filename)
         
         links_data = stats_gen.save_links(json_filename)
         
+        if args.incremental:
+            snapshot = crawler.snapshot()
+            if crawler.previous is not None:
+                summary = snapshot.write_diff(snapshot.compare(crawler.previous), diff_filename)
+                print(f"Changes since last run: {summary}")
+            snapshot.save(snapshot_filename)
+        
         # Step 3: Generate interactive visualization
         if links_data:
             visualizer = InteractiveGraphGenerator(links_data)
@@ -716,6 +5430,8 @@ def main():
 
     except KeyboardInterrupt:
         print("\nStopped by user")
+        if checkpoint_dir:
+            print(f"Progress saved in {checkpoint_dir}/ - rerun with --resume to continue")
         sys.exit(1)
     except Exception as e:
         logger.error(f"Unexpected error: {e}", exc_info=True)
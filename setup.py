@@ -29,6 +29,10 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=requirements,
+    extras_require={
+        "async": ["aiohttp>=3.8.0"],
+        "http2": ["httpx[http2]>=0.24.0"],
+    },
     entry_points={
         "console_scripts": [
             "web-crawler=crawler:main",
@@ -0,0 +1,95 @@
+"""Shared fixtures: a local multi-host test site served by http.server."""
+
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple, Union
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def resolve_local(host, port, family=0, type=0, proto=0, flags=0):
+    """getaddrinfo-compatible resolver that maps every host name to 127.0.0.1."""
+    return socket.getaddrinfo('127.0.0.1', port, socket.AF_INET, type, proto, flags)
+
+
+class LocalSite:
+    """
+    Pages served on 127.0.0.1 for any Host header. Pages are keyed by
+    'hostname/path'; a value is HTML text or a (status, headers, body) tuple.
+    A body given as an iterator of chunks is streamed without a length
+    until it ends or the client hangs up; streamed counts the bytes sent.
+    Every request is recorded as (hostname, path, monotonic time).
+    """
+    
+    def __init__(self):
+        self.pages: Dict[str, Union[str, Tuple[int, Dict[str, str], bytes]]] = {}
+        self.requests: List[Tuple[str, str, float]] = []
+        self.streamed = 0
+        self._lock = threading.Lock()
+        site = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_GET(self):
+                host = self.headers.get('Host', '').rsplit(':', 1)[0]
+                with site._lock:
+                    site.requests.append((host, self.path, time.monotonic()))
+                page = site.pages.get(f"{host}{self.path}")
+                if page is None:
+                    status, headers, body = 404, {'Content-Type': 'text/plain'}, b'not found'
+                elif isinstance(page, str):
+                    status, headers, body = 200, {'Content-Type': 'text/html; charset=utf-8'}, page.encode()
+                else:
+                    status, headers, body = page
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if isinstance(body, bytes):
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for chunk in body:
+                        self.wfile.write(chunk)
+                        with site._lock:
+                            site.streamed += len(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+    
+    def url(self, host: str, path: str = '/') -> str:
+        """Absolute URL of path on host."""
+        return f"http://{host}:{self.port}{path}"
+    
+    def page_requests(self, host: str) -> List[float]:
+        """Times of the page requests to host, excluding robots.txt."""
+        with self._lock:
+            return [at for name, path, at in self.requests
+                    if name == host and path != '/robots.txt']
+
+
+@pytest.fixture
+def local_site():
+    site = LocalSite()
+    thread = threading.Thread(target=site.server.serve_forever, daemon=True)
+    thread.start()
+    yield site
+    site.server.shutdown()
+    site.server.server_close()
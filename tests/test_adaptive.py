@@ -0,0 +1,97 @@
+"""AIMD per-host concurrency and the dispatch of parked URLs."""
+
+import time
+
+from crawler import AdaptiveConcurrency, WebCrawler
+
+
+def window(controller, host, latency=0.1, status=200, count=None):
+    """Record one full evaluation window of identical responses."""
+    for _ in range(count or controller.window):
+        controller.record(host, latency, status)
+
+
+def test_limit_grows_by_one_per_good_window_up_to_max():
+    controller = AdaptiveConcurrency(max_limit=4, initial_limit=2, window=5)
+    assert controller.limit('a.test') == 2
+    window(controller, 'a.test', count=4)
+    assert controller.limit('a.test') == 2
+    window(controller, 'a.test', count=1)
+    assert controller.limit('a.test') == 3
+    for _ in range(5):
+        window(controller, 'a.test')
+    assert controller.limit('a.test') == 4
+    # Hosts are controlled independently
+    assert controller.limit('b.test') == 2
+
+
+def test_slow_window_halves_the_limit():
+    controller = AdaptiveConcurrency(max_limit=32, initial_limit=16, window=20,
+                                     target_latency=1.0)
+    window(controller, 'a.test', latency=3.0)
+    assert controller.limit('a.test') == 8
+    # A few slow responses do not move the p95
+    window(controller, 'a.test', latency=0.1, count=19)
+    window(controller, 'a.test', latency=3.0, count=1)
+    assert controller.limit('a.test') == 9
+
+
+def test_failures_above_the_error_rate_back_off():
+    controller = AdaptiveConcurrency(max_limit=32, initial_limit=8, window=10,
+                                     max_error_rate=0.1)
+    window(controller, 'a.test', count=8)
+    window(controller, 'a.test', status=None, count=2)
+    assert controller.limit('a.test') == 4
+
+
+def test_throttling_cuts_at_once_but_once_per_limit():
+    controller = AdaptiveConcurrency(max_limit=32, initial_limit=8, window=100)
+    window(controller, 'a.test', count=8)
+    controller.record('a.test', 0.1, 429)
+    assert controller.limit('a.test') == 4
+    # Responses to requests sent before the cut do not cut again
+    controller.record('a.test', 0.1, 503)
+    assert controller.limit('a.test') == 4
+    window(controller, 'a.test', count=3)
+    controller.record('a.test', 0.1, 503)
+    assert controller.limit('a.test') == 2
+
+
+def test_limit_never_drops_below_min():
+    controller = AdaptiveConcurrency(max_limit=32, initial_limit=8, min_limit=2, window=4,
+                                     target_latency=1.0)
+    for _ in range(10):
+        window(controller, 'a.test', latency=5.0)
+    assert controller.limit('a.test') == 2
+
+
+def test_slots_and_retry_after():
+    controller = AdaptiveConcurrency(max_limit=8, initial_limit=2)
+    assert controller.try_acquire('a.test')
+    assert controller.try_acquire('a.test')
+    assert not controller.try_acquire('a.test')
+    controller.release('a.test')
+    assert controller.stats() == {'a.test': {'limit': 2, 'in_flight': 1}}
+    
+    # Retry-After pauses the host even with free slots
+    controller.record('a.test', 0.1, 429, retry_after=0.2)
+    controller.release('a.test')
+    assert not controller.try_acquire('a.test')
+    time.sleep(0.25)
+    assert controller.try_acquire('a.test')
+
+
+def test_parked_urls_are_dispatched_oldest_first():
+    crawler = WebCrawler('http://a.test/', adaptive=True, respect_robots=False)
+    for i in range(5):
+        crawler.to_visit.add(crawler.urls.intern(f'http://a.test/p{i}'))
+    dispatched = [crawler.urls.url(crawler._next_url()) for _ in range(2)]
+    assert dispatched == ['http://a.test/', 'http://a.test/p0']
+    # Both slots of a.test are taken, so the rest is parked
+    assert crawler._next_url() is None
+    
+    order = []
+    for _ in range(4):
+        crawler.concurrency.release('a.test')
+        order.append(crawler.urls.url(crawler._next_url()))
+    assert order == [f'http://a.test/p{i}' for i in range(1, 5)]
@@ -0,0 +1,59 @@
+"""Crawl budget enforcement by the dispatcher and over shards."""
+
+import pytest
+
+from conftest import resolve_local
+from crawler import CrawlCheckpoint, DistributedCrawler, ShardExchange, WebCrawler, aiohttp
+
+LEAVES = 40
+PAGE_BYTES = 8 * 1024
+MAX_BYTES = 5 * PAGE_BYTES
+
+
+def build_site(site):
+    """An index linking to LEAVES pages whose only link comes after PAGE_BYTES of text."""
+    site.pages['www.site.test/'] = ''.join(f'<a href="/p{i}">{i}</a>' for i in range(LEAVES))
+    for i in range(LEAVES):
+        site.pages[f'www.site.test/p{i}'] = f'<p>{"x" * PAGE_BYTES}</p><a href="/c{i}">child</a>'
+
+
+@pytest.mark.parametrize('engine', [
+    'thread',
+    pytest.param('async', marks=pytest.mark.skipif(aiohttp is None, reason='needs aiohttp')),
+])
+def test_max_bytes_holds_back_dispatch_and_drops_cut_pages(local_site, tmp_path, engine):
+    build_site(local_site)
+    crawler = WebCrawler(local_site.url('www.site.test'), engine=engine, max_workers=16,
+                         rate_limit=0, respect_robots=False, max_bytes=MAX_BYTES,
+                         checkpoint_dir=str(tmp_path), dns_resolver=resolve_local)
+    graph = crawler.crawl(resolve=False)
+    
+    assert crawler.budget.stop_reason == 'max_bytes'
+    # Not one page per fetch slot: dispatch stops near the budget
+    leaves = [url_id for url_id in crawler.visited.to_array()
+              if '/p' in crawler.urls.url(url_id)]
+    assert 2 <= len(leaves) <= MAX_BYTES // PAGE_BYTES + 1
+    # Every page kept was read to the end, so none lost its link
+    for url_id in leaves:
+        assert [crawler.urls.url(target) for target in graph.successors(url_id)] == [
+            crawler.urls.url(url_id).replace('/p', '/c')]
+    # Only those pages were journaled; the cut-off ones are fetched again on resume
+    journaled = {page for _, page, _ in CrawlCheckpoint(str(tmp_path)).replay()
+                 if page is not None}
+    assert journaled == set(crawler.visited.to_array().tolist())
+
+
+@pytest.mark.parametrize('shards', [1, 3, 4])
+def test_distributed_budgets_are_split_over_shards(shards):
+    start_url = 'http://www.site.test/'
+    crawler = DistributedCrawler(start_url, shards=shards, max_pages=10, max_bytes=1001,
+                                 max_time=60)
+    options = [crawler.worker_options(index) for index in range(shards)]
+    assert sum(worker['max_pages'] for worker in options) == 10
+    assert sum(worker['max_bytes'] for worker in options) == 1001
+    assert all(worker['max_time'] == 60 for worker in options)
+    # A budget smaller than the shard count still reaches the start URL's shard
+    crawler = DistributedCrawler(start_url, shards=shards, max_pages=1)
+    owner = ShardExchange.owner(start_url, shards)
+    assert [crawler.worker_options(index)['max_pages'] for index in range(shards)] == [
+        int(index == owner) for index in range(shards)]
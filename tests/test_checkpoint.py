@@ -0,0 +1,99 @@
+"""Resuming crawls from the CrawlCheckpoint journal."""
+
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from conftest import resolve_local
+from crawler import CrawlCheckpoint, WebCrawler
+
+PAGES = 200
+TESTS = os.path.dirname(os.path.abspath(__file__))
+
+
+def build_site(site, pages=PAGES):
+    """
+    A binary tree of pages, each also linking back to the root. The long
+    paths make journal records long enough that the writer's file buffer
+    reaches the disk several times before the crawl is half done.
+    """
+    path = '/archive/{}/page-{}'.format('long-section-name' * 4, '{}')
+    for i in range(pages):
+        children = [path.format(child) for child in (2 * i + 1, 2 * i + 2) if child < pages]
+        site.pages[f'www.site.test{path.format(i)}'] = ''.join(
+            f'<a href="{link}">{link}</a>' for link in children + [path.format(0)])
+    return site.url('www.site.test', path.format(0))
+
+
+def crawl(start_url, **options):
+    crawler = WebCrawler(start_url, rate_limit=0, max_workers=8, respect_robots=False,
+                         dns_resolver=resolve_local, **options)
+    graph = crawler.crawl()
+    visited = {crawler.urls.url(url_id) for url_id in crawler.visited.to_array()}
+    return graph, visited
+
+
+def test_resume_after_kill_gives_the_same_crawl(local_site, tmp_path):
+    start_url = build_site(local_site)
+    expected_graph, expected_visited = crawl(start_url)
+    local_site.requests.clear()
+    
+    # Crawl in a child process and kill it halfway, leaving the journal as it was
+    script = (f"from conftest import resolve_local\n"
+              f"from crawler import WebCrawler\n"
+              f"WebCrawler({start_url!r}, rate_limit=0.01, max_workers=4, "
+              f"respect_robots=False, dns_resolver=resolve_local, "
+              f"checkpoint_dir={str(tmp_path)!r}).crawl()\n")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([TESTS, os.path.dirname(TESTS)]))
+    child = subprocess.Popen([sys.executable, '-c', script], cwd=str(tmp_path), env=env,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while len(local_site.requests) < PAGES // 2 and child.poll() is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    child.send_signal(signal.SIGKILL)
+    child.wait()
+    assert len(local_site.requests) < PAGES
+    
+    local_site.requests.clear()
+    graph, visited = crawl(start_url, checkpoint_dir=str(tmp_path), resume=True)
+    assert visited == expected_visited
+    assert set(graph.nodes) == set(expected_graph.nodes)
+    assert set(graph.edges) == set(expected_graph.edges)
+    # Pages journaled before the kill were not fetched again
+    assert len(local_site.requests) < PAGES
+
+
+def test_truncated_journal_tail_is_refetched_and_cut_off(local_site, tmp_path, caplog):
+    start_url = build_site(local_site, pages=30)
+    expected_graph, expected_visited = crawl(start_url, checkpoint_dir=str(tmp_path))
+    
+    # Cut the last record in half, as a crash in mid-write would
+    path = os.path.join(str(tmp_path), CrawlCheckpoint.JOURNAL)
+    with open(path, 'rb') as f:
+        journal = f.read()
+    last = journal.rindex(b'\n', 0, len(journal) - 1) + 1
+    with open(path, 'wb') as f:
+        f.write(journal[:last + (len(journal) - last) // 2])
+    
+    local_site.requests.clear()
+    with caplog.at_level(logging.WARNING, logger='crawler'):
+        graph, visited = crawl(start_url, checkpoint_dir=str(tmp_path), resume=True)
+    assert 'Ignoring truncated checkpoint record' in caplog.text
+    assert len(local_site.requests) == 1
+    assert visited == expected_visited
+    assert set(graph.edges) == set(expected_graph.edges)
+    
+    # The resumed run appended after the last complete record, so the
+    # journal replays in full and nothing is fetched again
+    caplog.clear()
+    local_site.requests.clear()
+    with caplog.at_level(logging.WARNING, logger='crawler'):
+        graph, visited = crawl(start_url, checkpoint_dir=str(tmp_path), resume=True)
+    assert 'Ignoring truncated checkpoint record' not in caplog.text
+    assert local_site.requests == []
+    assert visited == expected_visited
+    assert set(graph.edges) == set(expected_graph.edges)
@@ -0,0 +1,53 @@
+"""Queueing of pages reached again at a shorter depth."""
+
+import pytest
+from tqdm import tqdm
+
+from crawler import WebCrawler
+
+STORES = ['networkx', 'compact']
+
+
+def visited_at(crawler, url, depth):
+    url_id = crawler.urls.intern(url)
+    crawler.budget.reach(url_id, depth)
+    crawler.visited.add(url_id)
+    return url_id
+
+
+def queued(crawler):
+    """Empty the frontier and return the URLs it held besides the start URL."""
+    urls = set()
+    while crawler.to_visit:
+        urls.add(crawler.urls.url(crawler.to_visit.pop()))
+    urls.discard(crawler.start_url)
+    return urls
+
+
+@pytest.mark.parametrize('store', STORES)
+def test_page_in_flight_reached_shorter_queues_links_when_done(store):
+    crawler = WebCrawler('http://a.test/', max_depth=5, graph_store=store)
+    page = visited_at(crawler, 'http://b.test/x', 3)
+    
+    # A shard sends the page at depth 2 while it is still being fetched
+    crawler._queue_remote([('http://b.test/x', 2)])
+    assert crawler.budget.depth(page) == 2
+    
+    with tqdm(disable=True) as pbar:
+        crawler._record_result(page, ['http://b.test/y'], pbar)
+    assert crawler.budget.depth(crawler.urls.get_id('http://b.test/y')) == 3
+    assert queued(crawler) == {'http://b.test/y'}
+
+
+@pytest.mark.parametrize('store', STORES)
+def test_crawled_page_reached_shorter_queues_links_again(store):
+    crawler = WebCrawler('http://a.test/', max_depth=2, graph_store=store)
+    page = visited_at(crawler, 'http://b.test/x', 2)
+    with tqdm(disable=True) as pbar:
+        crawler._record_result(page, ['http://b.test/y'], pbar)
+    # At depth 3 the link lies beyond max_depth
+    assert queued(crawler) == set()
+    
+    crawler._queue_remote([('http://b.test/x', 1)])
+    assert crawler.budget.depth(crawler.urls.get_id('http://b.test/y')) == 2
+    assert queued(crawler) == {'http://b.test/y'}
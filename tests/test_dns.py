@@ -0,0 +1,113 @@
+"""DNSCache with a stub resolver, and connecting through its addresses."""
+
+import socket
+import time
+
+import pytest
+import requests
+
+from crawler import ConnectionStats, DNSCache, _CrawlHTTPAdapter, _DNSCacheBackend, httpcore
+
+
+class StubResolver:
+    """getaddrinfo stand-in answering from a table of host -> IPv4 addresses."""
+    
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self.calls = 0
+    
+    def __call__(self, host, port, family=0, type=0, proto=0, flags=0):
+        self.calls += 1
+        if host not in self.hosts:
+            raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', (address, port))
+                for address in self.hosts[host]]
+
+
+def test_answers_are_cached_until_ttl_expires():
+    resolver = StubResolver({'www.site.test': ['127.0.0.1']})
+    dns = DNSCache(ttl=0.2, resolver=resolver)
+    first = dns.resolve('www.site.test', 80)
+    assert dns.resolve('www.site.test', 80) == first
+    assert resolver.calls == 1
+    # Other ports are separate entries
+    dns.resolve('www.site.test', 443)
+    assert resolver.calls == 2
+    
+    time.sleep(0.3)
+    dns.resolve('www.site.test', 80)
+    assert resolver.calls == 3
+
+
+def test_ttl_zero_resolves_every_lookup():
+    resolver = StubResolver({'www.site.test': ['127.0.0.1']})
+    dns = DNSCache(ttl=0, resolver=resolver)
+    for _ in range(3):
+        dns.resolve('www.site.test', 80)
+    assert resolver.calls == 3
+
+
+def test_failures_are_cached_for_negative_ttl():
+    resolver = StubResolver({})
+    dns = DNSCache(negative_ttl=0.2, resolver=resolver)
+    for _ in range(3):
+        with pytest.raises(socket.gaierror):
+            dns.resolve('missing.test', 80)
+    assert resolver.calls == 1
+    
+    time.sleep(0.3)
+    with pytest.raises(socket.gaierror):
+        dns.resolve('missing.test', 80)
+    assert resolver.calls == 2
+
+
+def test_stats_count_hits_and_misses():
+    resolver = StubResolver({'www.site.test': ['127.0.0.1']})
+    dns = DNSCache(resolver=resolver)
+    for _ in range(3):
+        dns.resolve('www.site.test', 80)
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            dns.resolve('missing.test', 80)
+    
+    stats = dns.stats()
+    assert stats['lookups'] == 5
+    assert stats['hits'] == 2
+    assert stats['negative_hits'] == 1
+    assert stats['resolutions'] == 2
+    assert stats['failures'] == 1
+    assert stats['hit_rate'] == pytest.approx(3 / 5)
+
+
+# 127.0.0.2 is loopback too, but the local site only listens on 127.0.0.1,
+# so connections to it are refused
+HOSTS = {'www.site.test': ['127.0.0.2', '127.0.0.1'], 'empty.test': []}
+
+
+def session_for(resolver):
+    session = requests.Session()
+    session.mount('http://', _CrawlHTTPAdapter(ConnectionStats(), DNSCache(resolver=resolver)))
+    return session
+
+
+def test_adapter_falls_back_to_the_next_address(local_site):
+    local_site.pages['www.site.test/'] = '<p>up</p>'
+    with session_for(StubResolver(HOSTS)) as session:
+        response = session.get(local_site.url('www.site.test'), timeout=5)
+    assert response.status_code == 200
+    assert response.text == '<p>up</p>'
+
+
+def test_adapter_without_addresses_fails_to_connect(local_site):
+    with session_for(StubResolver(HOSTS)) as session:
+        with pytest.raises(requests.ConnectionError, match='No addresses for empty.test'):
+            session.get(local_site.url('empty.test'), timeout=5)
+
+
+@pytest.mark.skipif(httpcore is None, reason='needs httpx')
+def test_http2_backend_falls_back_to_the_next_address(local_site):
+    backend = _DNSCacheBackend(DNSCache(resolver=StubResolver(HOSTS)), httpcore.SyncBackend())
+    stream = backend.connect_tcp('www.site.test', local_site.port, timeout=5)
+    stream.close()
+    with pytest.raises(httpcore.ConnectError, match='No addresses for empty.test'):
+        backend.connect_tcp('empty.test', local_site.port, timeout=5)
@@ -0,0 +1,46 @@
+"""The thread and async engines build the same graph."""
+
+from urllib.parse import quote
+
+import pytest
+
+from conftest import resolve_local
+from crawler import WebCrawler, aiohttp, page_encoding
+
+
+def html(links):
+    return ''.join(f'<a href="{link}">{link}</a>' for link in links)
+
+
+def build_site(site):
+    """Pages with non-ASCII links, with and without a charset in Content-Type."""
+    site.pages['www.site.test/'] = (200, {'Content-Type': 'text/html'},
+                                    html(['/café', '/日本', '/latin']).encode('utf-8'))
+    site.pages['www.site.test/latin'] = (200, {'Content-Type': 'text/html; charset=ISO-8859-1'},
+                                         html(['/naïve']).encode('latin-1'))
+    for path in ('/café', '/日本', '/naïve'):
+        site.pages[f'www.site.test{quote(path)}'] = html(['/'])
+
+
+def test_page_encoding():
+    assert page_encoding('text/html') == 'utf-8'
+    assert page_encoding(None) == 'utf-8'
+    assert page_encoding('text/html; Charset="ISO-8859-1"') == 'iso8859-1'
+    assert page_encoding('text/html; charset=no-such-codec') == 'utf-8'
+
+
+@pytest.mark.skipif(aiohttp is None, reason='needs aiohttp')
+def test_engines_agree_on_non_ascii_links(local_site):
+    build_site(local_site)
+    graphs = {}
+    for engine in ('thread', 'async'):
+        crawler = WebCrawler(local_site.url('www.site.test'), engine=engine, rate_limit=0,
+                             respect_robots=False, dns_resolver=resolve_local)
+        graphs[engine] = crawler.crawl()
+    
+    assert set(graphs['thread'].edges) == set(graphs['async'].edges)
+    assert set(graphs['thread'].nodes) == set(graphs['async'].nodes)
+    expected = {local_site.url('www.site.test', path) for path in ('/café', '/日本', '/naïve')}
+    assert expected <= set(graphs['thread'].nodes)
+    # Every linked page was found and crawled, none under a mis-decoded URL
+    assert len(graphs['thread']) == 5
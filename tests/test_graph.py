@@ -0,0 +1,41 @@
+"""CompactGraph successor lookups during the crawl."""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from crawler import CompactGraph
+
+
+def build(edges):
+    graph = CompactGraph()
+    for source, target in edges:
+        graph.add_edge(source, target)
+    return graph
+
+
+def frozen_successors(graph, node):
+    out_offsets, out_targets, _, _ = graph.freeze()
+    return out_targets[out_offsets[node]:out_offsets[node + 1]].tolist()
+
+
+def test_contiguous_successors_do_not_freeze():
+    # Pages add their links in one go, as the crawler does
+    graph = build([(0, 1), (0, 2), (0, 3), (1, 4), (1, 0), (3, 5)])
+    assert graph.successors(0) == [1, 2, 3]
+    assert graph.successors(1) == [4, 0]
+    assert graph.successors(2) == []
+    assert graph.successors(9) == []
+    assert graph._frozen is None
+    # Lookups keep working while edges are still added
+    graph.add_edge(5, 1)
+    assert graph.successors(5) == [1]
+    assert graph._frozen is None
+
+
+def test_scattered_successors_match_frozen():
+    graph = build([(0, 1), (1, 2), (0, 3), (2, 0), (0, 2), (1, 3)])
+    for node in range(4):
+        assert graph.successors(node) == frozen_successors(graph, node)
+    assert graph.successors(0) == [1, 3, 2]
+    assert graph.successors(1) == [2, 3]
@@ -0,0 +1,135 @@
+"""HTTP/2 fetch backend against a local h2 server (hypercorn over TLS)."""
+
+import asyncio
+import logging
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('httpx')
+pytest.importorskip('h2')
+trustme = pytest.importorskip('trustme')
+hypercorn_asyncio = pytest.importorskip('hypercorn.asyncio')
+from hypercorn.config import Config
+
+from conftest import resolve_local
+from crawler import WebCrawler
+
+HOSTS = ('www.site.test', 'shop.site.test')
+PAGES = 12
+
+
+class H2Site:
+    """
+    HTTPS site negotiating h2 by ALPN, with a certificate for *.site.test.
+    Pages are keyed by 'hostname/path'; requests are recorded as
+    (http_version, host header, path).
+    """
+    
+    def __init__(self, directory):
+        self.pages = {}
+        self.requests = []
+        ca = trustme.CA()
+        self.ca_file = str(directory / 'ca.pem')
+        ca.cert_pem.write_to_path(self.ca_file)
+        server_file = str(directory / 'server.pem')
+        ca.issue_cert('*.site.test').private_key_and_cert_chain_pem.write_to_path(server_file)
+        
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+        self.config = Config()
+        self.config.bind = [f'127.0.0.1:{self.port}']
+        self.config.certfile = self.config.keyfile = server_file
+        self.config.accesslog = self.config.errorlog = None
+        self.config.graceful_timeout = 1
+        self._loop = asyncio.new_event_loop()
+        self._stop = None
+        self._thread = None
+    
+    async def app(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                else:
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        host = dict(scope['headers']).get(b'host', b'').decode()
+        self.requests.append((scope['http_version'], host, scope['path']))
+        page = self.pages.get(f"{host.rsplit(':', 1)[0]}{scope['path']}")
+        status, body = (200, page.encode()) if page is not None else (404, b'not found')
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/html; charset=utf-8')]})
+        await send({'type': 'http.response.body', 'body': body})
+    
+    def url(self, host: str, path: str = '/') -> str:
+        return f"https://{host}:{self.port}{path}"
+    
+    def start(self):
+        async def serve():
+            self._stop = asyncio.Event()
+            await hypercorn_asyncio.serve(self.app, self.config, shutdown_trigger=self._stop.wait)
+        
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(serve(),),
+                                        daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError('h2 test server did not start')
+    
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(10)
+
+
+@pytest.fixture
+def h2_site(tmp_path, monkeypatch):
+    site = H2Site(tmp_path)
+    # httpx trusts SSL_CERT_FILE when building its default SSL context
+    monkeypatch.setenv('SSL_CERT_FILE', site.ca_file)
+    links = ''.join(f'<a href="{site.url(host, f"/p{i}")}">{i}</a>'
+                    for host in HOSTS for i in range(PAGES))
+    site.pages['www.site.test/'] = f'<html><body>{links}</body></html>'
+    for host in HOSTS:
+        for i in range(PAGES):
+            site.pages[f'{host}/p{i}'] = f'<a href="{site.url("www.site.test")}">home</a>'
+    site.start()
+    yield site
+    site.stop()
+
+
+def crawl(site):
+    crawler = WebCrawler(site.url('www.site.test'), max_workers=8, rate_limit=0, http2=True,
+                         dns_resolver=resolve_local)
+    graph = crawler.crawl()
+    # Close the shared connections so the server can shut down at once
+    crawler.session.client.close()
+    return crawler, graph
+
+
+def test_requests_are_multiplexed_over_one_connection_per_host(h2_site):
+    crawler, graph = crawl(h2_site)
+    
+    assert graph.number_of_nodes() == 1 + len(HOSTS) * PAGES
+    assert {version for version, _, _ in h2_site.requests} == {'2'}
+    # TLS and the :authority header use the host name, not the resolved address
+    assert {host.rsplit(':', 1)[0] for _, host, _ in h2_site.requests} == set(HOSTS)
+    stats = crawler.connection_stats.summary()
+    assert stats['connections'] == len(HOSTS)
+    assert stats['requests'] == len(h2_site.requests)
+
+
+def test_httpx_request_logging_stays_out_of_the_crawl_log(h2_site, caplog):
+    with caplog.at_level(logging.INFO):
+        crawl(h2_site)
+    assert not [record for record in caplog.records
+                if record.name.startswith(('httpx', 'httpcore'))]
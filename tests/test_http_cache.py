@@ -0,0 +1,65 @@
+"""Revalidating pages against the HTTPCache."""
+
+import pytest
+
+from conftest import resolve_local
+from crawler import HTTPCache, WebCrawler, aiohttp
+
+ENGINES = [
+    'thread',
+    pytest.param('async', marks=pytest.mark.skipif(aiohttp is None, reason='needs aiohttp')),
+]
+LINKS = {'/': ['/a', '/b'], '/a': ['/c'], '/b': ['/c', '/'], '/c': []}
+
+
+def page(body, etag):
+    return 200, {'Content-Type': 'text/html; charset=utf-8', 'ETag': etag}, body.encode()
+
+
+def crawl(site, engine, cache_dir, **options):
+    crawler = WebCrawler(site.url('www.site.test'), engine=engine, rate_limit=0,
+                         respect_robots=False, http_cache_dir=cache_dir,
+                         dns_resolver=resolve_local, **options)
+    graph = crawler.crawl(resolve=False)
+    edges = {(crawler.urls.url(source), crawler.urls.url(target))
+             for source, target in graph.edges}
+    return crawler, edges
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_not_modified_pages_reuse_cached_links(local_site, tmp_path, engine):
+    for path, targets in LINKS.items():
+        local_site.pages[f'www.site.test{path}'] = page(
+            ''.join(f'<a href="{target}">{target}</a>' for target in targets), f'"{path}"')
+    crawler, expected = crawl(local_site, engine, str(tmp_path))
+    assert crawler.http_cache.stats() == {'revalidated': 0, 'stored': len(LINKS)}
+    
+    # Every page now answers 304 with an empty body, so the links can only
+    # come from the cache, and only if the validators were sent
+    for path in LINKS:
+        local_site.pages[f'www.site.test{path}'] = (304, {'ETag': f'"{path}"'}, b'')
+    crawler, edges = crawl(local_site, engine, str(tmp_path))
+    assert edges == expected
+    assert crawler.http_cache.stats() == {'revalidated': len(LINKS), 'stored': 0}
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_cut_off_pages_leave_nothing_staged(local_site, tmp_path, engine, monkeypatch):
+    local_site.pages['www.site.test/'] = page(
+        ''.join(f'<a href="/p{i}">{i}</a>' for i in range(40)), '"index"')
+    for i in range(40):
+        local_site.pages[f'www.site.test/p{i}'] = page(f'<p>{"x" * 8192}</p>', f'"p{i}"')
+    staged = []
+    close = HTTPCache.close
+    
+    def close_and_count(cache):
+        staged.append(len(cache._staged))
+        close(cache)
+    
+    monkeypatch.setattr(HTTPCache, 'close', close_and_count)
+    crawler, _ = crawl(local_site, engine, str(tmp_path), max_workers=16, max_bytes=5 * 8192)
+    assert crawler.budget.stop_reason == 'max_bytes'
+    assert len(crawler.visited) < 41
+    assert staged == [0]
+    # Only the pages kept were cached
+    assert crawler.http_cache.stats()['stored'] == len(crawler.visited)
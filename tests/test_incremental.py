@@ -0,0 +1,101 @@
+"""Snapshot diffs and change-aware ordering of incremental crawls."""
+
+import numpy as np
+import pytest
+
+from conftest import resolve_local
+from crawler import GraphSnapshot, PriorityFrontier, WebCrawler
+
+URLS = ['http://a.test/', 'http://a.test/x', 'http://a.test/y', 'http://a.test/z']
+
+
+def snapshot(urls, pages, edges, changes=None):
+    sources = np.array([source for source, _ in edges], dtype=np.int32)
+    targets = np.array([target for _, target in edges], dtype=np.int32)
+    nodes = np.unique(np.concatenate([np.array(pages, dtype=np.int32), sources, targets]))
+    return GraphSnapshot(list(urls), nodes, np.array(sorted(pages), dtype=np.int32),
+                         GraphSnapshot.edge_keys(sources, targets),
+                         None if changes is None else np.array(changes, dtype=np.uint32))
+
+
+def keys(*edges):
+    return [source << 32 | target for source, target in edges]
+
+
+def test_compare_reports_added_and_removed_nodes_and_edges():
+    previous = snapshot(URLS[:3], [0, 1], [(0, 1), (0, 2), (1, 2)], changes=[2, 0, 0])
+    # / now links to z instead of y, x links back to / instead of to y
+    current = snapshot(URLS, [0, 1], [(0, 1), (0, 3), (1, 0)])
+    diff = current.compare(previous)
+    
+    assert diff['added_nodes'].tolist() == [3]
+    assert diff['removed_nodes'].tolist() == [2]
+    assert diff['added_edges'].tolist() == keys((0, 3), (1, 0))
+    assert diff['removed_edges'].tolist() == keys((0, 2), (1, 2))
+    assert diff['changed_pages'].tolist() == [0, 1]
+    # Change counts carry over from the previous run
+    assert current.changes.tolist() == [3, 1, 0, 0]
+
+
+def test_compare_ignores_pages_crawled_in_one_run_only():
+    previous = snapshot(URLS[:2], [0], [(0, 1)])
+    current = snapshot(URLS[:3], [0, 1], [(0, 1), (1, 2)])
+    diff = current.compare(previous)
+    assert diff['added_edges'].tolist() == keys((1, 2))
+    assert diff['changed_pages'].tolist() == []
+    assert current.changes.tolist() == [0, 0, 0]
+
+
+def test_compare_needs_shared_url_ids():
+    previous = snapshot(URLS[1:3], [0], [(0, 1)])
+    current = snapshot(URLS, [0], [(0, 1)])
+    with pytest.raises(ValueError, match='do not share URL IDs'):
+        current.compare(previous)
+
+
+def test_snapshot_round_trip(tmp_path):
+    original = snapshot(URLS, [0, 1], [(0, 1), (0, 3)], changes=[1, 0, 2, 0])
+    path = str(tmp_path / 'graph.npz')
+    original.save(path)
+    loaded = GraphSnapshot.load(path)
+    assert loaded.urls == URLS
+    for name in ('nodes', 'pages', 'edges', 'changes'):
+        assert getattr(loaded, name).tolist() == getattr(original, name).tolist()
+
+
+def test_priority_frontier_pops_new_then_most_changed():
+    frontier = PriorityFrontier(str, changes=np.array([0, 3, 1], dtype=np.uint32))
+    for url_id in (0, 1, 2, 3):
+        frontier.add(url_id)
+    assert [frontier.pop() for _ in range(4)] == [3, 1, 2, 0]
+
+
+def test_change_weight_trades_off_against_depth():
+    frontier = PriorityFrontier(str, depth_weight=1, change_weight=2,
+                                changes=np.array([0, 0, 0, 1], dtype=np.uint32))
+    frontier.add(0)
+    frontier.add(1, source=0)
+    frontier.add(2, source=1)
+    frontier.add(3, source=2)
+    # Depth 3 and one change (2 - 3) outranks depth 2 without changes (-2)
+    assert frontier.pop() == 0
+    assert [frontier.pop() for _ in range(3)] == [1, 3, 2]
+
+
+def test_incremental_crawl_visits_changed_pages_first(local_site, tmp_path):
+    links = {'/': ['/a', '/p'], '/a': ['/x'], '/p': ['/b'], '/x': [], '/b': []}
+    for path, targets in links.items():
+        local_site.pages[f'www.site.test{path}'] = ''.join(
+            f'<a href="{target}">{target}</a>' for target in targets)
+    # /b changed in five past runs and /p in one; the rest never did
+    urls = [local_site.url('www.site.test', path) for path in links]
+    previous = snapshot(urls, [0, 1, 2, 3, 4], [(0, 1), (0, 2), (1, 3), (2, 4)],
+                        changes=[0, 0, 1, 0, 5])
+    previous.save(str(tmp_path / 'graph.npz'))
+    
+    crawler = WebCrawler(urls[0], frontier='priority', max_workers=1, rate_limit=0,
+                         respect_robots=False, dns_resolver=resolve_local,
+                         previous_snapshot=str(tmp_path / 'graph.npz'))
+    crawler.crawl(resolve=False)
+    # Breadth first, the deeper /b would come last; its changes put it before /a
+    assert [path for _, path, _ in local_site.requests] == ['/', '/p', '/b', '/a', '/x']
@@ -0,0 +1,85 @@
+"""Parity of the lxml and tokenizer link extractors with the BeautifulSoup backend."""
+
+import pytest
+
+from crawler import LINK_EXTRACTORS, LinkStream, URLNormalizer, extract_links
+
+PAGE_URL = 'https://www.example.com/docs/guide/index.html'
+
+PAGES = {
+    'absolute': '''<html><body>
+        <a href="https://www.example.com/a">A</a>
+        <a href="https://shop.example.com/b?y=2&x=1">B</a>
+        <a href="https://other.org/c">external</a>
+    </body></html>''',
+    'relative': '''<html><body>
+        <a href="page.html">sibling</a> <a href="../up.html">up</a>
+        <a href="/root">root</a> <a href="//mag.example.com/m">scheme-relative</a>
+        <a href="?q=1">query only</a> <a href="./">dir</a>
+    </body></html>''',
+    'base': '''<html><head><base href="https://mag.example.com/blog/"></head><body>
+        <a href="post-1">one</a> <a href="/about">about</a>
+    </body></html>''',
+    'relative base': '''<html><head><base href="../../"></head><body>
+        <a href="x/y">xy</a>
+    </body></html>''',
+    'two bases': '''<html><head><base href="/first/"><base href="/second/"></head>
+        <body><a href="z">z</a></body></html>''',
+    'fragments': '''<html><body>
+        <a href="#top">top</a> <a href="other.html#part">other</a>
+        <a href="index.html">self</a> <a href="index.html#x">self with fragment</a>
+    </body></html>''',
+    'skipped schemes': '''<html><body>
+        <a href="javascript:void(0)">js</a> <a href="mailto:a@example.com">mail</a>
+        <a href="tel:123">tel</a> <a href="">empty</a> <a>no href</a>
+    </body></html>''',
+    'entities and case': '''<HTML><BODY>
+        <A HREF="/p?a=1&amp;b=2">amp</A> <a href='/q?c=&#51;'>charref</a>
+        <a href=/unquoted>unquoted</a> <a href="/Caf%C3%A9">encoded</a>
+    </BODY></HTML>''',
+    'malformed': '''<html><body><div><p>unclosed
+        <a href="/one">one<a href="/two">two</a></p></div></span>
+        <table><tr><td><a href="/cell">cell</td></tr></table>
+        <a href="/three" <b>broken</b>
+        <!-- <a href="/commented">no</a> -->
+        <script>var s = '<a href="/in-script">';</script>
+        <a href="/four">four
+    ''',
+    'no body': '<a href="/bare">bare</a><base href="/ignored-late/">',
+    'empty': '',
+}
+
+FAST_BACKENDS = [name for name in LINK_EXTRACTORS if name != 'bs4']
+
+
+def normalizer():
+    return URLNormalizer('www.example.com', 'example.com')
+
+
+def reference(html):
+    return extract_links(html, PAGE_URL, normalizer(), LINK_EXTRACTORS['bs4']())
+
+
+@pytest.mark.parametrize('page', PAGES)
+@pytest.mark.parametrize('backend', FAST_BACKENDS)
+def test_same_links_as_beautifulsoup(backend, page):
+    html = PAGES[page]
+    assert extract_links(html, PAGE_URL, normalizer(), LINK_EXTRACTORS[backend]()) == reference(html)
+
+
+@pytest.mark.parametrize('page', [name for name in PAGES if name != 'no body'])
+@pytest.mark.parametrize('backend', FAST_BACKENDS)
+def test_streamed_links_match(backend, page):
+    # Feed a few bytes at a time, splitting tags and multi-byte characters
+    body = PAGES[page].encode()
+    stream = LinkStream(LINK_EXTRACTORS[backend](), PAGE_URL, normalizer())
+    stream.begin('utf-8')
+    for start in range(0, len(body), 7):
+        stream.feed(body[start:start + 7])
+    assert stream.close() == reference(PAGES[page])
+
+
+def test_fixtures_cover_base_and_fragments():
+    assert reference(PAGES['base']) == ['https://mag.example.com/blog/post-1',
+                                        'https://mag.example.com/about']
+    assert reference(PAGES['fragments']) == ['https://www.example.com/docs/guide/other.html']
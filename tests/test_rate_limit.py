@@ -0,0 +1,58 @@
+"""Per-host rate limiting observed at a local server."""
+
+import pytest
+
+from conftest import resolve_local
+from crawler import WebCrawler, aiohttp
+
+HOSTS = ('a.site.test', 'b.site.test')
+PAGES = 6
+
+
+def build_site(site):
+    """An index on www linking to PAGES pages on each of HOSTS."""
+    links = ''.join(f'<a href="{site.url(host, f"/p{i}")}">{host} {i}</a>'
+                    for host in HOSTS for i in range(PAGES))
+    site.pages['www.site.test/'] = f'<html><body>{links}</body></html>'
+    for host in HOSTS:
+        for i in range(PAGES):
+            site.pages[f'{host}/p{i}'] = '<html><body>leaf</body></html>'
+
+
+def gaps(times):
+    times = sorted(times)
+    return [b - a for a, b in zip(times, times[1:])]
+
+
+@pytest.mark.parametrize('engine', [
+    'thread',
+    pytest.param('async', marks=pytest.mark.skipif(aiohttp is None, reason='needs aiohttp')),
+])
+def test_each_host_is_limited_independently(local_site, engine):
+    build_site(local_site)
+    crawler = WebCrawler(local_site.url('www.site.test'), max_workers=8, rate_limit=0.2,
+                         engine=engine, dns_resolver=resolve_local)
+    graph = crawler.crawl()
+    
+    assert graph.number_of_nodes() == 1 + len(HOSTS) * PAGES
+    spans = []
+    for host in HOSTS:
+        times = local_site.page_requests(host)
+        assert len(times) == PAGES
+        # 5 requests per second with a burst of 1; allow for timer jitter
+        assert min(gaps(times)) >= 0.18
+        spans.append((min(times), max(times)))
+    # The hosts do not wait on each other, so their request spans overlap
+    (a_start, a_end), (b_start, b_end) = spans
+    assert a_start < b_end and b_start < a_end
+
+
+def test_host_rules_override_the_default_rate(local_site):
+    build_site(local_site)
+    crawler = WebCrawler(local_site.url('www.site.test'), max_workers=8, rate_limit=0.05,
+                         host_rate_limits={'b.site.test:*': (2.0, 1)},
+                         dns_resolver=resolve_local)
+    crawler.crawl()
+    
+    assert min(gaps(local_site.page_requests('b.site.test'))) >= 0.45
+    assert max(gaps(local_site.page_requests('a.site.test'))) < 0.45
@@ -0,0 +1,36 @@
+"""robots.txt fetching."""
+
+import itertools
+
+import pytest
+
+from conftest import resolve_local
+from crawler import RobotsPolicy, WebCrawler, aiohttp
+
+
+def endless_robots():
+    yield b'User-agent: *\nDisallow: /private\n'
+    filler = b'# ' + b'x' * 1022 + b'\n'
+    for _ in itertools.repeat(None, 10 ** 6):  # 1 GB if read to the end
+        yield filler
+
+
+@pytest.mark.parametrize('engine', [
+    'thread',
+    pytest.param('async', marks=pytest.mark.skipif(aiohttp is None, reason='needs aiohttp')),
+])
+def test_endless_robots_txt_is_read_up_to_the_cap(local_site, engine):
+    local_site.pages['www.site.test/robots.txt'] = (200, {'Content-Type': 'text/plain'},
+                                                    endless_robots())
+    local_site.pages['www.site.test/'] = ('<a href="/public">public</a>'
+                                          '<a href="/private">private</a>')
+    local_site.pages['www.site.test/public'] = '<p>public</p>'
+    crawler = WebCrawler(local_site.url('www.site.test'), rate_limit=0, engine=engine,
+                         dns_resolver=resolve_local)
+    graph = crawler.crawl()
+    
+    fetched = {path for host, path, _ in local_site.requests}
+    assert '/public' in fetched and '/private' not in fetched
+    assert graph.number_of_nodes() == 3
+    # Socket buffers let the server get somewhat ahead of the reader
+    assert local_site.streamed < RobotsPolicy.MAX_SIZE + 8 * 1024 * 1024
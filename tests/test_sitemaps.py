@@ -0,0 +1,134 @@
+"""Streaming sitemap parsing and seeding a crawl from sitemaps."""
+
+import gzip
+
+from conftest import resolve_local
+from crawler import SitemapStream, WebCrawler
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+XML = {'Content-Type': 'application/xml'}
+GZIP = {'Content-Type': 'application/gzip'}
+
+
+def urlset(urls, lastmod=None):
+    entries = ''.join(f'<url><loc>{url}</loc>'
+                      + (f'<lastmod>{lastmod}</lastmod>' if lastmod else '') + '</url>'
+                      for url in urls)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{entries}</urlset>'.encode()
+
+
+def index(urls):
+    entries = ''.join(f'<sitemap><loc>{url}</loc></sitemap>' for url in urls)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sitemapindex {NS}>{entries}</sitemapindex>').encode()
+
+
+def parse(data, chunk_size=7, **limits):
+    """Feed data in small chunks and return (stream, all entries)."""
+    stream = SitemapStream(**limits)
+    entries = []
+    for start in range(0, len(data), chunk_size):
+        entries += stream.feed(data[start:start + chunk_size])
+    return stream, entries + stream.close()
+
+
+def test_urlset_in_small_chunks():
+    urls = [f'http://a.test/p{i}' for i in range(20)]
+    stream, entries = parse(urlset(urls, lastmod='2024-05-01'))
+    assert entries == [(url, '2024-05-01') for url in urls]
+    assert stream.sitemaps == []
+    assert not stream.truncated
+
+
+def test_entries_are_returned_while_the_file_downloads():
+    data = urlset([f'http://a.test/p{i}' for i in range(100)])
+    stream = SitemapStream()
+    early = stream.feed(data[:len(data) // 2])
+    assert 40 <= len(early) < 100
+    assert len(early) + len(stream.feed(data[len(data) // 2:]) + stream.close()) == 100
+
+
+def test_gzip_sitemap_is_recognized_by_its_magic_number():
+    urls = [f'http://a.test/p{i}' for i in range(50)]
+    _, entries = parse(gzip.compress(urlset(urls)), chunk_size=5)
+    assert [loc for loc, _ in entries] == urls
+
+
+def test_plain_text_sitemap():
+    _, entries = parse(b'\xef\xbb\xbfhttp://a.test/a\r\nnot a url\nhttps://a.test/b')
+    assert entries == [('http://a.test/a', None), ('https://a.test/b', None)]
+
+
+def test_sitemap_index_lists_child_sitemaps():
+    children = ['http://a.test/sitemap-1.xml.gz', 'http://a.test/sitemap-2.xml']
+    stream, entries = parse(index(children))
+    assert entries == []
+    assert stream.sitemaps == children
+
+
+def test_extension_locs_are_skipped():
+    data = (f'<urlset {NS} xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">'
+            '<url><loc>http://a.test/p</loc><image:image><image:loc>http://a.test/i.png'
+            '</image:loc></image:image></url></urlset>').encode()
+    _, entries = parse(data)
+    assert entries == [('http://a.test/p', None)]
+
+
+def test_size_cap_keeps_the_entries_before_it():
+    data = urlset([f'http://a.test/p{i}' for i in range(100)])
+    stream, entries = parse(data, max_size=len(data) // 2)
+    assert stream.truncated
+    assert stream.size == len(data) // 2
+    assert 40 <= len(entries) < 100
+
+
+def test_size_cap_stops_a_gzip_bomb():
+    bomb = gzip.compress(b'<urlset>' + b' ' * (64 * 1024 * 1024))
+    stream, _ = parse(bomb, chunk_size=64 * 1024, max_size=1024 * 1024)
+    assert stream.truncated
+    assert stream.size == 1024 * 1024
+
+
+def test_url_cap():
+    stream, entries = parse(urlset([f'http://a.test/p{i}' for i in range(100)]), max_urls=30)
+    assert stream.truncated
+    assert [loc for loc, _ in entries] == [f'http://a.test/p{i}' for i in range(30)]
+
+
+def test_crawl_is_seeded_from_nested_sitemaps(local_site):
+    # sitemap.xml -> an index and a gzipped urlset; the index -> a plain urlset
+    url = lambda path: local_site.url('www.site.test', path)
+    local_site.pages['www.site.test/sitemap.xml'] = (
+        200, XML, index([url('/nested.xml'), url('/pages.xml.gz')]))
+    local_site.pages['www.site.test/nested.xml'] = (200, XML, index([url('/more.xml')]))
+    local_site.pages['www.site.test/pages.xml.gz'] = (
+        200, GZIP, gzip.compress(urlset([url('/a'), url('/b')], lastmod='2024-01-01')))
+    local_site.pages['www.site.test/more.xml'] = (200, XML, urlset([url('/c')]))
+    # The pages link nowhere, so only the sitemaps can lead the crawl to them
+    local_site.pages['www.site.test/'] = '<p>home</p>'
+    for path in ('/a', '/b', '/c'):
+        local_site.pages[f'www.site.test{path}'] = '<p>page</p>'
+    
+    crawler = WebCrawler(url('/'), rate_limit=0, respect_robots=False, sitemaps=True,
+                         dns_resolver=resolve_local)
+    crawler.crawl(resolve=False)
+    visited = {crawler.urls.url(url_id) for url_id in crawler.visited.to_array()}
+    assert visited == {url('/'), url('/a'), url('/b'), url('/c')}
+    assert crawler.sitemap_stats['files'] == 4
+    assert crawler.sitemap_stats['urls'] == 3
+
+
+def test_crawl_reads_at_most_max_sitemaps_files(local_site, caplog):
+    url = lambda path: local_site.url('www.site.test', path)
+    local_site.pages['www.site.test/sitemap.xml'] = (
+        200, XML, index([url(f'/s{i}.xml') for i in range(5)]))
+    for i in range(5):
+        local_site.pages[f'www.site.test/s{i}.xml'] = (200, XML, urlset([url(f'/p{i}')]))
+    local_site.pages['www.site.test/'] = '<p>home</p>'
+    
+    crawler = WebCrawler(url('/'), rate_limit=0, respect_robots=False, sitemaps=True,
+                         dns_resolver=resolve_local, max_pages=1)
+    crawler.MAX_SITEMAPS = 3
+    crawler.crawl(resolve=False)
+    assert crawler.sitemap_stats['files'] == 3
+    assert 'stopped after 3 files, 3 left unread' in caplog.text
@@ -0,0 +1,91 @@
+"""Crawler trap detection."""
+
+from conftest import resolve_local
+from crawler import TrapDetector, WebCrawler
+
+
+def check(detector, urls):
+    """Classify URLs under consecutive IDs and return the ones allowed."""
+    return [url for url_id, url in enumerate(urls) if detector.allows(url_id, url)]
+
+
+def test_calendar_is_capped_per_template():
+    detector = TrapDetector(max_template_urls=12)
+    months = [f'http://a.test/calendar/{year}/{month}'
+              for year in range(2020, 2030) for month in range(1, 13)]
+    assert check(detector, months) == months[:12]
+    # Other templates on the host are counted separately
+    assert detector.allows(len(months), 'http://a.test/events/2020/1')
+    
+    stats = detector.stats()
+    assert stats['checked'] == len(months) + 1
+    assert stats['pruned'] == len(months) - 12
+    assert stats['top'] == [('template a.test/calendar/#/#', len(months) - 12)]
+
+
+def test_query_parameter_names_are_part_of_the_template():
+    detector = TrapDetector(max_template_urls=2)
+    urls = ['http://a.test/list?page=1', 'http://a.test/list?page=2', 'http://a.test/list?page=3',
+            'http://a.test/list?page=1&sort=asc', 'http://a.test/list?sort=asc&page=2']
+    assert check(detector, urls) == urls[:2] + urls[3:]
+
+
+def test_repeating_path_segments():
+    detector = TrapDetector()
+    urls = ['http://a.test/a/b/', 'http://a.test/a/b/a/b/', 'http://a.test/a/b/a/b/a/b/',
+            'http://a.test/x/x/x', 'http://a.test/x/y/x/z']
+    assert check(detector, urls) == [urls[0], urls[1], urls[4]]
+    assert detector.pruned == {"repeated segment 'a' on a.test": 1,
+                               "repeated segment 'x' on a.test": 1}
+
+
+def test_parameter_values_are_capped_per_path():
+    detector = TrapDetector(max_param_values=3)
+    sessions = [f'http://a.test/shop?sid={i}' for i in range(6)]
+    assert check(detector, sessions) == sessions[:3]
+    # Values seen before stay allowed, and other paths have their own cap
+    assert detector.classify('http://a.test/shop?sid=1') is None
+    assert detector.classify('http://a.test/cart?sid=5') is None
+    assert detector.classify('http://a.test/shop?sid=6') == 'parameter sid on a.test/shop'
+
+
+def test_verdicts_are_kept_per_id():
+    detector = TrapDetector(max_template_urls=1)
+    assert detector.allows(0, 'http://a.test/p/1')
+    assert not detector.allows(1, 'http://a.test/p/2')
+    # Later links to the same IDs are not classified or counted again
+    assert detector.allows(0, 'http://a.test/p/1')
+    assert not detector.allows(1, 'http://a.test/p/2')
+    assert detector.checked == 2
+    assert sum(detector.pruned.values()) == 1
+
+
+def test_exempt_urls_skip_the_checks():
+    detector = TrapDetector(max_template_urls=1)
+    detector.exempt(5)
+    assert detector.allows(5, 'http://a.test/p/1/p/1/p/1')
+    assert detector.allows(6, 'http://a.test/p/2')
+
+
+def test_none_disables_a_limit():
+    detector = TrapDetector(max_template_urls=None, max_param_values=None,
+                            max_segment_repeats=None)
+    urls = [f'http://a.test/a/a/a/{i}?sid={i}' for i in range(50)]
+    assert check(detector, urls) == urls
+
+
+def test_crawl_of_an_endless_calendar_ends(local_site):
+    # Every month links to the next one, forever
+    for year in range(2000, 2100):
+        for month in range(1, 13):
+            following = f'/calendar/{year + month // 12}/{month % 12 + 1}'
+            local_site.pages[f'www.site.test/calendar/{year}/{month}'] = (
+                f'<a href="{following}">next</a>')
+    crawler = WebCrawler(local_site.url('www.site.test', '/calendar/2000/1'), rate_limit=0,
+                         respect_robots=False, dns_resolver=resolve_local,
+                         trap_limits={'max_template_urls': 20})
+    crawler.crawl(resolve=False)
+    
+    # The start URL is seeded without being classified, then 20 linked months
+    assert len(crawler.visited) == 21
+    assert crawler.traps.stats()['traps'] == 1
@@ -0,0 +1,52 @@
+"""Worker utilization tracking against a fake clock."""
+
+from crawler import UtilizationTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_utilization_and_samples():
+    clock = FakeClock()
+    tracker = UtilizationTracker(capacity=4, sample_interval=1.0, clock=clock)
+    assert tracker.utilization() == 0.0
+    tracker.start()
+    
+    # Second 1: two workers busy throughout
+    tracker.task_started()
+    tracker.task_started()
+    clock.now += 1.0
+    # Second 2: all four busy for its second half
+    clock.now += 0.5
+    tracker.task_started()
+    tracker.task_started()
+    clock.now += 0.5
+    # Seconds 3 and 4: idle
+    for _ in range(4):
+        tracker.task_finished()
+    clock.now += 2.0
+    
+    # 2 + 3 busy worker-seconds out of 4 workers * 4 seconds
+    assert tracker.utilization() == 5 / 16
+    summary = tracker.summary()
+    assert summary['capacity'] == 4
+    assert summary['utilization'] == round(5 / 16, 4)
+    assert summary['samples'] == [(1.0, 0.5), (2.0, 0.75), (3.0, 0.0), (4.0, 0.0)]
+
+
+def test_busy_span_across_several_samples():
+    clock = FakeClock()
+    tracker = UtilizationTracker(capacity=2, sample_interval=0.5, clock=clock)
+    tracker.start()
+    clock.now += 0.25
+    tracker.task_started()
+    clock.now += 1.0
+    tracker.task_finished()
+    
+    assert tracker.utilization() == 0.5 * 1.0 / 1.25
+    assert [u for _, u in tracker.samples] == [0.25, 0.5]